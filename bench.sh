@@ -0,0 +1 @@
+python src/benchmark.py "$@"
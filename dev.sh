@@ -0,0 +1 @@
+python server.py --dev --dir static --live-reload
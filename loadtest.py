@@ -0,0 +1,129 @@
+import time
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+
+def worker(host, port, paths, keep_alive, deadline, results):
+    """
+    Requests the paths in a loop until the deadline, over one persistent connection or a new one per request.
+
+    Args:
+        host (str): The host of the server.
+        port (int): The port of the server.
+        paths (list): The paths requested in turn.
+        keep_alive (bool): Reuse the connection between requests.
+        deadline (float): The `time.perf_counter` value to stop at.
+        results (list): The list the (requests, errors, bytes, latencies) of the worker is appended to.
+
+    Returns:
+        None
+    """
+    requests = errors = size = 0
+    latencies = []
+    connection = None
+
+    while time.perf_counter() < deadline:
+        path = paths[requests % len(paths)]
+        started = time.perf_counter()
+
+        try:
+            if connection is None:
+                connection = http.client.HTTPConnection(host, port, timeout=10)
+
+            connection.request("GET", path, headers={} if keep_alive else {"Connection": "close"})
+            response = connection.getresponse()
+            size += len(response.read())
+
+            if response.status >= 400:
+                errors += 1
+            if not keep_alive or response.will_close:
+                connection.close()
+                connection = None
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            if connection is not None:
+                connection.close()
+            connection = None
+
+        requests += 1
+        latencies.append(time.perf_counter() - started)
+
+    if connection is not None:
+        connection.close()
+    results.append((requests, errors, size, latencies))
+
+
+def run_load(url, paths, connections, duration, keep_alive):
+    """
+    Runs a load test against a server.
+
+    Args:
+        url (str): The base URL of the server, e.g. "http://localhost:8080".
+        paths (list): The paths requested by every connection in turn.
+        connections (int): The number of concurrent clients.
+        duration (float): The length of the test in seconds.
+        keep_alive (bool): Reuse the connection of a client between requests.
+
+    Returns:
+        dict: The number of "requests" and "errors", the "requests_per_sec", the "mb_per_sec" and the median and
+        99th percentile latency in seconds ("p50" and "p99").
+    """
+    parts = urlsplit(url)
+    deadline = time.perf_counter() + duration
+    results = []
+    threads = [
+        threading.Thread(target=worker, args=(parts.hostname, parts.port or 80, paths, keep_alive, deadline, results))
+        for _ in range(connections)
+    ]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for result in results for latency in result[3])
+    requests = sum(result[0] for result in results)
+    return {
+        "requests": requests,
+        "errors": sum(result[1] for result in results),
+        "requests_per_sec": requests / elapsed,
+        "mb_per_sec": sum(result[2] for result in results) / 1e6 / elapsed,
+        "p50": latencies[len(latencies) // 2] if latencies else 0.0,
+        "p99": latencies[int(len(latencies) * 0.99)] if latencies else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test for the preview server")
+    parser.add_argument("--url", type=str, help="Base URL of the server", default="http://localhost:8080")
+    parser.add_argument(
+        "--path",
+        action="append",
+        default=[],
+        help="Path to request, can be repeated (default: / and /index.css)",
+    )
+    parser.add_argument("--connections", type=int, help="Number of concurrent clients", default=16)
+    parser.add_argument("--duration", type=float, help="Length of the test in seconds", default=5)
+    parser.add_argument(
+        "--no-keep-alive",
+        action="store_true",
+        help="Open a new connection for every request, like an HTTP/1.0 server forces clients to",
+    )
+    args = parser.parse_args()
+
+    result = run_load(
+        args.url,
+        args.path or ["/", "/index.css"],
+        args.connections,
+        args.duration,
+        not args.no_keep_alive,
+    )
+    print(
+        f"{result['requests']} requests, {result['errors']} errors in {args.duration:.1f} s: "
+        f"{result['requests_per_sec']:.1f} requests/s, {result['mb_per_sec']:.2f} MB/s, "
+        f"p50 {result['p50'] * 1000:.2f} ms, p99 {result['p99'] * 1000:.2f} ms"
+    )
@@ -1,3 +1,3 @@
-python src/main.py
+python src/main.py --staged --precompress
 python server.py --dir public
 
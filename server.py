@@ -1,9 +1,495 @@
 import os
+import sys
+import time
+import signal
+import socket
+import hashlib
 import argparse
+import functools
+import threading
+import traceback
+from fnmatch import fnmatch
+from collections import OrderedDict
+from urllib.parse import unquote, urlsplit, urlunsplit
+from email.utils import formatdate, parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
 from http.server import HTTPServer, SimpleHTTPRequestHandler
 
+# the dev mode renders pages with the generator of the build
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from generate_static import render_page
+from template import find_template
+from watch import create_watcher, wait_for_changes
+
+# Cache-Control of the responses no rule matches: cache, but revalidate before every use
+default_cache_control = "no-cache"
+# compressed siblings written by the build (see src/precompress.py), most preferred first
+content_encodings = ((".br", "br"), (".gz", "gzip"))
+# Server-Sent Events stream announcing the changes of the served files to the open pages
+live_reload_path = "/__livereload"
+# added to the HTML pages when live reload is on, reloads the page when the stream announces a change
+live_reload_script = (
+    f'<script>new EventSource("{live_reload_path}").addEventListener("reload", () => location.reload());</script>'
+).encode()
+
+
+# a file as it is served: validators, type and, if small enough, its content
+class CachedFile:
+
+    def __init__(self, file_path, mtime_ns, size, content_type, body=None):
+        """
+        Initializes a new instance of the CachedFile class.
+
+        Parameters:
+            file_path (str): The path to the file.
+            mtime_ns (int): The modification time of the file in nanoseconds.
+            size (int): The size of the file in bytes.
+            content_type (str): The MIME type of the file.
+            body (bytes): The content of the file, None if it is too large to be kept in memory. Defaults to None.
+        """
+        self.file_path = file_path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.content_type = content_type
+        self.body = body
+        self.last_modified = formatdate(mtime_ns / 1e9, usegmt=True)
+
+        # strong validators: the content hash if the content is in memory, else the modification time and size,
+        # which every rebuild of the file changes because the outputs are replaced, never written in place
+        if body is not None:
+            self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        else:
+            self.etag = f'"{mtime_ns:x}-{size:x}"'
+
+    def __repr__(self):
+        """
+        Return a string representation of the CachedFile object.
+
+        :return: A string representation of the CachedFile object.
+        :rtype: str
+        """
+        return f"CachedFile({self.file_path}, {self.size} bytes, {self.etag})"
+
+
+# files served from memory, keyed by path and invalidated by modification time and size, least recently used first
+class ResponseCache:
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_file_size=1024 * 1024):
+        """
+        Initializes a new, empty instance of the ResponseCache class.
+
+        Parameters:
+            max_bytes (int): The total size of the file contents kept in memory. Defaults to 64 MiB.
+            max_file_size (int): Larger files are served from disk, only their validators are cached. Defaults to
+            1 MiB.
+        """
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self.entries = OrderedDict()
+        self.size = 0
+        # the handler threads share the cache
+        self.lock = threading.Lock()
+
+    def get(self, file_path, content_type):
+        """
+        Returns the cached file, reading it again if it changed since it was cached.
+
+        Args:
+            file_path (str): The path to the file.
+            content_type (str): The MIME type the file is served with.
+
+        Returns:
+            CachedFile: The file, with its content if it is small enough.
+
+        Raises:
+            OSError: If the file cannot be read.
+        """
+        file_stat = os.stat(file_path)
+
+        with self.lock:
+            entry = self.entries.get(file_path)
+
+            if entry is not None and (entry.mtime_ns, entry.size) == (file_stat.st_mtime_ns, file_stat.st_size):
+                self.entries.move_to_end(file_path)
+                return entry
+
+        # the validators come from the opened file, so they match the content even if the file is replaced meanwhile
+        with open(file_path, "rb") as file:
+            file_stat = os.fstat(file.fileno())
+            in_memory = file_stat.st_size <= min(self.max_file_size, self.max_bytes)
+            body = file.read() if in_memory else None
+
+        entry = CachedFile(file_path, file_stat.st_mtime_ns, file_stat.st_size, content_type, body)
+
+        with self.lock:
+            old_entry = self.entries.pop(file_path, None)
+
+            if old_entry is not None and old_entry.body is not None:
+                self.size -= old_entry.size
+
+            self.entries[file_path] = entry
+
+            if body is not None:
+                self.size += entry.size
+
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+
+                if evicted.body is not None:
+                    self.size -= evicted.size
+        return entry
+
+    def __repr__(self):
+        """
+        Return a string representation of the ResponseCache object.
+
+        :return: A string representation of the ResponseCache object.
+        :rtype: str
+        """
+        return f"ResponseCache({len(self.entries)} files, {self.size} bytes)"
+
+
+# markdown pages rendered on request, keyed by source path and invalidated by the versions of source and template
+class PageRenderer:
+
+    def __init__(self, content_dir, template_path, variables=None):
+        """
+        Initializes a new, empty instance of the PageRenderer class.
+
+        Parameters:
+            content_dir (str): The content directory holding the markdown pages.
+            template_path (str): The path to the default template HTML file, see `template.find_template`.
+            variables (dict): Values of additional {{ Name }} placeholders of the templates. Defaults to None.
+        """
+        # absolute, so the pages do not depend on the working directory
+        self.content_dir = os.path.abspath(content_dir)
+        self.template_path = os.path.abspath(template_path)
+        self.variables = dict(variables or {})
+        # source path -> ((source mtime, source size, template path, template mtime, template size), CachedFile),
+        # a dev server only renders the pages it is asked for, so nothing is evicted
+        self.pages = {}
+        # the handler threads share the rendered pages
+        self.lock = threading.Lock()
+
+    def find_source(self, url_path):
+        """
+        Maps a URL path to the markdown page the build generates it from.
+
+        Args:
+            url_path (str): The path of the request, e.g. "/", "/blog/" or "/blog/post.html".
+
+        Returns:
+            str: The path to the markdown file, e.g. "<content>/blog/index.md" for "/blog/", None if there is none.
+        """
+        parts = [part for part in unquote(url_path).split("/") if part not in ("", ".")]
+
+        if ".." in parts:
+            return None
+        if url_path.endswith("/") or parts == []:
+            parts.append("index.html")
+        if not parts[-1].endswith(".html"):
+            return None
+
+        source_path = os.path.join(self.content_dir, *parts[:-1], parts[-1].removesuffix(".html") + ".md")
+        return source_path if os.path.isfile(source_path) else None
+
+    def get(self, source_path):
+        """
+        Returns the page of a markdown file, rendering it again if it or its template changed since it was rendered.
+
+        Args:
+            source_path (str): The path to the markdown file.
+
+        Returns:
+            CachedFile: The rendered page, modified when the newer of source and template was.
+
+        Raises:
+            OSError: If the markdown file or the template cannot be read.
+            ValueError: If the page cannot be rendered, see `generate_static.render_page`.
+        """
+        template_path = find_template(source_path, self.content_dir, self.template_path)
+        source_stat = os.stat(source_path)
+        template_stat = os.stat(template_path)
+        key = (source_stat.st_mtime_ns, source_stat.st_size, template_path, template_stat.st_mtime_ns,
+               template_stat.st_size)
+
+        with self.lock:
+            cached = self.pages.get(source_path)
+
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        body = render_page(source_path, template_path, self.variables).encode()
+        mtime_ns = max(source_stat.st_mtime_ns, template_stat.st_mtime_ns)
+        entry = CachedFile(source_path, mtime_ns, len(body), "text/html", body)
+
+        with self.lock:
+            self.pages[source_path] = (key, entry)
+        return entry
+
+    def __repr__(self):
+        """
+        Return a string representation of the PageRenderer object.
+
+        :return: A string representation of the PageRenderer object.
+        :rtype: str
+        """
+        return f"PageRenderer({self.content_dir}, {self.template_path}, {len(self.pages)} pages)"
+
+
+# open pages reloaded over Server-Sent Events whenever the files they are built from change
+class LiveReload:
+
+    def __init__(self, watched_paths, debounce=0.05, ping_interval=15):
+        """
+        Initializes a new instance of the LiveReload class, without any page connected.
+
+        Parameters:
+            watched_paths (list): The directories and files whose changes reload the pages, see `watch.create_watcher`.
+            debounce (float): Seconds without further change that end a burst of changes, e.g. a build writing its
+            outputs, which reloads the pages once. Defaults to 0.05.
+            ping_interval (float): Seconds between two comments sent to the pages while nothing changes, so the
+            connections of closed pages are noticed and dropped. Defaults to 15.
+        """
+        self.watched_paths = list(watched_paths)
+        self.debounce = debounce
+        self.ping_interval = ping_interval
+        # sockets of the event streams, written by the watching thread only
+        self.clients = []
+        # HTML path -> ((modification time, size), CachedFile with the script)
+        self.pages = {}
+        # the handler threads and the watching thread share the clients and the pages
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def start(self):
+        """
+        Starts watching the files in a daemon thread.
+
+        Returns:
+            None
+        """
+        watcher = create_watcher(self.watched_paths)
+        threading.Thread(target=self.run, args=(watcher,), name="live-reload", daemon=True).start()
+
+    def run(self, watcher):
+        """
+        Announces every burst of changes to the connected pages until the server is closed.
+
+        Args:
+            watcher (InotifyWatcher or PollingWatcher): The watcher of the files.
+
+        Returns:
+            None
+        """
+        try:
+            while not self.closed:
+                changed = wait_for_changes(watcher, self.debounce, timeout=self.ping_interval)
+                self.broadcast(b"event: reload\ndata: \n\n" if changed else b": ping\n\n")
+        finally:
+            watcher.close()
+
+    def add_client(self, connection):
+        """
+        Takes over the connection of an event stream whose headers were sent, the handler thread is freed.
+
+        Args:
+            connection (socket.socket): The socket of the connection.
+
+        Returns:
+            None
+        """
+        # a page that stopped reading must not block the announcements to the others for long
+        connection.settimeout(1)
+
+        with self.lock:
+            self.clients.append(connection)
+
+    def has_client(self, connection):
+        """
+        Tells whether a connection is an event stream taken over by `add_client`.
+
+        Args:
+            connection (socket.socket): The socket of the connection.
+
+        Returns:
+            bool: True if the connection belongs to the live reload.
+        """
+        with self.lock:
+            return connection in self.clients
+
+    def broadcast(self, message):
+        """
+        Sends an event to every connected page, dropping the connections of closed pages.
+
+        Args:
+            message (bytes): The event in the text/event-stream format.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            clients = list(self.clients)
+
+        for connection in clients:
+            try:
+                connection.sendall(message)
+            except OSError:
+                with self.lock:
+                    if connection in self.clients:
+                        self.clients.remove(connection)
+                connection.close()
+
+    def inject(self, entry):
+        """
+        Adds the live reload script to an HTML page, before its closing body tag.
+
+        Args:
+            entry (CachedFile): The page.
+
+        Returns:
+            CachedFile: The page with the script, or the page itself if it is too large to be held in memory.
+        """
+        if entry.body is None:
+            return entry
+
+        with self.lock:
+            cached = self.pages.get(entry.file_path)
+
+        if cached is not None and cached[0] == (entry.mtime_ns, entry.etag):
+            return cached[1]
+
+        index = entry.body.rfind(b"</body>")
+        index = len(entry.body) if index < 0 else index
+        body = entry.body[:index] + live_reload_script + entry.body[index:]
+        injected = CachedFile(entry.file_path, entry.mtime_ns, len(body), entry.content_type, body)
+
+        with self.lock:
+            self.pages[entry.file_path] = ((entry.mtime_ns, entry.etag), injected)
+        return injected
+
+    def close(self):
+        """
+        Closes the event streams, the watching thread stops at its next wake up.
+
+        Returns:
+            None
+        """
+        self.closed = True
+
+        with self.lock:
+            clients = self.clients
+            self.clients = []
+
+        for connection in clients:
+            connection.close()
+
+    def __repr__(self):
+        """
+        Return a string representation of the LiveReload object.
+
+        :return: A string representation of the LiveReload object.
+        :rtype: str
+        """
+        return f"LiveReload({self.watched_paths}, {len(self.clients)} pages connected)"
+
+
+def parse_accept_encoding(header):
+    """
+    Parses an Accept-Encoding header.
+
+    Args:
+        header (str): The value of the header, e.g. "gzip, br;q=0.8, *;q=0".
+
+    Returns:
+        dict: The quality value of every listed encoding, keyed by lowercase name.
+    """
+    qualities = {}
+
+    for item in header.split(","):
+        name, _, params = item.partition(";")
+        quality = 1.0
+
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        if name.strip() != "":
+            qualities[name.strip().lower()] = quality
+    return qualities
+
+
+def parse_range(header, size):
+    """
+    Parses a Range header.
+
+    Args:
+        header (str): The value of the header, e.g. "bytes=0-1023", "bytes=1024-" or "bytes=-512".
+        size (int): The size of the requested file.
+
+    Returns:
+        tuple: The first and last (inclusive) byte of the range, clamped to the file. The first is greater than the
+        last if the range cannot be satisfied. None if the header is not a single valid byte range, which is
+        answered with the whole file.
+    """
+    unit, _, ranges = header.partition("=")
+
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    first, dash, last = ranges.strip().partition("-")
+
+    # isdigit alone accepts digits like "²", which int() rejects
+    if dash == "" or not all(part == "" or (part.isascii() and part.isdigit()) for part in (first, last)):
+        return None
+
+    if first == "":
+        if last == "":
+            return None
+        # the last bytes of the file, none of them cannot be satisfied
+        if int(last) == 0:
+            return size, size - 1
+        return max(size - int(last), 0), size - 1
+
+    if last != "" and int(last) < int(first):
+        return None
+    return int(first), min(int(last), size - 1) if last != "" else size - 1
+
+
+def parse_cache_control_rule(rule):
+    """
+    Parses a Cache-Control rule given on the command line.
+
+    Args:
+        rule (str): The rule as "PATTERN=VALUE", e.g. "*.css=public, max-age=3600".
+
+    Returns:
+        tuple: The glob pattern matched against the URL path and the Cache-Control value.
+
+    Raises:
+        ValueError: If the rule has no "=" or an empty pattern.
+    """
+    pattern, separator, value = rule.partition("=")
+
+    if separator == "" or pattern.strip() == "":
+        raise ValueError(f"Invalid cache control rule: {rule!r}, expected PATTERN=VALUE")
+    return pattern.strip(), value.strip()
+
 
 class CORSHTTPRequestHandler(SimpleHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive between requests, every response carries a Content-Length
+    protocol_version = "HTTP/1.1"
+    # seconds an idle keep-alive connection may hold a worker thread
+    timeout = 5
+    # headers and body are separate writes, Nagle would hold the body back until the headers are acknowledged
+    disable_nagle_algorithm = True
+
     def end_headers(self):
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, OPTIONS")
@@ -12,21 +498,615 @@ class CORSHTTPRequestHandler(SimpleHTTPRequestHandler):
 
     def do_OPTIONS(self):
         self.send_response(200, "OK")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        self.serve(head=False)
+
+    def do_HEAD(self):
+        self.serve(head=True)
+
+    def serve(self, head):
+        """
+        Serves a file from the response cache, or in dev mode a page rendered from its markdown, answering
+        conditional requests with 304 Not Modified.
+
+        Args:
+            head (bool): Send the headers only.
+
+        Returns:
+            None
+
+        Directory listings, redirects of directories without a trailing slash and errors are left to
+        SimpleHTTPRequestHandler.
+        """
+        renderer = self.server.page_renderer
+        live_reload = self.server.live_reload
+        url_path = urlsplit(self.path).path
+        source_path = None if renderer is None else renderer.find_source(url_path)
+        encoding = None
+
+        if live_reload is not None and url_path == live_reload_path:
+            self.open_event_stream(head)
+            return
+
+        if renderer is not None and source_path is None and not url_path.endswith("/"):
+            # like the directories of the build output, a content directory is only served with a trailing slash
+            if renderer.find_source(url_path + "/") is not None:
+                self.redirect_to_directory()
+                return
+
+        try:
+            if source_path is not None:
+                entry = renderer.get(source_path)
+            else:
+                file_path = self.find_file()
+
+                if file_path is None:
+                    return super().do_HEAD() if head else super().do_GET()
+
+                entry = self.server.response_cache.get(file_path, self.guess_type(file_path))
+
+                # the script is added to the page itself, so pages are not sent compressed
+                if live_reload is None or entry.content_type != "text/html":
+                    encoding, entry = self.negotiate_encoding(entry)
+
+            if live_reload is not None and entry.content_type == "text/html":
+                entry = live_reload.inject(entry)
+        except OSError:
+            self.send_error(404, "File not found")
+            return
+        except ValueError as error:
+            self.send_error(500, "Page cannot be rendered", str(error))
+            return
+
+        if entry.body is None:
+            try:
+                file = open(entry.file_path, "rb")
+            except OSError:
+                self.send_error(404, "File not found")
+                return
+
+            # the validators come from the descriptor the body is sent from, so a file replaced since it was looked
+            # up (by a rebuild or a flipped generation) is never sent under the headers of the previous one
+            with file:
+                file_stat = os.fstat(file.fileno())
+
+                if (file_stat.st_mtime_ns, file_stat.st_size) != (entry.mtime_ns, entry.size):
+                    entry = CachedFile(entry.file_path, file_stat.st_mtime_ns, file_stat.st_size, entry.content_type)
+
+                self.send_entry(entry, encoding, head, file)
+            return
+
+        self.send_entry(entry, encoding, head)
+
+    def send_entry(self, entry, encoding, head, file=None):
+        """
+        Sends a file, answering conditional and range requests.
+
+        Args:
+            entry (CachedFile): The served file.
+            encoding (str): The content encoding of the file, None if it is sent as is.
+            head (bool): Send the headers only.
+            file (file, optional): The file opened for binary reading, required if its content is not in memory.
+            Defaults to None.
+
+        Returns:
+            None
+        """
+        if self.not_modified(entry):
+            self.send_response(304)
+            self.send_validators(entry)
+            self.end_headers()
+            return
+
+        byte_range = None
+
+        if self.headers.get("Range") is not None and self.range_applies(entry):
+            byte_range = parse_range(self.headers["Range"], entry.size)
+
+        if byte_range is not None and byte_range[0] > byte_range[1]:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{entry.size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        start, end = byte_range if byte_range is not None else (0, entry.size - 1)
+
+        if byte_range is not None:
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{entry.size}")
+        else:
+            self.send_response(200)
+
+        self.send_header("Content-Type", entry.content_type)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+
+        self.send_validators(entry)
+        self.end_headers()
+
+        if not head:
+            self.send_body(entry, start, end - start + 1, file)
+
+    def open_event_stream(self, head):
+        """
+        Answers a request for the live reload stream and hands the connection over to the live reload, which
+        writes the events to it.
+
+        Args:
+            head (bool): Send the headers only.
+
+        Returns:
+            None
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        # the stream has no length, it ends with the connection
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        if not head:
+            # reconnect quickly when the server restarts
+            self.wfile.write(b"retry: 500\n\n")
+            self.server.live_reload.add_client(self.connection)
+
+    def redirect_to_directory(self):
+        """
+        Redirects the request to the same path with a trailing slash, as SimpleHTTPRequestHandler does for
+        directories.
+
+        Returns:
+            None
+        """
+        parts = urlsplit(self.path)
+        self.send_response(301)
+        self.send_header("Location", urlunsplit((parts[0], parts[1], parts[2] + "/", parts[3], parts[4])))
+        self.send_header("Content-Length", "0")
         self.end_headers()
 
+    def send_body(self, entry, start, length, file=None):
+        """
+        Sends a part of a file, from memory if it is cached, else with zero-copy sendfile.
+
+        Args:
+            entry (CachedFile): The served file.
+            start (int): The offset of the first byte to be sent.
+            length (int): The number of bytes to be sent.
+            file (file, optional): The file opened for binary reading, whose content is sent if it is not in memory.
+            Defaults to None.
+
+        Returns:
+            None
+        """
+        if entry.body is not None:
+            self.wfile.write(entry.body if length == entry.size else entry.body[start:start + length])
+            return
+
+        if length == 0:
+            return
+
+        # the headers are already written, wfile is unbuffered, so the body can go straight to the socket
+        self.connection.sendfile(file, start, length)
+
+    def range_applies(self, entry):
+        """
+        Evaluates the If-Range header of the request.
+
+        Args:
+            entry (CachedFile): The requested file.
+
+        Returns:
+            bool: True if there is no If-Range or it names the current version of the file, by its (strong) ETag or
+            its exact Last-Modified date, else the whole file has to be sent.
+        """
+        if_range = self.headers.get("If-Range")
+
+        if if_range is None:
+            return True
+
+        if_range = if_range.strip()
+
+        if if_range.startswith('"'):
+            return if_range == entry.etag
+        return if_range == entry.last_modified
+
+    def negotiate_encoding(self, entry):
+        """
+        Chooses the representation of a file the client accepts: a compressed sibling written by the build, or the
+        file itself.
+
+        Args:
+            entry (CachedFile): The requested file.
+
+        Returns:
+            tuple: The content encoding ("br", "gzip" or None for the file itself) and the CachedFile to be sent.
+
+        A sibling is only used if it has the modification time of the file, i.e. it was compressed from the
+        current version, so a stale sibling is never sent.
+        """
+        accepted = parse_accept_encoding(self.headers.get("Accept-Encoding", ""))
+        best = (0.0, None, entry)
+
+        for suffix, encoding in content_encodings:
+            quality = accepted.get(encoding, accepted.get("*", 0.0))
+
+            if quality <= best[0]:
+                continue
+
+            try:
+                sibling_stat = os.stat(entry.file_path + suffix)
+            except OSError:
+                continue
+
+            if sibling_stat.st_mtime_ns == entry.mtime_ns:
+                best = (quality, encoding, self.server.response_cache.get(entry.file_path + suffix, entry.content_type))
+
+        return best[1], best[2]
+
+    def find_file(self):
+        """
+        Finds the file a request is for, the index file of a directory requested with a trailing slash included.
+
+        Returns:
+            str: The path to the file, None if the request does not name a regular file.
+        """
+        file_path = self.translate_path(self.path)
+
+        if os.path.isdir(file_path):
+            if not urlsplit(self.path).path.endswith("/"):
+                return None
+
+            for index in ("index.html", "index.htm"):
+                index_path = os.path.join(file_path, index)
+
+                if os.path.isfile(index_path):
+                    return index_path
+            return None
+
+        if not os.path.isfile(file_path) or file_path.endswith("/"):
+            return None
+        return file_path
+
+    def not_modified(self, entry):
+        """
+        Evaluates the conditional headers of the request.
+
+        Args:
+            entry (CachedFile): The requested file.
+
+        Returns:
+            bool: True if the client's copy is current: If-None-Match names the ETag of the file or, without
+            If-None-Match, the file was not modified after If-Modified-Since.
+        """
+        if_none_match = self.headers.get("If-None-Match")
+
+        if if_none_match is not None:
+            etags = [etag.strip().removeprefix("W/") for etag in if_none_match.split(",")]
+            return "*" in etags or entry.etag in etags
+
+        if_modified_since = self.headers.get("If-Modified-Since")
+
+        if if_modified_since is None:
+            return False
+
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError, IndexError):
+            return False
+
+        if since.tzinfo is None:
+            return False
+        return entry.mtime_ns // 1_000_000_000 <= since.timestamp()
+
+    def send_validators(self, entry):
+        """
+        Sends the validators and the caching policy of a file.
+
+        Args:
+            entry (CachedFile): The served file.
+
+        Returns:
+            None
+        """
+        self.send_header("ETag", entry.etag)
+        self.send_header("Last-Modified", entry.last_modified)
+        self.send_header("Cache-Control", self.cache_control())
+        # the representation depends on the Accept-Encoding of the request
+        self.send_header("Vary", "Accept-Encoding")
+
+    def cache_control(self):
+        """
+        Chooses the Cache-Control value of the request.
+
+        Returns:
+            str: The value of the first rule whose pattern matches the URL path, else `default_cache_control`.
+        """
+        url_path = urlsplit(self.path).path
+
+        for pattern, value in self.server.cache_control:
+            if fnmatch(url_path, pattern):
+                return value
+        return default_cache_control
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+# HTTP server handling every connection on one thread of a fixed pool, so a slow client only blocks its own thread
+class PooledHTTPServer(HTTPServer):
+    # restarting the server must not wait for the connections of the previous one to time out
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        server_address,
+        handler_class,
+        workers=16,
+        quiet=False,
+        response_cache=None,
+        cache_control=(),
+        reuse_port=False,
+        page_renderer=None,
+        live_reload=None,
+    ):
+        """
+        Initializes a new instance of the PooledHTTPServer class, binding and listening on the address.
+
+        Parameters:
+            server_address (tuple): The (host, port) to listen on.
+            handler_class (type): The request handler class.
+            workers (int): The number of threads serving connections. Defaults to 16.
+            quiet (bool): Do not log every request. Defaults to False.
+            response_cache (ResponseCache): The cache of the served files. Defaults to None, which creates one with
+            the default limits.
+            cache_control (iterable): (URL path glob pattern, Cache-Control value) rules, the first matching one
+            applies. Defaults to (), which sends `default_cache_control`.
+            reuse_port (bool): Bind with SO_REUSEPORT, so the servers of several worker processes can listen on the
+            same port and the kernel spreads the connections between them. Defaults to False.
+            page_renderer (PageRenderer): Renders the pages of the content directory on request, instead of serving
+            the generated ones. Defaults to None.
+            live_reload (LiveReload): Reloads the open pages when the served files change. Defaults to None.
+        """
+        self.allow_reuse_port = reuse_port
+        self.page_renderer = page_renderer
+        self.live_reload = live_reload
+        self.workers = workers
+        self.quiet = quiet
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
+        self.cache_control = list(cache_control)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http")
+        # the backlog holds the connections waiting for a free thread
+        self.request_queue_size = max(workers * 4, 64)
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def shutdown_request(self, request):
+        # the event streams stay open after their request was handled
+        if self.live_reload is not None and self.live_reload.has_client(request):
+            return
+        super().shutdown_request(request)
+
+    def server_close(self, wait=False):
+        """
+        Closes the listening socket and stops the threads serving connections.
+
+        Args:
+            wait (bool, optional): Finish the accepted connections first, an idle keep-alive connection is closed
+            after the keep-alive timeout at most. Defaults to False, which drops the connections still queued.
+
+        Returns:
+            None
+        """
+        super().server_close()
+
+        if self.live_reload is not None:
+            self.live_reload.close()
+        self.executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+def serve_until_stopped(httpd):
+    """
+    Serves requests until SIGTERM or SIGINT, then stops accepting connections and finishes the accepted ones.
+
+    Args:
+        httpd (PooledHTTPServer): The server, already listening.
+
+    Returns:
+        None
+
+    Further signals are ignored while the connections are finished, which takes the keep-alive timeout at most.
+    """
+    def stop(signum, frame):
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        # shutdown waits for serve_forever to return, so it cannot run on the thread serving
+        threading.Thread(target=httpd.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.server_close(wait=True)
+
+
+def check_port(port):
+    """
+    Checks that worker processes can listen on a port, before any of them is started.
+
+    Args:
+        port (int): The port to be checked.
+
+    Returns:
+        None
+
+    Raises:
+        OSError: If the port is taken by a socket without SO_REUSEPORT, e.g. another program.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        probe.bind(("", port))
+
+
+def supervise(processes, serve_worker, restart_delay=1.0):
+    """
+    Runs a server in forked worker processes and restarts the ones that crash, until SIGTERM or SIGINT.
+
+    Args:
+        processes (int): The number of worker processes.
+        serve_worker (callable): The function run by every worker, it returns when the worker should exit.
+        restart_delay (float, optional): Seconds to wait before restarting a worker that crashed within this time
+        of being started, so a worker failing at once is not restarted in a busy loop. Defaults to 1.0.
+
+    Returns:
+        None
+
+    The first SIGTERM or SIGINT is forwarded to the workers as SIGTERM, which finish their connections and exit,
+    a second one kills them.
+    """
+    # pid -> time.monotonic() the worker was started at
+    workers = {}
+    stopping = False
+
+    def start_worker():
+        # a signal between the fork and the handlers of the worker would run the handlers of the supervisor in it
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTERM, signal.SIGINT})
+        # unflushed output would be written again by the worker
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+
+        if pid == 0:
+            code = 1
+
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.default_int_handler)
+                signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM, signal.SIGINT})
+                serve_worker()
+                code = 0
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+
+        workers[pid] = time.monotonic()
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM, signal.SIGINT})
+
+    def stop(signum, frame):
+        nonlocal stopping
+
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGKILL if stopping else signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(processes):
+        start_worker()
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+
+        started = workers.pop(pid)
+
+        if stopping:
+            continue
+
+        print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting it...")
+
+        if time.monotonic() - started < restart_delay:
+            time.sleep(restart_delay)
+        if not stopping:
+            start_worker()
+
 
 def run(
-    server_class=HTTPServer,
+    server_class=PooledHTTPServer,
     handler_class=CORSHTTPRequestHandler,
     port=8000,
     directory=None,
+    workers=16,
+    keep_alive_timeout=5,
+    quiet=False,
+    response_cache=None,
+    cache_control=(),
+    processes=1,
+    page_renderer=None,
+    live_reload=False,
 ):
-    if directory:  # Change the current working directory if directory is specified
-        os.chdir(directory)
+    handler_class.timeout = keep_alive_timeout
+    # the directory is looked up by every request instead of being the working directory, so flipping a symlink
+    # to it (see src/generations.py) publishes the new build to the running server
+    served_dir = os.path.abspath(directory or ".")
+    handler_class = functools.partial(handler_class, directory=served_dir)
     server_address = ("", port)
-    httpd = server_class(server_address, handler_class)
-    print(f"Serving HTTP on http://localhost:{port} from directory '{directory}'...")
-    httpd.serve_forever()
+
+    def serve_worker():
+        watched_paths = [served_dir]
+
+        if page_renderer is not None:
+            watched_paths += [page_renderer.content_dir, page_renderer.template_path]
+        reloader = LiveReload(watched_paths) if live_reload else None
+
+        # every worker process has its own server, threads, response cache and live reload
+        httpd = server_class(
+            server_address,
+            handler_class,
+            workers=workers,
+            quiet=quiet,
+            response_cache=response_cache,
+            cache_control=cache_control,
+            reuse_port=processes > 1,
+            page_renderer=page_renderer,
+            live_reload=reloader,
+        )
+
+        if reloader is not None:
+            reloader.start()
+        serve_until_stopped(httpd)
+
+    if processes <= 1:
+        print(f"Serving HTTP on http://localhost:{port} from directory '{directory}' with {workers} threads...")
+        serve_worker()
+        return
+
+    check_port(port)
+    print(
+        f"Serving HTTP on http://localhost:{port} from directory '{directory}' with {processes} processes of "
+        f"{workers} threads..."
+    )
+    supervise(processes, serve_worker)
 
 
 if __name__ == "__main__":
@@ -35,6 +1115,100 @@ if __name__ == "__main__":
         "--dir", type=str, help="Directory to serve files from", default="."
     )
     parser.add_argument("--port", type=int, help="Port to serve HTTP on", default=8080)
+    parser.add_argument(
+        "--threads", type=int, help="Number of threads serving connections", default=16
+    )
+    parser.add_argument(
+        "--keep-alive-timeout",
+        type=float,
+        help="Seconds an idle keep-alive connection is kept open",
+        default=5,
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help=(
+            "Number of processes listening on the port with SO_REUSEPORT, each with its own threads and cache, "
+            "crashed ones are restarted"
+        ),
+        default=1,
+    )
+    parser.add_argument("--quiet", action="store_true", help="Do not log every request")
+    parser.add_argument(
+        "--dev",
+        action="store_true",
+        help=(
+            "Render the pages of the content directory when they are requested instead of serving a build, "
+            "other files are served from --dir, e.g. --dir static"
+        ),
+    )
+    parser.add_argument(
+        "--live-reload",
+        action="store_true",
+        help=(
+            "Reload the open pages when the served files (and with --dev the content and template) change, "
+            "e.g. rebuilt by 'src/main.py --watch'"
+        ),
+    )
+    parser.add_argument("--content", type=str, help="Content directory of --dev", default="content")
+    parser.add_argument("--template", type=str, help="Default template of --dev", default="template.html")
+    parser.add_argument(
+        "--var",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Value of a {{ NAME }} placeholder of the templates of --dev, can be repeated",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=float,
+        help="Megabytes of file contents kept in memory",
+        default=64,
+    )
+    parser.add_argument(
+        "--cache-max-file",
+        type=float,
+        help="Megabytes above which a file is served from disk instead of memory",
+        default=1,
+    )
+    parser.add_argument(
+        "--cache-control",
+        action="append",
+        default=[],
+        metavar="PATTERN=VALUE",
+        help=(
+            "Cache-Control of the URL paths matching a glob pattern, e.g. '/images/*=public, max-age=86400', "
+            f"can be repeated, the first match applies (default: {default_cache_control})"
+        ),
+    )
     args = parser.parse_args()
 
-    run(port=args.port, directory=args.dir)
+    try:
+        cache_control = [parse_cache_control_rule(rule) for rule in args.cache_control]
+    except ValueError as error:
+        parser.error(str(error))
+
+    variables = {}
+    for var in args.var:
+        name, separator, value = var.partition("=")
+        if separator == "" or name.strip() == "":
+            parser.error(f"invalid --var {var!r}, expected NAME=VALUE")
+        variables[name.strip()] = value
+
+    if args.workers < 1:
+        parser.error(f"Invalid number of workers: {args.workers}")
+    if args.workers > 1 and not (hasattr(socket, "SO_REUSEPORT") and hasattr(os, "fork")):
+        parser.error("--workers needs SO_REUSEPORT and fork, which this platform does not support")
+
+    run(
+        port=args.port,
+        directory=args.dir,
+        workers=args.threads,
+        keep_alive_timeout=args.keep_alive_timeout,
+        quiet=args.quiet,
+        response_cache=ResponseCache(int(args.cache_size * 1024 * 1024), int(args.cache_max_file * 1024 * 1024)),
+        cache_control=cache_control,
+        processes=args.workers,
+        page_renderer=PageRenderer(args.content, args.template, variables) if args.dev else None,
+        live_reload=args.live_reload,
+    )
@@ -0,0 +1,124 @@
+import gc
+import argparse
+import tracemalloc
+
+from htmlnode import LeafNode, ParentNode
+from textnode import TextNode
+from inline_markdown import text_to_textnodes
+from markdown_block import markdown_to_html_node
+
+
+# the same classes with a per-instance __dict__, the layout the nodes had before __slots__
+class DictLeafNode(LeafNode):
+    pass
+
+
+class DictParentNode(ParentNode):
+    pass
+
+
+class DictTextNode(TextNode):
+    pass
+
+
+def synthetic_markdown(paragraphs):
+    """
+    Generates a long markdown document mixing headings, paragraphs with inline markup, lists and quotes.
+
+    Args:
+        paragraphs (int): The number of sections of the document.
+
+    Returns:
+        str: The markdown document.
+    """
+    sections = []
+
+    for i in range(paragraphs):
+        sections.append(f"## Section {i}")
+        sections.append(
+            f"Paragraph {i} has **bold text**, *italic text*, `code` and a [link](https://example.com/{i}) "
+            f"next to an ![image](/images/{i}.png) and some plain words after them."
+        )
+        sections.append(f"- first item {i}\n- second *item*\n- third `item`")
+        sections.append(f"> quoted line {i}\n> another quoted line")
+    return "\n\n".join(sections)
+
+
+def copy_html_tree(node, leaf_class, parent_class):
+    """
+    Copies an HTML node tree into the given node classes, sharing the strings and properties of the original.
+
+    Args:
+        node (HTMLNode): The root of the tree to be copied.
+        leaf_class (type): The class of the copied leaf nodes.
+        parent_class (type): The class of the copied parent nodes.
+
+    Returns:
+        HTMLNode: The root of the copied tree.
+    """
+    if node.children is None:
+        return leaf_class(node.tag, node.value, node.props)
+    return parent_class(node.tag, [copy_html_tree(child, leaf_class, parent_class) for child in node.children])
+
+
+def count_nodes(node):
+    """
+    Counts the nodes of an HTML node tree.
+
+    Args:
+        node (HTMLNode): The root of the tree.
+
+    Returns:
+        int: The number of nodes, the root included.
+    """
+    if node.children is None:
+        return 1
+    return 1 + sum(count_nodes(child) for child in node.children)
+
+
+def measure(build):
+    """
+    Measures the memory allocated by a function and kept alive by its result.
+
+    Args:
+        build (callable): The function building the measured objects.
+
+    Returns:
+        tuple: The result of the function and the number of bytes it holds.
+    """
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    return result, tracemalloc.get_traced_memory()[0] - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory used per HTML and text node")
+    parser.add_argument("--paragraphs", type=int, default=5000, help="Number of sections of the synthetic document")
+    args = parser.parse_args()
+
+    markdown = synthetic_markdown(args.paragraphs)
+    html_tree = markdown_to_html_node(markdown)
+    html_nodes = count_nodes(html_tree)
+    lines = markdown.split("\n")
+    text_nodes = [node for line in lines for node in text_to_textnodes(line)]
+
+    tracemalloc.start()
+
+    # the strings are shared with the original tree, so only the nodes themselves are measured
+    _, slots_html = measure(lambda: copy_html_tree(html_tree, LeafNode, ParentNode))
+    _, dict_html = measure(lambda: copy_html_tree(html_tree, DictLeafNode, DictParentNode))
+    _, slots_text = measure(lambda: [TextNode(node.text, node.text_type, node.url) for node in text_nodes])
+    _, dict_text = measure(lambda: [DictTextNode(node.text, node.text_type, node.url) for node in text_nodes])
+
+    tracemalloc.stop()
+
+    print(f"synthetic document: {len(markdown)} characters, {html_nodes} HTML nodes, {len(text_nodes)} text nodes")
+    print(f"{'':12}{'before (__dict__)':>20}{'after (__slots__)':>20}")
+    print(f"{'HTMLNode':12}{dict_html / html_nodes:>14.1f} B/node{slots_html / html_nodes:>14.1f} B/node")
+    print(f"{'TextNode':12}{dict_text / len(text_nodes):>14.1f} B/node{slots_text / len(text_nodes):>14.1f} B/node")
+
+
+if __name__ == "__main__":
+    main()
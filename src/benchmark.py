@@ -0,0 +1,609 @@
+import sys
+import json
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+import os.path as path
+
+from os import chdir, getcwd, makedirs, remove, wait4, waitstatus_to_exitcode
+from shutil import rmtree
+from time import perf_counter
+from datetime import datetime as dt
+from build_log import BuildLog, copy_log_path
+from copystatic import find_static_files, sync_static_to_public
+from generate_static import configure_block_cache, find_pages, generate_page
+from inline_markdown import text_to_textnodes
+from markdown_block import (
+    markdown_to_blocks,
+    block_to_block_type,
+    markdown_to_html_node,
+    block_type_heading,
+    block_type_paragraph,
+    block_type_quote,
+)
+
+src_dir = path.dirname(path.abspath(__file__))
+
+# runs under tracemalloc measuring the peak memory of every stage
+memory_runs = 5
+# default allowed slowdown in percent of the stages writing files, instead of the threshold of the other stages:
+# their timings vary much more between runs on a shared machine, copying the static files most with the write-back
+# of the disk
+io_thresholds = {"generate_page": 100.0, "sync_static_to_public": 150.0, "main": 100.0}
+
+# relative weight of every block kind in the generated pages
+default_block_mix = {"paragraph": 6, "heading": 2, "list": 2, "ordered": 1, "code": 1, "quote": 1}
+
+words = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et dolore "
+    "magna aliqua ut enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo"
+).split()
+
+template = """<!DOCTYPE html>
+<html>
+	<head>
+		<title> {{ Title }} </title>
+		<link href="/index.css" rel="stylesheet" />
+	</head>
+
+	<body>
+		<article> {{ Content }} </article>
+	</body>
+</html>
+"""
+
+
+def sentence(rng, link_density):
+    """
+    Generates a sentence with random inline markup.
+
+    Args:
+        rng (random.Random): The random generator of the corpus.
+        link_density (float): The probability of every sentence to contain a link (and separately an image).
+
+    Returns:
+        str: The sentence.
+    """
+    parts = [rng.choice(words) for _ in range(rng.randint(6, 14))]
+    markup = rng.random()
+
+    if markup < 0.2:
+        parts[1] = f"**{parts[1]}**"
+    elif markup < 0.4:
+        parts[1] = f"*{parts[1]}*"
+    elif markup < 0.5:
+        parts[1] = f"`{parts[1]}`"
+
+    if rng.random() < link_density:
+        parts.append(f"[{rng.choice(words)}](https://example.com/{rng.randint(0, 9999)})")
+    if rng.random() < link_density / 4:
+        parts.append(f"![{rng.choice(words)}](/images/{rng.randint(0, 99)}.png)")
+    return " ".join(parts) + "."
+
+
+def block(rng, kind, link_density):
+    """
+    Generates a markdown block of the given kind.
+
+    Args:
+        rng (random.Random): The random generator of the corpus.
+        kind (str): One of the keys of `default_block_mix`.
+        link_density (float): See `sentence`.
+
+    Returns:
+        str: The markdown block.
+    """
+    if kind == "heading":
+        return "#" * rng.randint(2, 4) + " " + " ".join(rng.choice(words) for _ in range(rng.randint(2, 6)))
+    if kind == "list":
+        return "\n".join(f"- {sentence(rng, link_density)}" for _ in range(rng.randint(2, 6)))
+    if kind == "ordered":
+        return "\n".join(f"{i}. {sentence(rng, link_density)}" for i in range(1, rng.randint(3, 7)))
+    if kind == "code":
+        return "```\n" + "\n".join(" ".join(rng.choice(words) for _ in range(5)) for _ in range(4)) + "\n```"
+    if kind == "quote":
+        return "\n".join(f"> {sentence(rng, link_density)}" for _ in range(rng.randint(1, 3)))
+    return "\n".join(sentence(rng, link_density) for _ in range(rng.randint(2, 6)))
+
+
+def generate_corpus(
+        root,
+        pages=200,
+        blocks=30,
+        block_mix=None,
+        link_density=0.3,
+        depth=2,
+        static_files=20,
+        static_size=64 * 1024,
+        seed=0,
+):
+    """
+    Generates a deterministic synthetic site to benchmark the builder on.
+
+    Args:
+        root (str): The directory the site is generated in, with "content", "static", "logs" and "template.html".
+        pages (int, optional): The number of markdown pages. Defaults to 200.
+        blocks (int, optional): The number of blocks of every page, after its title. Defaults to 30.
+        block_mix (dict, optional): The relative weight of every block kind. Defaults to `default_block_mix`.
+        link_density (float, optional): The probability of a sentence to contain a link. Defaults to 0.3.
+        depth (int, optional): The maximal nesting depth of the content directories. Defaults to 2.
+        static_files (int, optional): The number of static files. Defaults to 20.
+        static_size (int, optional): The size of every static file in bytes. Defaults to 64 KiB.
+        seed (int, optional): The seed of the random generator, the same seed always generates the same site.
+        Defaults to 0.
+
+    Returns:
+        None
+    """
+    rng = random.Random(seed)
+    block_mix = block_mix or default_block_mix
+    kinds = sorted(block_mix)
+    weights = [block_mix[kind] for kind in kinds]
+
+    for dir_name in ("content", "static", "logs"):
+        makedirs(path.join(root, dir_name), exist_ok=True)
+
+    with open(path.join(root, "template.html"), "w") as file:
+        file.write(template)
+
+    for i in range(pages):
+        dir_parts = [f"section{rng.randint(0, 4)}" for _ in range(rng.randint(0, depth))]
+        page_dir = path.join(root, "content", *dir_parts)
+        makedirs(page_dir, exist_ok=True)
+
+        page_blocks = [f"# Page {i} " + " ".join(rng.choice(words) for _ in range(3))]
+        page_blocks.extend(block(rng, kind, link_density) for kind in rng.choices(kinds, weights, k=blocks))
+
+        with open(path.join(page_dir, f"page{i}.md"), "w") as file:
+            file.write("\n\n".join(page_blocks) + "\n")
+
+    for i in range(static_files):
+        static_dir = path.join(root, "static", f"assets{i % 3}")
+        makedirs(static_dir, exist_ok=True)
+
+        with open(path.join(static_dir, f"file{i}.bin"), "wb") as file:
+            file.write(rng.randbytes(static_size))
+
+
+def inline_texts(blocks):
+    """
+    Collects the inline text `text_to_textnodes` is called with for the paragraph, heading and quote blocks.
+
+    Args:
+        blocks (list): The markdown blocks.
+
+    Returns:
+        list: The inline texts.
+    """
+    texts = []
+
+    for cur_block in blocks:
+        block_type = block_to_block_type(cur_block)
+
+        if block_type == block_type_paragraph:
+            texts.append(" ".join(cur_block.split("\n")))
+        elif block_type == block_type_heading:
+            texts.append(cur_block.lstrip("#").strip())
+        elif block_type == block_type_quote:
+            texts.append(" ".join(line.lstrip(">").strip() for line in cur_block.split("\n")))
+    return texts
+
+
+def stages(root, work_dir, log=None):
+    """
+    Prepares the benchmarked stages of a generated site.
+
+    Args:
+        root (str): The directory of the generated site.
+        work_dir (str): A scratch directory the stages write their output to.
+        log (BuildLog, optional): The copy log the static stage writes to, open for every run like the log of a
+        build. Defaults to None, which opens the copy log for every run.
+
+    Returns:
+        dict: For every stage name, a tuple of the function running the stage over the whole site, the number of
+        pages it processes (None if it does not process pages) and the number of input bytes. A stage running in
+        a child process returns the peak memory of the child in bytes, the others return None.
+    """
+    pages = find_pages(path.join(root, "content"), path.join(work_dir, "public"))
+    markdowns = []
+
+    for src, _ in pages:
+        with open(src, "r") as file:
+            markdowns.append(file.read())
+
+    markdown_bytes = sum(len(markdown.encode()) for markdown in markdowns)
+    blocks = [cur_block for markdown in markdowns for cur_block in markdown_to_blocks(markdown)]
+    texts = inline_texts(blocks)
+    trees = [markdown_to_html_node(markdown) for markdown in markdowns]
+    template_path = path.join(root, "template.html")
+    static_dir = path.join(root, "static")
+    static_bytes = sum(path.getsize(src) for src, _ in find_static_files(static_dir, static_dir)[0])
+
+    def split_blocks():
+        for markdown in markdowns:
+            markdown_to_blocks(markdown)
+
+    def block_types():
+        for cur_block in blocks:
+            block_to_block_type(cur_block)
+
+    def split_inline():
+        for text in texts:
+            text_to_textnodes(text)
+
+    def render_trees():
+        for tree in trees:
+            tree.to_html()
+
+    def sync_static():
+        # a first build, syncing into an empty public directory without a previous state
+        dst = path.join(work_dir, "static_copy")
+        state_path = path.join(work_dir, "static_manifest.json")
+        rmtree(dst, ignore_errors=True)
+
+        if path.exists(state_path):
+            remove(state_path)
+        sync_static_to_public(static_dir, dst, state_path, log=log)
+
+    def generate_pages():
+        # the block cache of this process outlives the runs, every run has to render the blocks again, and write
+        # them into an empty directory, outputs left by the previous run would be identical and never written
+        configure_block_cache().clear()
+        rmtree(path.join(work_dir, "public"), ignore_errors=True)
+
+        for src, dst in pages:
+            generate_page(src, template_path, dst)
+
+    def end_to_end():
+        args = [sys.executable, path.join(src_dir, "main.py")]
+
+        with subprocess.Popen(args, cwd=root, stdout=subprocess.DEVNULL) as process:
+            # wait4 reports the resource usage of this very child, its maximum RSS is in KiB on Linux
+            _, status, usage = wait4(process.pid, 0)
+            process.returncode = waitstatus_to_exitcode(status)
+
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, args)
+        return usage.ru_maxrss * 1024
+
+    # public has to exist before the first build deletes its content
+    makedirs(path.join(root, "public"), exist_ok=True)
+
+    return {
+        "markdown_to_blocks": (split_blocks, len(pages), markdown_bytes),
+        "block_to_block_type": (block_types, len(pages), markdown_bytes),
+        "text_to_textnodes": (split_inline, len(pages), markdown_bytes),
+        "to_html": (render_trees, len(pages), markdown_bytes),
+        "generate_page": (generate_pages, len(pages), markdown_bytes),
+        "sync_static_to_public": (sync_static, None, static_bytes),
+        "main": (end_to_end, len(pages), markdown_bytes + static_bytes),
+    }
+
+
+def time_stage(run, loops=1):
+    """
+    Times the runs of a stage.
+
+    Args:
+        run (callable): The function running the stage.
+        loops (int, optional): The number of consecutive runs. Defaults to 1.
+
+    Returns:
+        float: The mean wall time of a run in seconds.
+    """
+    start = perf_counter()
+    for _ in range(loops):
+        run()
+    return (perf_counter() - start) / loops
+
+
+def calibrate(run, min_time=0.1):
+    """
+    Chooses how many consecutive runs of a stage make up one timed sample, like `timeit` does.
+
+    Args:
+        run (callable): The function running the stage.
+        min_time (float, optional): The minimal wall time of a sample in seconds. Defaults to 0.1.
+
+    Returns:
+        int: The number of runs per sample, so that stages taking milliseconds are not dominated by timer and
+        scheduler noise.
+    """
+    seconds = time_stage(run)
+    return max(1, round(min_time / seconds)) if seconds > 0 else 1000
+
+
+def peak_memory(run):
+    """
+    Measures the peak memory of a single run of a stage.
+
+    Args:
+        run (callable): The function running the stage.
+
+    Returns:
+        int: The peak of the memory allocated by Python during the run in bytes, or the peak RSS of the child
+        process for a stage returning it.
+    """
+    tracemalloc.start()
+    try:
+        child_peak = run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return child_peak if child_peak is not None else peak
+
+
+def summarize(samples):
+    """
+    Calculates robust statistics of the timings of a stage.
+
+    Args:
+        samples (list): The wall times of the repeated runs in seconds.
+
+    Returns:
+        dict: The "median", the first and third quartiles "q1" and "q3", the interquartile range "iqr" and the
+        "min" of the samples.
+    """
+    median = statistics.median(samples)
+
+    if len(samples) > 1:
+        q1, _, q3 = statistics.quantiles(samples, n=4, method="inclusive")
+    else:
+        q1 = q3 = median
+    return {"median": median, "q1": q1, "q3": q3, "iqr": q3 - q1, "min": min(samples)}
+
+
+def run_benchmark(root, work_dir, selected=None, repeat=1, min_time=0.1):
+    """
+    Times every stage of the builder on a generated site.
+
+    Args:
+        root (str): The directory of the generated site.
+        work_dir (str): A scratch directory the stages write their output to.
+        selected (list, optional): The names of the stages to run, all of them when None. Defaults to None.
+        repeat (int, optional): The number of timed samples of every stage. Defaults to 1.
+        min_time (float, optional): The minimal wall time of a sample in seconds, see `calibrate`. Defaults to 0.1.
+
+    Returns:
+        dict: For every stage, its median wall time of a run in "seconds" with the statistics of `summarize`, the
+        "samples" and the runs per sample in "loops", its "peak_memory" in bytes, its throughput in
+        "pages_per_sec" (None for stages not processing pages) and "mb_per_sec" of input.
+
+    Every stage first runs once untraced to warm up and calibrate, then `memory_runs` times under tracemalloc for
+    its smallest peak memory (the tracing slows it down too much to time it at the same time, and the peak of a
+    stage using threads depends on how many of them the scheduler started). Then `repeat` rounds time one sample
+    of every stage each, so a period of load on the machine slows down a sample of every stage rather than every
+    sample of one stage.
+    """
+    loops = {}
+    memory = {}
+
+    # a build opens its logs once, the buffer of the log is not part of what a stage allocates
+    with BuildLog(copy_log_path) as log:
+        selected_stages = {
+            name: stage for name, stage in stages(root, work_dir, log).items() if not selected or name in selected
+        }
+        samples = {name: [] for name in selected_stages}
+
+        for name, (run, _, _) in selected_stages.items():
+            loops[name] = calibrate(run, min_time)
+            memory[name] = min(peak_memory(run) for _ in range(memory_runs))
+
+        for _ in range(repeat):
+            for name, (run, _, _) in selected_stages.items():
+                samples[name].append(time_stage(run, loops[name]))
+
+    results = {}
+
+    for name, (_, page_count, input_bytes) in selected_stages.items():
+        seconds = statistics.median(samples[name])
+        results[name] = {
+            "seconds": seconds,
+            **summarize(samples[name]),
+            "samples": samples[name],
+            "loops": loops[name],
+            "peak_memory": memory[name],
+            "pages_per_sec": page_count / seconds if page_count is not None else None,
+            "mb_per_sec": input_bytes / 1e6 / seconds,
+        }
+    return results
+
+
+def compare_results(baseline, current, threshold=25.0, memory_threshold=10.0, stage_thresholds=None):
+    """
+    Compares the stages of a benchmark run to a baseline run.
+
+    Args:
+        baseline (dict): The stage results of the baseline run, see `run_benchmark`.
+        current (dict): The stage results of the current run.
+        threshold (float, optional): The slowdown of the fastest sample in percent a stage is allowed. Defaults to
+        25.
+        memory_threshold (float, optional): The growth of the peak memory in percent a stage is allowed.
+        Defaults to 10.
+        stage_thresholds (dict, optional): The slowdown in percent allowed to single stages instead of the
+        threshold. Defaults to `io_thresholds`.
+
+    Returns:
+        tuple: The lines of a readable report and the list of the regressed stage names.
+
+    The stages are compared by their fastest sample, since noise on a shared machine only ever adds time to a
+    sample. A stage is only slower if that exceeds the threshold and its timings do not overlap with the baseline
+    ones either, i.e. its first quartile is above the third quartile of the baseline. Stages missing from either
+    run are reported and skipped.
+    """
+    stage_thresholds = io_thresholds if stage_thresholds is None else stage_thresholds
+    lines = [f"{'stage':24}{'baseline':>12}{'current':>12}{'change':>10}{'memory':>10}  status"]
+    regressions = []
+
+    for name in list(current) + [stage for stage in baseline if stage not in current]:
+        if name not in baseline or name not in current:
+            lines.append(f"{name:24}{'missing from the ' + ('baseline' if name not in baseline else 'run'):>44}")
+            continue
+
+        old, new = baseline[name], current[name]
+        change = (new["min"] / old["min"] - 1) * 100
+        memory_change = (new["peak_memory"] / old["peak_memory"] - 1) * 100 if old["peak_memory"] else 0.0
+        slower = change > stage_thresholds.get(name, threshold) and new["q1"] > old["q3"]
+        problems = []
+
+        if slower:
+            problems.append("SLOWER")
+        if memory_change > memory_threshold:
+            problems.append("MORE MEMORY")
+        if problems:
+            regressions.append(name)
+
+        lines.append(
+            f"{name:24}{old['min'] * 1000:>10.2f}ms{new['min'] * 1000:>10.2f}ms{change:>+9.1f}%"
+            f"{memory_change:>+9.1f}%  {', '.join(problems) or 'ok'}"
+        )
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the build stages on a synthetic site")
+    parser.add_argument("--pages", type=int, default=200, help="Number of generated pages")
+    parser.add_argument("--blocks", type=int, default=30, help="Number of blocks per page")
+    parser.add_argument(
+        "--block-mix",
+        type=str,
+        default=None,
+        help="Weights of the block kinds as JSON, e.g. '{\"paragraph\": 5, \"code\": 1}'",
+    )
+    parser.add_argument("--link-density", type=float, default=0.3, help="Probability of a link per sentence")
+    parser.add_argument("--depth", type=int, default=2, help="Maximal nesting depth of the content directories")
+    parser.add_argument("--static-files", type=int, default=20, help="Number of static files")
+    parser.add_argument("--static-size", type=int, default=64 * 1024, help="Size of every static file in bytes")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the corpus generator")
+    parser.add_argument("--stage", action="append", default=[], help="Stage to run, can be repeated (all by default)")
+    parser.add_argument("--repeat", type=int, default=15, help="Number of timed samples of every stage")
+    parser.add_argument("--min-time", type=float, default=0.1, help="Minimal wall time of a sample in seconds")
+    parser.add_argument("--output", type=str, default="benchmark.json", help="JSON file the results are written to")
+    parser.add_argument(
+        "--compare",
+        type=str,
+        default=None,
+        help="Baseline JSON to compare the results to, exits with an error when a stage regressed",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=25.0,
+        help="Allowed slowdown of a stage in percent, except for the stages given a --stage-threshold",
+    )
+    parser.add_argument(
+        "--stage-threshold",
+        action="append",
+        default=[],
+        metavar="NAME=PCT",
+        help=(
+            "Allowed slowdown of the stage NAME in percent, can be repeated (defaults: "
+            + ", ".join(f"{name}={threshold:g}" for name, threshold in io_thresholds.items())
+            + ")"
+        ),
+    )
+    parser.add_argument(
+        "--memory-threshold",
+        type=float,
+        default=10.0,
+        help="Allowed growth of the peak memory of a stage in percent",
+    )
+    args = parser.parse_args()
+
+    stage_thresholds = dict(io_thresholds)
+    for stage_threshold in args.stage_threshold:
+        name, _, threshold = stage_threshold.partition("=")
+        try:
+            threshold = float(threshold)
+        except ValueError:
+            parser.error(f"invalid --stage-threshold {stage_threshold!r}, expected NAME=PCT")
+        if name.strip() == "":
+            parser.error(f"invalid --stage-threshold {stage_threshold!r}, expected NAME=PCT")
+        stage_thresholds[name.strip()] = threshold
+
+    corpus = {
+        "pages": args.pages,
+        "blocks": args.blocks,
+        "block_mix": json.loads(args.block_mix) if args.block_mix else default_block_mix,
+        "link_density": args.link_density,
+        "depth": args.depth,
+        "static_files": args.static_files,
+        "static_size": args.static_size,
+        "seed": args.seed,
+    }
+    baseline = None
+
+    if args.compare is not None:
+        with open(args.compare, "r") as file:
+            baseline = json.load(file)
+
+        # timings of different sites cannot be compared
+        if baseline["corpus"] != corpus:
+            parser.error(f"Invalid baseline: {args.compare} was measured on the corpus {baseline['corpus']}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = path.join(tmp_dir, "site")
+        work_dir = path.join(tmp_dir, "work")
+        makedirs(work_dir)
+        generate_corpus(root, **corpus)
+        print(f"Benchmarking {args.pages} pages generated in {root}...")
+
+        # the stages log relative to the working directory
+        makedirs(path.join(work_dir, "logs"))
+        cwd = getcwd()
+        try:
+            chdir(work_dir)
+            stage_results = run_benchmark(root, work_dir, args.stage, args.repeat, args.min_time)
+        finally:
+            chdir(cwd)
+
+        report = {
+            "created": dt.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus": corpus,
+            "stages": stage_results,
+        }
+
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+        for name, result in stage_results.items():
+            pages_per_sec = f"{result['pages_per_sec']:10.1f} pages/s" if result["pages_per_sec"] else " " * 18
+            print(f"{name:24}{result['seconds']:9.4f} s{pages_per_sec}{result['mb_per_sec']:9.2f} MB/s")
+        print(f"Results written to {args.output}")
+
+        if baseline is None:
+            return
+
+        thresholds = (args.threshold, args.memory_threshold, stage_thresholds)
+        lines, regressions = compare_results(baseline["stages"], stage_results, *thresholds)
+        print()
+        print(f"Compared to {args.compare} (created {baseline['created']}):")
+        print("\n".join(lines))
+
+        # a regression has to show up again in a second run of its stage, a burst of load on the machine does not
+        if regressions:
+            print()
+            print(f"Running {', '.join(regressions)} again to confirm the regression...")
+            try:
+                chdir(work_dir)
+                rerun_results = run_benchmark(root, work_dir, regressions, args.repeat, args.min_time)
+            finally:
+                chdir(cwd)
+
+            rerun_baseline = {name: baseline["stages"][name] for name in regressions}
+            lines, confirmed = compare_results(rerun_baseline, rerun_results, *thresholds)
+            print("\n".join(lines))
+            regressions = [name for name in regressions if name in confirmed]
+
+        if regressions:
+            sys.exit(f"Performance regression in {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import json
+import sqlite3
+import hashlib
+import os.path as path
+
+from os import getpid, makedirs
+from collections import OrderedDict
+from document import block_metadata
+from markdown_block import block_to_html_node
+
+# modules whose code decides how a block is rendered, their source is part of every cache key
+parser_modules = ["markdown_block.py", "inline_markdown.py", "textnode.py", "htmlnode.py", "document.py"]
+# bump to invalidate every cached block, e.g. when the cached data changes shape
+cache_format = 1
+# approximate memory of a cached block besides its HTML: the key, the tuple, the metadata and the dict slot
+entry_overhead = 600
+
+
+def parser_version():
+    """
+    Calculates the version of the block parser from the source code of the modules rendering a block.
+
+    Returns:
+        str: A hash changing whenever the code of one of the parser modules (or the cache format) changes, so
+        blocks cached by an older parser are never reused.
+    """
+    digest = hashlib.sha256(str(cache_format).encode())
+    src_dir = path.dirname(path.abspath(__file__))
+
+    for module in parser_modules:
+        with open(path.join(src_dir, module), "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+# rendered HTML and metadata of markdown blocks, keyed by the hash of the block and the parser version
+# in-memory with LRU eviction, optionally backed by a sqlite database shared across builds
+class BlockCache:
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, db_path=None, max_block_size=1024 * 1024,
+                 max_memory_block_size=4096):
+        """
+        Initializes a new instance of the BlockCache class.
+
+        Parameters:
+            max_bytes (int): The approximate memory of the blocks kept in memory, their HTML and an `entry_overhead`
+            each. Defaults to 16 MiB.
+            db_path (str): The path to the sqlite database persisting the cache, None for a memory-only cache.
+            Defaults to None.
+            max_block_size (int): Blocks longer than this are rendered without being cached. Defaults to 1 MiB.
+            max_memory_block_size (int): Blocks rendering to longer HTML than this are only cached in the database,
+            they seldom repeat and would hold a whole page in memory. Defaults to 4 KiB.
+        """
+        self.max_bytes = max_bytes
+        self.max_block_size = max_block_size
+        self.max_memory_block_size = max_memory_block_size
+        self.db_path = db_path
+        # process owning the cache, a forked worker must set up its own
+        self.pid = getpid()
+        self.version = parser_version()
+        # key -> (html, metadata), least recently used first
+        self.entries = OrderedDict()
+        # approximate memory of the entries, see `entry_overhead`
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+
+        if db_path is not None:
+            db_dir_path = path.dirname(db_path)
+
+            if db_dir_path != "":
+                makedirs(db_dir_path, exist_ok=True)
+
+            # several build processes may share the database
+            self.db = sqlite3.connect(db_path, timeout=60)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS blocks (key TEXT PRIMARY KEY, html TEXT NOT NULL, metadata TEXT NOT NULL)"
+            )
+            self.db.commit()
+
+    def key(self, block):
+        """
+        Calculates the cache key of a block.
+
+        Args:
+            block (str): The markdown block.
+
+        Returns:
+            str: The hash of the parser version and the block.
+        """
+        return hashlib.sha256(f"{self.version}\0{block}".encode()).hexdigest()
+
+    def render(self, block, block_type=None):
+        """
+        Returns the rendered HTML and the metadata of a block, rendering it only if it is not cached yet.
+
+        Args:
+            block (str): The markdown block.
+            block_type (str, optional): The type of the block, if the caller already knows it. Defaults to None.
+
+        Returns:
+            tuple: The HTML (str) and the metadata (dict, see `block_metadata`) of the block.
+        """
+        if len(block) > self.max_block_size:
+            self.misses += 1
+            return self.render_block(block, block_type)
+
+        key = self.key(block)
+        cached = self.entries.get(key)
+
+        if cached is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return cached
+
+        if self.db is not None:
+            row = self.db.execute("SELECT html, metadata FROM blocks WHERE key = ?", (key,)).fetchone()
+
+            if row is not None:
+                cached = (row[0], json.loads(row[1]))
+                self.remember(key, cached)
+                self.hits += 1
+                return cached
+
+        self.misses += 1
+        rendered = self.render_block(block, block_type)
+        self.remember(key, rendered)
+
+        if self.db is not None:
+            self.db.execute(
+                "INSERT OR REPLACE INTO blocks (key, html, metadata) VALUES (?, ?, ?)",
+                (key, rendered[0], json.dumps(rendered[1])),
+            )
+        return rendered
+
+    def render_block(self, block, block_type):
+        """
+        Renders a block without looking at the cache.
+
+        Args:
+            block (str): The markdown block.
+            block_type (str): The type of the block, or None to determine it.
+
+        Returns:
+            tuple: The HTML (str) and the metadata (dict) of the block.
+        """
+        node = block_to_html_node(block, block_type)
+        return node.to_html(), block_metadata(node)
+
+    def remember(self, key, rendered):
+        """
+        Stores a rendered block in memory, evicting the least recently used ones while the cache is over its size.
+
+        Args:
+            key (str): The cache key of the block.
+            rendered (tuple): The HTML and the metadata of the block.
+
+        Returns:
+            None
+        """
+        if len(rendered[0]) > self.max_memory_block_size or len(rendered[0]) + entry_overhead > self.max_bytes:
+            return
+
+        old_rendered = self.entries.pop(key, None)
+
+        if old_rendered is not None:
+            self.size -= len(old_rendered[0]) + entry_overhead
+
+        self.entries[key] = rendered
+        self.size += len(rendered[0]) + entry_overhead
+
+        while self.size > self.max_bytes:
+            _, (html, _) = self.entries.popitem(last=False)
+            self.size -= len(html) + entry_overhead
+
+    def flush(self):
+        """
+        Commits the blocks rendered since the last flush to the database, if the cache has one.
+
+        Returns:
+            None
+        """
+        if self.db is not None:
+            self.db.commit()
+
+    def clear(self):
+        """
+        Forgets the blocks kept in memory, e.g. so a benchmark renders every block again. The database is kept.
+
+        Returns:
+            None
+        """
+        self.entries.clear()
+        self.size = 0
+
+    def close(self):
+        """
+        Flushes and closes the database of the cache, if it has one.
+
+        Returns:
+            None
+        """
+        if self.db is not None:
+            self.db.commit()
+            self.db.close()
+            self.db = None
+
+    def __repr__(self):
+        """
+        Return a string representation of the BlockCache object.
+
+        :return: A string representation of the BlockCache object.
+        :rtype: str
+        """
+        return f"BlockCache({len(self.entries)} entries, {self.size} bytes, {self.hits} hits, {self.misses} misses)"
@@ -0,0 +1,163 @@
+import json
+import os.path as path
+
+from os import makedirs, remove, replace
+from datetime import datetime as dt
+
+# structured logs of the build, relative to the working directory like the old text logs
+copy_log_path = "./logs/copy_log.jsonl"
+conversion_log_path = "./logs/conversion_log.jsonl"
+
+
+def log_record(event, file_path=None, size=None, duration=None, **fields):
+    """
+    Creates a structured log record.
+
+    Args:
+        event (str): What happened, e.g. "copy", "page" or "delete".
+        file_path (str, optional): The file or directory the event is about. Defaults to None.
+        size (int, optional): The number of bytes written or copied. Defaults to None.
+        duration (float, optional): The wall time of the event in seconds. Defaults to None.
+        **fields: Additional details of the event, e.g. the source of a copy.
+
+    Returns:
+        dict: The record with its "time", "event" and the given fields, fields without value are left out.
+    """
+    record = {"time": dt.now().isoformat(), "event": event}
+
+    if file_path is not None:
+        record["path"] = file_path
+    if size is not None:
+        record["bytes"] = size
+    if duration is not None:
+        record["duration"] = duration
+
+    record.update(fields)
+    return record
+
+
+# JSON lines log with a single buffered handle, rotated when it grows too big
+class BuildLog:
+
+    def __init__(self, log_path, max_bytes=10 * 1024 * 1024, backups=3, buffer_size=64 * 1024):
+        """
+        Initializes a new instance of the BuildLog class, opening the log file for appending.
+
+        Parameters:
+            log_path (str): The path to the log file, its directory is created if needed.
+            max_bytes (int): The size the log may reach before it is rotated, 0 never rotates. Defaults to 10 MiB.
+            backups (int): The number of rotated logs kept as "<log>.1" (newest) to "<log>.<backups>". Defaults
+            to 3.
+            buffer_size (int): The size of the write buffer. Defaults to 64 KiB.
+        """
+        self.log_path = log_path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.buffer_size = buffer_size
+
+        log_dir_path = path.dirname(log_path)
+
+        if log_dir_path != "":
+            makedirs(log_dir_path, exist_ok=True)
+
+        self.file = None
+        self.open()
+
+    def open(self):
+        """
+        Opens the log file for appending.
+
+        Returns:
+            None
+        """
+        self.file = open(self.log_path, "a", buffering=self.buffer_size)
+        # bytes in the log file, including the ones still in the buffer
+        self.size = self.file.tell()
+
+    def log(self, event, file_path=None, size=None, duration=None, **fields):
+        """
+        Writes a record to the log, see `log_record` for the arguments.
+
+        Returns:
+            None
+        """
+        self.write_records([log_record(event, file_path, size, duration, **fields)])
+
+    def write_records(self, records):
+        """
+        Writes records to the log, e.g. the ones a worker process returned.
+
+        Args:
+            records (list): The log records, see `log_record`.
+
+        Returns:
+            None
+        """
+        for record in records:
+            line = json.dumps(record) + "\n"
+
+            if self.max_bytes > 0 and self.size > 0 and self.size + len(line) > self.max_bytes:
+                self.rotate()
+
+            self.file.write(line)
+            self.size += len(line)
+
+    def rotate(self):
+        """
+        Moves the log file to "<log>.1", shifting the older backups and deleting the oldest one, and starts a new log.
+
+        Returns:
+            None
+        """
+        self.file.close()
+
+        for i in range(self.backups, 0, -1):
+            backup_path = f"{self.log_path}.{i}"
+
+            if not path.exists(backup_path):
+                continue
+            if i == self.backups:
+                remove(backup_path)
+            else:
+                replace(backup_path, f"{self.log_path}.{i + 1}")
+
+        if self.backups > 0:
+            replace(self.log_path, f"{self.log_path}.1")
+        else:
+            remove(self.log_path)
+
+        self.open()
+
+    def flush(self):
+        """
+        Writes the buffered records to the log file.
+
+        Returns:
+            None
+        """
+        self.file.flush()
+
+    def close(self):
+        """
+        Flushes and closes the log file.
+
+        Returns:
+            None
+        """
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        """
+        Return a string representation of the BuildLog object.
+
+        :return: A string representation of the BuildLog object.
+        :rtype: str
+        """
+        return f"BuildLog({self.log_path}, {self.size} bytes)"
@@ -1,29 +1,39 @@
+import os
+import errno
 import os.path as path
 
-from os import scandir, mkdir, remove
-from shutil import copy, rmtree
-from datetime import datetime as dt
+from os import scandir, mkdir, makedirs, remove, replace, rmdir, listdir, stat
+from shutil import copy, copyfile, copystat, rmtree
+from time import perf_counter
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from manifest import hash_file, load_manifest, new_manifest, save_manifest
+from build_log import BuildLog, copy_log_path
 
 
-def copy_static_to_public(src, dst):
+def copy_static_to_public(src, dst, log=None):
     """
     Copies the contents of the source directory to the destination directory,
     recursively copying files and directories. If a file or directory already
     exists in the destination, it is not overwritten. The function logs each
-    copied file and created directory to a file named "copy_log.txt" in the
+    copied file and created directory to the "copy_log.jsonl" build log in the
     "logs" directory.
 
     Parameters:
         src (str): The path to the source directory.
         dst (str): The path to the destination directory.
+        log (BuildLog, optional): The log of the build. Defaults to None, which opens the copy log for the call.
 
     Returns:
         None
     """
+    if log is None:
+        with BuildLog(copy_log_path) as log:
+            return copy_static_to_public(src, dst, log)
+
     print(f"Copying static files from {src} to {dst} directory...")
-    
-    with open("./logs/copy_log.txt", "a") as file:
-        file.write(f"\nCopying static files from {src} to {dst} started at {dt.now()}\n")
+    started = perf_counter()
+    log.log("copy started", src, destination=dst)
         
     items = scandir(src)
     
@@ -35,39 +45,38 @@ def copy_static_to_public(src, dst):
         
         if item.is_file():
             if not path.exists(cur_dst) and item.name != ".DS_Store":
+                copy_started = perf_counter()
                 copy(cur_src, cur_dst)
-                
-                with open("./logs/copy_log.txt", "a") as file:
-                    file.write(f"   file copied from {cur_src} to {cur_dst} at {dt.now()}\n")
+                log.log("copy", cur_dst, item.stat().st_size, perf_counter() - copy_started, source=cur_src)
                     
         if item.is_dir():
             if not path.exists(cur_dst):
                 mkdir(cur_dst)
-                
-                with open("./logs/copy_log.txt", "a") as file:
-                    file.write(f"   directory created: {cur_dst} at {dt.now()}\n")
-                    
-                copy_static_to_public(cur_src, cur_dst)
+                log.log("mkdir", cur_dst)
+                copy_static_to_public(cur_src, cur_dst, log)
             
-    with open("./logs/copy_log.txt", "a") as file:
-        file.write(f"copying from {src} to {dst} successfully finished at {dt.now()}\n")
+    log.log("copy finished", src, duration=perf_counter() - started, destination=dst)
                     
     # print("Copying successfully finished")
 
-def delete_directory(target):
+def delete_directory(target, log=None):
     """
     Deletes the specified target directory if it exists.
 
     Parameters:
         target (str): The path to the directory to be deleted.
+        log (BuildLog, optional): The log of the build. Defaults to None, which opens the copy log for the call.
 
     Returns:
         None
     """
+    if log is None:
+        with BuildLog(copy_log_path) as log:
+            return delete_directory(target, log)
+
     print(f"Deleting content of {target} directory...\n")
-    
-    with open("./logs/copy_log.txt", "a") as file:
-        file.write(f"\n\nCleaning {target} started at {dt.now()}\n")
+    started = perf_counter()
+    log.log("clean started", target)
         
     items = scandir(target)
     
@@ -78,9 +87,271 @@ def delete_directory(target):
         else:
             remove(item)
             
-    with open("./logs/copy_log.txt", "a") as file:
-        file.write(f"cleaning {target} succesfully finished at {dt.now()}\n")
+    log.log("clean finished", target, duration=perf_counter() - started)
             
     # print("Deleting sucessfully finished")
-    
-    
\ No newline at end of file
+
+
+def find_static_files(src, dst):
+    """
+    Collects every file and directory of the source tree together with its path in the destination tree.
+
+    Args:
+        src (str): The path to the source directory.
+        dst (str): The path to the destination directory.
+
+    Returns:
+        tuple: A sorted list of (source path, destination path) tuples for the files, and a sorted list of the
+        destination directories.
+    """
+    files = []
+    dirs = []
+    pending = [(src, dst)]
+
+    while pending:
+        cur_src_dir, cur_dst_dir = pending.pop()
+
+        for item in scandir(cur_src_dir):
+            cur_src = path.join(cur_src_dir, item.name)
+            cur_dst = path.join(cur_dst_dir, item.name)
+
+            if item.is_dir():
+                dirs.append(cur_dst)
+                pending.append((cur_src, cur_dst))
+            elif item.is_file() and item.name != ".DS_Store":
+                files.append((cur_src, cur_dst))
+
+    files.sort()
+    dirs.sort()
+    return files, dirs
+
+
+def prune_empty_dirs(dir_path, root):
+    """
+    Deletes the given directory and its parents as long as they are empty, stopping at the root directory.
+
+    Args:
+        dir_path (str): The path to the first directory to be checked.
+        root (str): The root directory, which is never removed.
+
+    Returns:
+        None
+    """
+    root = path.join(path.normpath(root), "")
+    cur_dir = path.normpath(dir_path)
+
+    while cur_dir.startswith(root) and path.isdir(cur_dir) and listdir(cur_dir) == []:
+        rmdir(cur_dir)
+        cur_dir = path.dirname(cur_dir)
+
+
+def is_up_to_date(src, src_stat, dst, use_hash=False, link=False):
+    """
+    Checks whether the destination file already holds the content of the source file.
+
+    Args:
+        src (str): The path to the source file.
+        src_stat (os.stat_result): The result of `os.stat` on the source file.
+        dst (str): The path to the destination file.
+        use_hash (bool, optional): Compare the content hashes when size or modification time differ. Defaults to
+        False.
+        link (bool, optional): Hardlink the destination to the source when it is replaced, see `copy_file`.
+        Defaults to False.
+
+    Returns:
+        bool: True if the destination has the same size and modification time as the source, or the same content
+        when use_hash is set. False otherwise.
+    """
+    try:
+        dst_stat = stat(dst)
+    except FileNotFoundError:
+        return False
+
+    if dst_stat.st_size != src_stat.st_size:
+        return False
+    if dst_stat.st_mtime_ns == src_stat.st_mtime_ns:
+        return True
+    if use_hash and hash_file(src) == hash_file(dst):
+        # same content, replaced by a file with the timestamps of the source so the next sync takes the fast path:
+        # the destination may be hardlinked into a published generation, whose files must never change
+        copy_file(src, dst, link)
+        return True
+    return False
+
+
+def copy_file_range_all(src_file, dst_file, size):
+    """
+    Copies a whole file inside the kernel using `os.copy_file_range`.
+
+    Args:
+        src_file (file): The source file opened for binary reading.
+        dst_file (file): The destination file opened for binary writing.
+        size (int): The number of bytes to be copied.
+
+    Returns:
+        bool: True if the file was copied, False if `os.copy_file_range` is not available for these files and
+        nothing was copied.
+    """
+    if not hasattr(os, "copy_file_range"):
+        return False
+
+    copied = 0
+
+    try:
+        while copied < size:
+            sent = os.copy_file_range(src_file.fileno(), dst_file.fileno(), size - copied)
+            if sent == 0:
+                break
+            copied += sent
+    except OSError as error:
+        unsupported = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF, errno.EPERM)
+        if copied == 0 and error.errno in unsupported:
+            return False
+        raise
+    return copied == size
+
+
+def copy_file(src, dst, link=False):
+    """
+    Copies a single file to its destination, replacing the destination atomically.
+
+    Args:
+        src (str): The path to the source file.
+        dst (str): The path to the destination file.
+        link (bool, optional): Hardlink the destination to the source instead of copying, when the filesystem
+        allows it. Defaults to False.
+
+    Returns:
+        str: "linked" if the destination was hardlinked, "copied" otherwise.
+
+    The content is written to a temporary file next to the destination and moved in place, so readers never see a
+    half-written file. Copies go through `os.copy_file_range`, which lets the kernel copy without passing the data
+    through user space (and share the blocks on filesystems supporting reflinks), and fall back to
+    `shutil.copyfile`, which uses `sendfile` where available. The modification time is copied as well, so the
+    next sync can recognize the file as unchanged.
+    """
+    tmp_dst = path.join(path.dirname(dst), f".{path.basename(dst)}.tmp")
+
+    if path.lexists(tmp_dst):
+        remove(tmp_dst)
+
+    if link:
+        try:
+            os.link(src, tmp_dst)
+            replace(tmp_dst, dst)
+            return "linked"
+        except OSError:
+            pass
+
+    try:
+        with open(src, "rb") as src_file, open(tmp_dst, "wb") as dst_file:
+            copied = copy_file_range_all(src_file, dst_file, os.fstat(src_file.fileno()).st_size)
+
+        if not copied:
+            copyfile(src, tmp_dst)
+
+        copystat(src, tmp_dst)
+        replace(tmp_dst, dst)
+    except BaseException:
+        if path.lexists(tmp_dst):
+            remove(tmp_dst)
+        raise
+    return "copied"
+
+
+def sync_static_to_public(
+        src,
+        dst,
+        state_path,
+        exclude=(),
+        jobs=8,
+        use_hash=False,
+        link=False,
+        trace=None,
+        log=None,
+):
+    """
+    Synchronizes the destination directory with the source directory, copying only what changed.
+
+    Args:
+        src (str): The path to the source directory.
+        dst (str): The path to the destination directory.
+        state_path (str): The path to the JSON file recording the files placed by the previous sync.
+        exclude (iterable, optional): Destination paths that are never copied nor deleted, e.g. generated pages.
+        Defaults to ().
+        jobs (int, optional): The number of threads copying files. Defaults to 8.
+        use_hash (bool, optional): Compare file contents when size or modification time differ. Defaults to False.
+        link (bool, optional): Hardlink files instead of copying them where possible. Defaults to False.
+        trace (Trace, optional): The trace recording the discovery of the files and every copy. Defaults to None.
+        log (BuildLog, optional): The log of the build. Defaults to None, which opens the copy log for the call.
+
+    Returns:
+        dict: The number of "copied", "unchanged" and "deleted" files.
+
+    A file is copied when the destination is missing or its size or modification time differs from the source.
+    Files placed by the previous sync whose source disappeared are deleted together with the directories left
+    empty. Files the sync never placed (like generated pages) are left alone.
+    """
+    if log is None:
+        with BuildLog(copy_log_path) as log:
+            return sync_static_to_public(src, dst, state_path, exclude, jobs, use_hash, link, trace, log)
+
+    print(f"Syncing static files from {src} to {dst} directory...")
+
+    started = perf_counter()
+    log.log("sync started", src, destination=dst)
+    exclude = {path.normpath(excluded) for excluded in exclude}
+    old_files = load_manifest(state_path, "files")["files"]
+    state = new_manifest("files")
+    counts = {"copied": 0, "unchanged": 0, "deleted": 0}
+    outdated = []
+
+    with nullcontext() if trace is None else trace.span("static discovery", "static"):
+        files, dirs = find_static_files(src, dst)
+
+        for cur_src, cur_dst in files:
+            if path.normpath(cur_dst) in exclude:
+                continue
+
+            src_stat = stat(cur_src)
+            state["files"][cur_dst] = {"size": src_stat.st_size, "mtime_ns": src_stat.st_mtime_ns}
+
+            if is_up_to_date(cur_src, src_stat, cur_dst, use_hash, link):
+                counts["unchanged"] += 1
+            else:
+                outdated.append((cur_src, cur_dst))
+
+    def copy_task(task):
+        copy_started = perf_counter()
+
+        with nullcontext() if trace is None else trace.span("copy", "static", src=task[0], dest=task[1]):
+            return copy_file(task[0], task[1], link), perf_counter() - copy_started
+
+    # every directory exists before the copies start, so the threads never race on creating them
+    for cur_dst_dir in [dst] + dirs:
+        makedirs(cur_dst_dir, exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        copies = list(executor.map(copy_task, outdated))
+
+    for (cur_src, cur_dst), (method, duration) in zip(outdated, copies):
+        log.log(method, cur_dst, state["files"][cur_dst]["size"], duration, source=cur_src)
+    counts["copied"] = len(outdated)
+
+    for cur_dst in sorted(old_files):
+        if cur_dst in state["files"] or path.normpath(cur_dst) in exclude:
+            continue
+
+        if path.isfile(cur_dst):
+            remove(cur_dst)
+            counts["deleted"] += 1
+            log.log("delete", cur_dst, reason="stale")
+        prune_empty_dirs(path.dirname(cur_dst), dst)
+
+    save_manifest(state_path, state)
+
+    log.log("sync finished", src, duration=perf_counter() - started, destination=dst, **counts)
+    log.flush()
+
+    print(f"{counts['copied']} files copied, {counts['unchanged']} unchanged, {counts['deleted']} deleted")
+    return counts
@@ -0,0 +1,186 @@
+from contextlib import nullcontext
+from htmlnode import ParentNode
+from markdown_block import markdown_to_blocks, block_to_html_node, iter_blocks
+
+heading_tags = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+
+
+def block_metadata(node):
+    """
+    Collects the metadata of a single converted block.
+
+    Args:
+        node (HTMLNode): The HTML node converted from one markdown block.
+
+    Returns:
+        dict: The "headings" as [level, text] pairs, the "links" as [text, url] pairs and the number of "words" of
+        the block.
+
+    The text of a heading is the concatenated value of its direct children, the same text `extract_title` has
+    always used for the page title.
+    """
+    metadata = {"headings": [], "links": [], "words": 0}
+    pending = [node]
+
+    while pending:
+        cur_node = pending.pop()
+
+        if cur_node.tag in heading_tags:
+            text = "".join(child.value for child in cur_node.children if child.value is not None)
+            metadata["headings"].append([heading_tags[cur_node.tag], text])
+
+        if cur_node.children is not None:
+            # reversed, so the children are visited in document order
+            pending.extend(reversed(cur_node.children))
+            continue
+
+        if cur_node.tag == "a":
+            metadata["links"].append([cur_node.value, cur_node.props["href"]])
+        if cur_node.value:
+            metadata["words"] += len(cur_node.value.split())
+
+    return metadata
+
+
+# a markdown document converted to HTML, together with the metadata collected while converting it
+class Document:
+
+    def __init__(self):
+        """
+        Initializes a new, empty instance of the Document class.
+        """
+        # HTML nodes of the converted blocks
+        self.children = []
+        # [level, text] pairs of every heading
+        self.headings = []
+        # [text, url] pairs of every link
+        self.links = []
+        self.word_count = 0
+
+    def add_block(self, node, metadata=None):
+        """
+        Appends a converted block to the document.
+
+        Args:
+            node (HTMLNode): The HTML node converted from the block.
+            metadata (dict, optional): The metadata of the block as returned by `block_metadata`. Collected from
+            the node when None. Defaults to None.
+
+        Returns:
+            None
+        """
+        if metadata is None:
+            metadata = block_metadata(node)
+
+        self.children.append(node)
+        self.add_metadata(metadata)
+
+    def add_metadata(self, metadata):
+        """
+        Records the metadata of a block without keeping its HTML node, for documents streamed block by block.
+
+        Args:
+            metadata (dict): The metadata of the block as returned by `block_metadata`.
+
+        Returns:
+            None
+        """
+        self.headings.extend(metadata["headings"])
+        self.links.extend(metadata["links"])
+        self.word_count += metadata["words"]
+
+    @property
+    def title(self):
+        """
+        The title of the document, the text of its heading 1 (or of all of them, concatenated).
+
+        :return: The title of the document.
+        :rtype: str
+        :raises ValueError: If the document has no heading 1.
+        """
+        titles = [text for level, text in self.headings if level == 1]
+
+        if titles == []:
+            raise ValueError("Invalid markdown: missing heading 1")
+        return "".join(titles)
+
+    def to_html_node(self):
+        """
+        Returns the root node of the converted document.
+
+        :return: A "div" node holding the converted blocks.
+        :rtype: ParentNode
+        """
+        return ParentNode("div", self.children)
+
+    def __repr__(self):
+        """
+        Return a string representation of the Document object.
+
+        :return: A string representation of the Document object.
+        :rtype: str
+        """
+        return f"Document({len(self.children)} blocks, {self.headings}, {len(self.links)} links, {self.word_count} words)"
+
+
+def markdown_to_document(markdown):
+    """
+    Converts a markdown string to a Document in a single pass.
+
+    Args:
+        markdown (str): The markdown string to be converted.
+
+    Returns:
+        Document: The converted document with its HTML nodes, title, headings, links and word count.
+
+    Every block is split, typed and converted exactly once, and its metadata is collected from the resulting HTML
+    node, so nothing has to parse the markdown a second time (e.g. to find the title).
+    """
+    document = Document()
+
+    for block in markdown_to_blocks(markdown):
+        document.add_block(block_to_html_node(block))
+    return document
+
+
+def write_markdown_file_html(file, out, cache=None, timer=None):
+    """
+    Converts markdown read from a file to HTML block by block, writing the HTML as soon as each block is converted.
+
+    Args:
+        file (file): The markdown text file, read line by line.
+        out (file): The text file the HTML of the document (a "div" holding the blocks) is written to.
+        cache (BlockCache, optional): The cache providing the HTML and metadata of blocks rendered before.
+        Defaults to None, which renders every block.
+        timer (StageTimer, optional): The timer recording the time spent reading the file ("read"), splitting it
+        into blocks ("parse") and rendering the blocks ("render"), which interleave, so they are traced as a single
+        "convert" span. Defaults to None.
+
+    Returns:
+        Document: The document with its title, headings, links and word count, but without HTML nodes.
+
+    Only the current block and its HTML node are in memory at any time, so converting a huge document does not
+    need more memory than converting a small one.
+    """
+    document = Document()
+    out.write("<div>")
+    blocks = iter_blocks(file if timer is None else timer.timed_iter(file, "read"))
+
+    if timer is not None:
+        blocks = timer.timed_iter(blocks, "parse")
+
+    with nullcontext() if timer is None else timer.span("convert"):
+        for block, block_type in blocks:
+            with nullcontext() if timer is None else timer.stage("render", span=False):
+                if cache is not None:
+                    html, metadata = cache.render(block, block_type)
+                    document.add_metadata(metadata)
+                    out.write(html)
+                    continue
+
+                node = block_to_html_node(block, block_type)
+                document.add_metadata(block_metadata(node))
+                node.write_html(out)
+
+    out.write("</div>")
+    return document
@@ -1,12 +1,91 @@
 import os.path as path
 
-from os import mkdir, makedirs, scandir
-from datetime import datetime as dt
-from markdown_block import markdown_to_html_node
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count, getpid, mkdir, makedirs, scandir, remove, replace, stat
+from time import monotonic_ns, perf_counter
+from contextlib import nullcontext
+from tempfile import SpooledTemporaryFile
+from document import markdown_to_document, write_markdown_file_html
+from template import TemplateCache, find_template
+from copystatic import prune_empty_dirs
+from manifest import hash_file, load_manifest, new_manifest, save_manifest
+from block_cache import BlockCache
+from build_log import BuildLog, conversion_log_path, log_record
+from profiling import StageTimer, build_stage, run_profiled, trace_event
+
+# compiled templates of this process, each worker of a process pool has its own
+template_cache = TemplateCache()
+# size up to which the generated content of a page is kept in memory instead of a temporary file
+content_spool_size = 8 * 1024 * 1024
+# rendered blocks of this process, see `configure_block_cache`
+block_cache = None
+# caches inherited from the parent of a forked worker, kept referenced so their database connection is never
+# closed by the worker
+inherited_block_caches = []
+
+
+def configure_block_cache(db_path=None):
+    """
+    Sets up the block cache of the current process, keeping the existing one if it already uses the same database.
+
+    Args:
+        db_path (str, optional): The path to the sqlite database persisting the cache across builds, None for a
+        memory-only cache. Defaults to None.
+
+    Returns:
+        BlockCache: The block cache of the current process.
+
+    Also used as the initializer of the worker processes, so every worker has its own in-memory cache and its
+    own connection to the shared database.
+    """
+    global block_cache
+
+    if block_cache is not None and block_cache.pid != getpid():
+        inherited_block_caches.append(block_cache)
+        block_cache = None
+
+    if block_cache is not None and block_cache.db_path == db_path:
+        return block_cache
+
+    if block_cache is not None:
+        block_cache.close()
+
+    block_cache = BlockCache(db_path=db_path)
+    return block_cache
+
+
+def is_same_content(file_path, other_path):
+    """
+    Tells whether two files hold the same bytes.
+
+    Args:
+        file_path (str): The path to the first file.
+        other_path (str): The path to the second file.
+
+    Returns:
+        bool: True if both files exist and have the same bytes.
+
+    The sizes are compared first, so files of different sizes are not read at all.
+    """
+    try:
+        if stat(file_path).st_size != stat(other_path).st_size:
+            return False
+
+        with open(file_path, "rb") as file, open(other_path, "rb") as other:
+            while True:
+                chunk = file.read(64 * 1024)
+
+                if chunk != other.read(64 * 1024):
+                    return False
+                if chunk == b"":
+                    return True
+    except FileNotFoundError:
+        return False
+
 
 def extract_title(markdown):
     """
-    Extracts the title from the markdown content by converting it to an HTML node tree.
+    Extracts the title from the markdown content by converting it to a Document.
 
     Args:
         markdown (str): The markdown string to extract the title from.
@@ -20,21 +99,10 @@ def extract_title(markdown):
     if len(markdown) <= 0:
         raise ValueError("Invalid markdown: empty document")
 
-    page = markdown_to_html_node(markdown)
-    title = []
-
-    for node in page.children:
-        if node.tag == "h1":
-            for child in node.children:
-                title.append(child.value)
-
-    if title == []:
-        raise ValueError("Invalid markdown: missing heading 1")
-
-    return "".join(title)
+    return markdown_to_document(markdown).title
 
 
-def generate_page(from_path, template_path, dest_path):
+def generate_page(from_path, template_path, dest_path, variables=None, profile=False, trace=False, log=None):
     """
     Generates a static HTML page from a Markdown file using a template.
 
@@ -42,64 +110,150 @@ def generate_page(from_path, template_path, dest_path):
         from_path (str): The path to the input Markdown file.
         template_path (str): The path to the template HTML file.
         dest_path (str): The destination path to save the generated HTML file.
+        variables (dict, optional): Values of additional {{ Name }} placeholders of the template. Defaults to None.
+        profile (bool, optional): Time the stages of the generation. Defaults to False.
+        trace (bool, optional): Record the generation and its stages as trace events. Defaults to False.
+        log (BuildLog, optional): The log the generated page is recorded in. Defaults to None, which returns the
+        record in the result instead, for worker processes whose parent writes it to the log of the build.
 
     Raises:
-        ValueError: If the input file does not exist.
+        ValueError: If the input file does not exist, or the template has a placeholder without value.
 
     Returns:
-        None
+        dict: Whether the page was "written", False if the destination already held the same page, the
+        "cache_hits" and "cache_misses" of the block cache while generating the page, and the "log"
+        records of the page unless a log was given. When profiled or
+        traced, also the wall time of the page in "seconds" and the seconds spent in every stage in "timings",
+        see `profiling.page_stages`. When traced, also the "trace" events, the "generate_page" span first.
 
-    This function reads the content of the input Markdown file,
-    generates HTML from it using the `markdown_to_html_node` function,
-    extracts the title from the Markdown content, and
-    replaces placeholders in the template HTML with the extracted title and generated HTML content.
-    Finally, it writes the generated HTML to a file at the specified destination path,
-    creating any necessary directories if they don't exist.
+    This function reads the input Markdown file line by line and
+    converts it block by block (reusing blocks rendered before) with the `write_markdown_file_html` function,
+    which writes the generated HTML to a spool file and collects the title on the way, and
+    renders the compiled (and cached) template with the extracted title, the generated HTML content
+    and the additional variables straight into a temporary file next to the destination path, creating any
+    necessary directories if they don't exist. The HTML content is copied into the page chunk by chunk.
+    Finally, it moves the temporary file to the destination path, or deletes it if the destination already holds
+    the same page.
     """
     # print(f"Generating page from {from_path} to {dest_path} using {template_path}...")
 
-    # generating html from markdown
-    markdown = ""
-
-    if path.exists(from_path) and path.isfile(from_path):
-        with open(from_path, "r") as file:
-            markdown = file.read()
-    else:
+    if not (path.exists(from_path) and path.isfile(from_path)):
         raise ValueError("Invalid input: file does not exists")
 
-    node = markdown_to_html_node(markdown)
-    content = node.to_html()
-    title = extract_title(markdown)
+    if path.getsize(from_path) <= 0:
+        raise ValueError("Invalid markdown: empty document")
+
+    started = perf_counter()
+    started_ns = monotonic_ns()
+    timer = StageTimer(trace) if profile or trace else None
 
-    # generating new static page from generated html and template
-    with open(template_path, "r") as file:
-        template = file.read()
+    with nullcontext() if timer is None else timer.stage("template"):
+        template = template_cache.get(template_path)
 
-    page = template.replace("{{ Title }}", title).replace("{{ Content }}", content)
+    cache = block_cache if block_cache is not None and block_cache.pid == getpid() else configure_block_cache()
+    hits = cache.hits
+    misses = cache.misses
 
-    # Write the new HTML to a file at dest_path
     dest_dir_path = path.dirname(dest_path)
     
     if dest_dir_path != "":
         makedirs(dest_dir_path, exist_ok=True)
-        
-    with open(dest_path, "w") as file:
-        file.write(page)
-        
-    with open("./logs/conversion_log.txt", "a") as file:
-            file.write(f"\n      static html converted from {from_path} to {dest_path} copied successfully at {dt.now()}\n")
+
+    # generating html from markdown, block by block, into a spool that only goes to disk for huge pages,
+    # so neither the markdown nor the html of a page has to be in memory as a whole
+    with open(from_path, "r") as file, SpooledTemporaryFile(max_size=content_spool_size, mode="w+") as content:
+        document = write_markdown_file_html(file, content, cache, timer)
+
+        # generating new static page from generated html and template
+        with nullcontext() if timer is None else timer.stage("title"):
+            title = document.title
+
+        values = dict(variables or {})
+        values["Title"] = title
+        values["Content"] = content
+
+        # Write the new HTML to a file at dest_path, through a temporary file so a failed
+        # render never leaves a truncated page behind, and only replace the page if it changed, so an
+        # unchanged page keeps its modification time (and uploads of the changed outputs skip it)
+        tmp_path = f"{dest_path}.tmp"
+
+        try:
+            with nullcontext() if timer is None else timer.stage("write"):
+                with open(tmp_path, "w") as dest_file:
+                    template.write(dest_file, values)
+                    size = dest_file.tell()
+                written = not is_same_content(tmp_path, dest_path)
+
+                if written:
+                    replace(tmp_path, dest_path)
+                else:
+                    remove(tmp_path)
+        except BaseException:
+            if path.exists(tmp_path):
+                remove(tmp_path)
+            raise
+
+    records = [log_record("page", dest_path, size, perf_counter() - started, source=from_path, written=written)]
                
     # print("Conversion successfully succeeded")
+
+    cache.flush()
+    result = {"written": written, "cache_hits": cache.hits - hits, "cache_misses": cache.misses - misses}
+
+    if log is None:
+        result["log"] = records
+    else:
+        log.write_records(records)
+
+    if timer is not None:
+        result["seconds"] = perf_counter() - started
+        result["timings"] = timer.timings
+
+    if trace:
+        page_args = {"src": from_path, "dest": dest_path}
+        result["trace"] = [trace_event("generate_page", started_ns, monotonic_ns(), "page", page_args)] + timer.spans
+    return result
+
+
+def render_page(from_path, template_path, variables=None):
+    """
+    Renders a static HTML page from a Markdown file in memory, e.g. for a server rendering pages on request.
+
+    Args:
+        from_path (str): The path to the input Markdown file.
+        template_path (str): The path to the template HTML file.
+        variables (dict, optional): Values of additional {{ Name }} placeholders of the template. Defaults to None.
+
+    Raises:
+        ValueError: If the input file is empty, has no heading 1, or the template has a placeholder without value.
+
+    Returns:
+        str: The page, the same HTML `generate_page` writes for the file.
+    """
+    with open(from_path, "r") as file:
+        markdown = file.read()
+
+    if len(markdown) <= 0:
+        raise ValueError("Invalid markdown: empty document")
+
+    document = markdown_to_document(markdown)
+    values = dict(variables or {})
+    values["Title"] = document.title
+    values["Content"] = document.to_html_node()
+    return template_cache.get(template_path).render(values)
+
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, log=None):
     
-    
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path):
-    
+    if log is None:
+        with BuildLog(conversion_log_path) as log:
+            return generate_pages_recursive(dir_path_content, template_path, dest_dir_path, log)
+
     print(f"Generating pages from {dir_path_content} to {dest_dir_path} using {template_path}...")
 
-    with open("./logs/conversion_log.txt", "a") as file:
-            if dir_path_content == "./content":
-                file.write(f"\n\nConversion session starting...") 
-            file.write(f"\n   Converting content of {dir_path_content} to {dest_dir_path} started...\n") 
+    if dir_path_content == "./content":
+        log.log("conversion session started", dir_path_content)
+    log.log("conversion started", dir_path_content, destination=dest_dir_path)
     
     items = scandir(dir_path_content)
     
@@ -109,11 +263,8 @@ def generate_pages_recursive(dir_path_content, template_path, dest_dir_path):
         if item.is_dir():
             cur_dst = path.join(dest_dir_path, item.name)
             mkdir(cur_dst)
-            
-            with open("./logs/conversion_log.txt", "a") as file:
-                file.write(f"      directory {cur_dst} created\n")
-                
-            generate_pages_recursive(cur_src, template_path, cur_dst)
+            log.log("mkdir", cur_dst)
+            generate_pages_recursive(cur_src, template_path, cur_dst, log)
             
         elif item.is_file() and item.name.endswith("md"):
             new_file_name = item.name.replace("md", "html")
@@ -121,10 +272,330 @@ def generate_pages_recursive(dir_path_content, template_path, dest_dir_path):
             generate_page(
                 cur_src,
                 template_path,
-                cur_dst
+                cur_dst,
+                log=log
                 )
             
-    with open("./logs/conversion_log.txt", "a") as file:
-            file.write(f"   converting content of {dir_path_content} to {dest_dir_path} successfully finished\n")
+    log.log("conversion finished", dir_path_content, destination=dest_dir_path)
     
     # print("Conversion successfully succeeded")
+
+
+def find_pages(dir_path_content, dest_dir_path):
+    """
+    Collects every markdown page under the content directory together with its output path.
+
+    Args:
+        dir_path_content (str): The path to the content directory.
+        dest_dir_path (str): The path to the destination directory.
+
+    Returns:
+        list: A sorted list of (source path, destination path) tuples.
+    """
+    pages = []
+
+    for item in scandir(dir_path_content):
+        cur_src = path.join(dir_path_content, item.name)
+
+        if item.is_dir():
+            cur_dst = path.join(dest_dir_path, item.name)
+            pages.extend(find_pages(cur_src, cur_dst))
+
+        elif item.is_file() and item.name.endswith("md"):
+            new_file_name = item.name.replace("md", "html")
+            pages.append((cur_src, path.join(dest_dir_path, new_file_name)))
+
+    pages.sort()
+    return pages
+
+
+def remove_output(dest_path, dest_dir_path):
+    """
+    Deletes a generated page and the directories that became empty by its removal.
+
+    Args:
+        dest_path (str): The path to the generated HTML file.
+        dest_dir_path (str): The root destination directory, which is never removed.
+
+    Returns:
+        None
+    """
+    if path.isfile(dest_path):
+        remove(dest_path)
+
+    prune_empty_dirs(path.dirname(dest_path), dest_dir_path)
+
+
+def generate_pages(pages, jobs=1, variables=None, block_cache_path=None, profile_dir=None, trace=None, log=None):
+    """
+    Generates the given pages, optionally spreading the work over a pool of worker processes.
+
+    Args:
+        pages (list): A list of (source path, template path, destination path) tuples.
+        jobs (int, optional): The number of worker processes, 0 means one per CPU. Defaults to 1, which generates
+        the pages in the current process.
+        variables (dict, optional): Values of additional template placeholders, see `generate_page`. Defaults to
+        None.
+        block_cache_path (str, optional): The database persisting the block cache, see `configure_block_cache`.
+        Defaults to None.
+        profile_dir (str, optional): Time the stages of every page and, in worker processes, dump their cProfile
+        statistics to this directory, see `profiling.run_profiled`. Defaults to None, which does not profile.
+        trace (Trace, optional): The trace receiving the spans of every page and the idle time of every worker.
+        Defaults to None.
+        log (BuildLog, optional): The log the generated pages are recorded in, by the calling process in the order
+        of the pages. Defaults to None, which leaves the records in the results.
+
+    Raises:
+        Exception: The error of the first page (in the given order) that failed to generate.
+
+    Returns:
+        list: The result of `generate_page` for every page, in the given order.
+
+    Every destination directory is created before any page is generated, so the workers never race on creating
+    them. Each page is written by exactly one worker, so the output does not depend on the number of jobs. When a
+    page fails, the pages not started yet are cancelled and the error is re-raised in the calling process.
+    """
+    for dest_dir_path in sorted({path.dirname(dst) for _, _, dst in pages}):
+        if dest_dir_path != "":
+            makedirs(dest_dir_path, exist_ok=True)
+
+    if jobs == 0:
+        jobs = cpu_count() or 1
+
+    profile = profile_dir is not None
+    tracing = trace is not None
+
+    if jobs <= 1 or len(pages) <= 1:
+        configure_block_cache(block_cache_path)
+        results = [
+            generate_page(src, template_path, dst, variables, profile, tracing, log)
+            for src, template_path, dst in pages
+        ]
+
+        if tracing:
+            for result in results:
+                trace.add_events(result["trace"])
+        return results
+
+    results = []
+    pool_started = monotonic_ns()
+
+    with ProcessPoolExecutor(
+            max_workers=min(jobs, len(pages)),
+            initializer=configure_block_cache,
+            initargs=(block_cache_path,),
+    ) as executor:
+        if profile:
+            futures = [
+                executor.submit(
+                    run_profiled, profile_dir, generate_page, src, template_path, dst, variables, True, tracing
+                )
+                for src, template_path, dst in pages
+            ]
+        else:
+            futures = [
+                executor.submit(generate_page, src, template_path, dst, variables, False, tracing)
+                for src, template_path, dst in pages
+            ]
+
+        for future in futures:
+            try:
+                results.append(future.result())
+            except BaseException:
+                for pending in futures:
+                    pending.cancel()
+                raise
+
+        # the workers are busy until the last page is collected, shutting the pool down is not idle time
+        pool_finished = monotonic_ns()
+
+    if tracing:
+        for result in results:
+            trace.add_events(result["trace"])
+        trace.add_idle(pool_started, pool_finished, [result["trace"][0] for result in results])
+
+    if log is not None:
+        for result in results:
+            log.write_records(result.pop("log"))
+
+    return results
+
+
+def generate_pages_incremental(
+        dir_path_content,
+        template_path,
+        dest_dir_path,
+        manifest_path,
+        force=False,
+        jobs=1,
+        variables=None,
+        block_cache_path=None,
+        profile=None,
+        trace=None,
+        log=None,
+        pages=None,
+):
+    """
+    Generates the pages of the content directory, re-rendering only the ones that changed since the last build.
+
+    Args:
+        dir_path_content (str): The path to the content directory.
+        template_path (str): The path to the default template HTML file, see `find_template` for overriding it.
+        dest_dir_path (str): The path to the destination directory.
+        manifest_path (str): The path to the build manifest recorded by the previous build.
+        force (bool, optional): Re-render every page regardless of the manifest. Defaults to False.
+        jobs (int, optional): The number of worker processes used to render the pages, see `generate_pages`.
+        Defaults to 1.
+        variables (dict, optional): Values of additional template placeholders, see `generate_page`. Defaults to
+        None.
+        block_cache_path (str, optional): The database persisting the block cache, see `configure_block_cache`.
+        Defaults to None.
+        profile (BuildProfile, optional): The profile recording the timings of the stages of the build and of every
+        rendered page. Defaults to None.
+        trace (Trace, optional): The trace recording the stages of the build and every rendered page. Defaults to
+        None.
+        log (BuildLog, optional): The log of the build. Defaults to None, which opens the conversion log for the
+        call.
+        pages (list, optional): The pages of the content directory as found by `find_pages`, when the caller already
+        found them. Defaults to None, which finds them.
+
+    Returns:
+        dict: The number of "rendered", "unchanged" and "removed" pages, of rendered pages "written" and of
+        rendered pages "skipped" because their output already held the same page, and the "cache_hits" and
+        "cache_misses" of the block cache.
+
+    A page is rendered again when its markdown content, its template, the template variables or its output path
+    differs from what the manifest recorded, or when its output file is missing. The markdown content is only hashed
+    again when its size or modification time differs from the recorded ones. Outputs of pages whose markdown source
+    disappeared are deleted. After the build the manifest is rewritten with the source path, content hash, size and
+    modification time, template path, template hash, template variables and output path of every page, unless
+    nothing changed.
+    """
+    if log is None:
+        with BuildLog(conversion_log_path) as log:
+            return generate_pages_incremental(
+                dir_path_content,
+                template_path,
+                dest_dir_path,
+                manifest_path,
+                force,
+                jobs,
+                variables,
+                block_cache_path,
+                profile,
+                trace,
+                log,
+                pages,
+            )
+
+    print(f"Generating pages from {dir_path_content} to {dest_dir_path} using {template_path}...")
+
+    started = perf_counter()
+    log.log("conversion session started", dir_path_content, destination=dest_dir_path)
+
+    old_manifest = load_manifest(manifest_path)
+    old_pages = old_manifest["pages"]
+    manifest = new_manifest()
+    counts = {
+        "rendered": 0,
+        "written": 0,
+        "skipped": 0,
+        "unchanged": 0,
+        "removed": 0,
+        "cache_hits": 0,
+        "cache_misses": 0,
+    }
+    template_hashes = {}
+    dir_templates = {}
+    variables = dict(variables or {})
+    outdated = []
+
+    with build_stage("discovery", profile, trace):
+        for src, dst in find_pages(dir_path_content, dest_dir_path) if pages is None else pages:
+            page_template_path = find_template(src, dir_path_content, template_path, dir_templates)
+
+            if page_template_path not in template_hashes:
+                template_hashes[page_template_path] = hash_file(page_template_path)
+
+            src_stat = stat(src)
+            old_entry = old_pages.get(src, {})
+
+            # like the static sync, an unchanged size and modification time means unchanged content
+            if (old_entry.get("size"), old_entry.get("mtime_ns")) == (src_stat.st_size, src_stat.st_mtime_ns):
+                content_hash = old_entry["hash"]
+            else:
+                content_hash = hash_file(src)
+
+            entry = {
+                "hash": content_hash,
+                "size": src_stat.st_size,
+                "mtime_ns": src_stat.st_mtime_ns,
+                "template": page_template_path,
+                "template_hash": template_hashes[page_template_path],
+                "variables": variables,
+                "dest": dst,
+            }
+            manifest["pages"][src] = entry
+
+            # a touched page with the same content is unchanged as well
+            unchanged = (old_entry | {"size": src_stat.st_size, "mtime_ns": src_stat.st_mtime_ns}) == entry
+
+            if not force and unchanged and path.isfile(dst):
+                counts["unchanged"] += 1
+                continue
+
+            outdated.append((src, page_template_path, dst))
+
+    with build_stage("pages", profile, trace):
+        results = generate_pages(
+            outdated,
+            jobs,
+            variables,
+            block_cache_path,
+            None if profile is None else profile.profile_dir,
+            trace,
+            log,
+        )
+
+    counts["rendered"] = len(outdated)
+    counts["written"] = sum(result["written"] for result in results)
+    counts["skipped"] = counts["rendered"] - counts["written"]
+    counts["cache_hits"] = sum(result["cache_hits"] for result in results)
+    counts["cache_misses"] = sum(result["cache_misses"] for result in results)
+
+    if profile is not None:
+        for (src, _, _), result in zip(outdated, results):
+            profile.add_page(src, result)
+
+    with build_stage("cleanup", profile, trace):
+        new_dests = {entry["dest"] for entry in manifest["pages"].values()}
+
+        for src, old_entry in sorted(old_pages.items()):
+            if src not in manifest["pages"]:
+                counts["removed"] += 1
+
+            if old_entry["dest"] not in new_dests:
+                remove_output(old_entry["dest"], dest_dir_path)
+
+                log.log("delete", old_entry["dest"], reason="stale", source=src)
+
+        if manifest != old_manifest:
+            save_manifest(manifest_path, manifest)
+
+    log.log(
+        "conversion session finished",
+        dir_path_content,
+        duration=perf_counter() - started,
+        rendered=counts["rendered"],
+        written=counts["written"],
+        skipped=counts["skipped"],
+        unchanged=counts["unchanged"],
+        removed=counts["removed"],
+    )
+    log.flush()
+
+    print(
+        f"{counts['rendered']} pages rendered ({counts['written']} written, {counts['skipped']} identical), "
+        f"{counts['unchanged']} unchanged, {counts['removed']} removed"
+    )
+    return counts
@@ -0,0 +1,279 @@
+import os.path as path
+
+from os import link, listdir, makedirs, readlink, remove, rename, replace, scandir, symlink
+from shutil import copy2, rmtree
+
+# name of a published generation, followed by its number, e.g. "gen-000042"
+generation_prefix = "gen-"
+# name of the generation being built
+staging_name = "staging"
+# name of the last generation retired by a publication, which the next one is staged in
+spare_name = "spare"
+# suffix of the directory holding the build state (e.g. manifests) a generation was built with
+state_suffix = ".state"
+
+
+def link_tree(src, dst):
+    """
+    Recreates a directory tree with hardlinks to the files of the source tree.
+
+    Args:
+        src (str): The path to the source directory.
+        dst (str): The path to the destination directory, created if needed.
+
+    Returns:
+        int: The number of files linked or, where the filesystem does not support hardlinks, copied.
+
+    A hardlinked file shares its content with the source, so the tree must only be changed by replacing files
+    (as every step of the build does), never by writing into them.
+    """
+    count = 0
+    pending = [(src, dst)]
+
+    while pending:
+        cur_src_dir, cur_dst_dir = pending.pop()
+        makedirs(cur_dst_dir, exist_ok=True)
+
+        for item in scandir(cur_src_dir):
+            cur_dst = path.join(cur_dst_dir, item.name)
+
+            if item.is_dir(follow_symlinks=False):
+                pending.append((item.path, cur_dst))
+                continue
+
+            try:
+                link(item.path, cur_dst, follow_symlinks=False)
+            except OSError:
+                copy2(item.path, cur_dst, follow_symlinks=False)
+            count += 1
+    return count
+
+
+# builds published as numbered generations, the public path being a symlink flipped atomically to the newest one
+class Generations:
+
+    def __init__(self, public_path, generations_dir, state_paths=()):
+        """
+        Initializes a new instance of the Generations class.
+
+        Parameters:
+            public_path (str): The path the site is served from, a symlink to the published generation.
+            generations_dir (str): The directory holding the generations, on the filesystem of the public path.
+            state_paths (iterable): The files describing the outputs of a build, e.g. its manifests, saved with
+            every generation and restored when the next one is staged from it. Their names must be unique.
+            Defaults to ().
+        """
+        self.public_path = public_path
+        self.generations_dir = generations_dir
+        self.state_paths = list(state_paths)
+        self.staging_path = path.join(generations_dir, staging_name)
+        self.spare_path = path.join(generations_dir, spare_name)
+
+    def generations(self):
+        """
+        Lists the published generations.
+
+        Returns:
+            list: The paths of the generations, oldest first.
+        """
+        if not path.isdir(self.generations_dir):
+            return []
+
+        numbers = [
+            int(name.removeprefix(generation_prefix))
+            for name in listdir(self.generations_dir)
+            if name.startswith(generation_prefix) and name.removeprefix(generation_prefix).isdigit()
+        ]
+        return [self.generation_path(number) for number in sorted(numbers)]
+
+    def generation_path(self, number):
+        """
+        Returns the path of a generation.
+
+        Args:
+            number (int): The number of the generation.
+
+        Returns:
+            str: The path to the generation directory.
+        """
+        return path.join(self.generations_dir, f"{generation_prefix}{number:06d}")
+
+    def current(self):
+        """
+        Returns the published generation.
+
+        Returns:
+            str: The path to the generation the public path links to, None if it is not a link to a generation.
+        """
+        if not path.islink(self.public_path):
+            return None
+
+        target = path.normpath(path.join(path.dirname(self.public_path), readlink(self.public_path)))
+
+        for generation_path in self.generations():
+            if path.normpath(generation_path) == target:
+                return generation_path
+        return None
+
+    def stage(self, link=True):
+        """
+        Creates the staging directory the next generation is built in.
+
+        Args:
+            link (bool, optional): Start from the published outputs, hardlinked, and restore the state they were
+            built with, so an incremental build only replaces what changed. Defaults to True.
+
+        Returns:
+            str: The path to the staging directory.
+
+        A staging directory left by an interrupted build is deleted first. When linking, the spare generation kept by
+        `publish` is moved in place instead, with its state: the build then only replaces what changed since that
+        generation was built, instead of the whole tree being linked again. Without a published generation (or its
+        state) to start from, the state files are deleted, so the build does not trust outputs it did not write.
+        """
+        self.discard()
+        makedirs(self.generations_dir, exist_ok=True)
+
+        source = self.current()
+        spare_state_dir = self.spare_path + state_suffix
+
+        if link and source is not None and path.isdir(self.spare_path) and path.isdir(spare_state_dir):
+            rename(self.spare_path, self.staging_path)
+            source = self.spare_path
+        else:
+            # a public directory from before the builds were staged
+            if source is None and path.isdir(self.public_path) and not path.islink(self.public_path):
+                source = self.public_path
+
+            if link and source is not None:
+                link_tree(source, self.staging_path)
+            else:
+                makedirs(self.staging_path)
+
+        state_dir = None if source is None else source + state_suffix
+
+        for state_path in self.state_paths:
+            if path.isfile(state_path):
+                remove(state_path)
+
+            if link and state_dir is not None and path.isfile(path.join(state_dir, path.basename(state_path))):
+                makedirs(path.dirname(state_path) or ".", exist_ok=True)
+                copy2(path.join(state_dir, path.basename(state_path)), state_path)
+
+        if source == self.spare_path:
+            rmtree(spare_state_dir)
+        return self.staging_path
+
+    def discard(self):
+        """
+        Deletes the staging directory, e.g. after a failed build.
+
+        Returns:
+            None
+        """
+        if path.lexists(self.staging_path):
+            rmtree(self.staging_path)
+
+    def publish(self):
+        """
+        Publishes the staging directory as the newest generation, by flipping the public symlink to it.
+
+        Returns:
+            str: The path to the published generation.
+
+        The flip is a rename over the symlink, so a reader of the public path sees either the previous or the new
+        generation, never a mix or nothing. The previous generation is kept for `rollback`. Of the older ones, the
+        newest becomes the spare generation the next one is staged in, see `stage`, the others are deleted. A public
+        directory from before the builds were staged becomes the previous generation; it is moved aside
+        right before the symlink replaces it, the only moment the public path does not exist.
+        """
+        generations = self.generations()
+        number = int(path.basename(generations[-1]).removeprefix(generation_prefix)) + 1 if generations else 1
+        previous = self.current()
+        migrated = previous is None and path.isdir(self.public_path) and not path.islink(self.public_path)
+
+        if migrated:
+            previous = self.generation_path(number)
+            number += 1
+
+        generation_path = self.generation_path(number)
+        state_dir = generation_path + state_suffix
+        makedirs(state_dir, exist_ok=True)
+
+        for state_path in self.state_paths:
+            if path.isfile(state_path):
+                copy2(state_path, path.join(state_dir, path.basename(state_path)))
+
+        rename(self.staging_path, generation_path)
+
+        if migrated:
+            rename(self.public_path, previous)
+
+        self.flip(generation_path)
+        older = [old_path for old_path in self.generations() if old_path not in (generation_path, previous)]
+
+        if older != []:
+            for spare_path in (self.spare_path, self.spare_path + state_suffix):
+                if path.lexists(spare_path):
+                    rmtree(spare_path)
+
+            rename(older[-1], self.spare_path)
+
+            if path.isdir(older[-1] + state_suffix):
+                rename(older[-1] + state_suffix, self.spare_path + state_suffix)
+
+        for old_path in older[:-1]:
+            rmtree(old_path)
+
+            if path.isdir(old_path + state_suffix):
+                rmtree(old_path + state_suffix)
+        return generation_path
+
+    def rollback(self):
+        """
+        Publishes the generation published before the current one again.
+
+        Returns:
+            str: The path to the generation now published.
+
+        Raises:
+            ValueError: If there is no generation older than the published one.
+        """
+        current = self.current()
+        older = [generation_path for generation_path in self.generations() if generation_path != current]
+
+        if current is not None:
+            older = [generation_path for generation_path in older if generation_path < current]
+
+        if older == []:
+            raise ValueError("Invalid rollback: no previous generation")
+
+        self.flip(older[-1])
+        return older[-1]
+
+    def flip(self, generation_path):
+        """
+        Points the public symlink to a generation, atomically.
+
+        Args:
+            generation_path (str): The path to the generation.
+
+        Returns:
+            None
+        """
+        tmp_path = f"{self.public_path}.tmp"
+
+        if path.lexists(tmp_path):
+            remove(tmp_path)
+
+        symlink(path.relpath(generation_path, path.dirname(self.public_path) or "."), tmp_path)
+        replace(tmp_path, self.public_path)
+
+    def __repr__(self):
+        """
+        Return a string representation of the Generations object.
+
+        :return: A string representation of the Generations object.
+        :rtype: str
+        """
+        return f"Generations({self.public_path} -> {self.current()}, {len(self.generations())} generations)"
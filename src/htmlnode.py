@@ -1,9 +1,13 @@
+from sys import intern
 from pprint import pprint
 
 # base class for creating HTML nodes
 # defines the structure and behavior of an HTML node in a hierarchical manner
 class HTMLNode:
 
+    # no per-instance __dict__, a page can create tens of thousands of nodes
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         """
         Initializes a new instance of the HTMLNode class.
@@ -14,8 +18,8 @@ class HTMLNode:
             children (list): The list of child nodes. Defaults to None.
             props (dict): The dictionary of properties. Defaults to None.
         """
-        # string representing the HTML tag name
-        self.tag = tag
+        # string representing the HTML tag name, interned so every node shares the same few tag strings
+        self.tag = intern(tag) if isinstance(tag, str) else tag
         # string representing the value of the HTML tag
         self.value = value
         self.children = children
@@ -29,8 +33,28 @@ class HTMLNode:
         :rtype: str
         :raises NotImplementedError: If the to_html method is not implemented.
         """
+        return "".join(self.iter_html())
+
+    def iter_html(self):
+        """
+        Generates the HTML representation of the current object as a sequence of chunks.
+
+        :return: An iterator over the chunks of the HTML representation, in order.
+        :rtype: Iterator[str]
+        :raises NotImplementedError: If the iter_html method is not implemented.
+        """
         raise NotImplementedError("to_html method not implememted")
 
+    def write_html(self, file):
+        """
+        Writes the HTML representation of the current object to a file-like object, chunk by chunk, without
+        building the whole representation in memory.
+
+        :param file: A text file or any object with a `writelines` method, e.g. an `io.StringIO`.
+        :return: None
+        """
+        file.writelines(self.iter_html())
+
     def props_to_html(self):
         """
         Generates the HTML representation of the attributes of the current object.
@@ -41,11 +65,7 @@ class HTMLNode:
         """
         # if props contains values
         if self.props:
-            attributes = ""
-
-            for prop in self.props:
-                attributes += f" {prop}=\"{self.props[prop]}\""
-            return attributes
+            return "".join([f" {prop}=\"{self.props[prop]}\"" for prop in self.props])
 
         # if props does not contains values
         return ""
@@ -64,6 +84,8 @@ class HTMLNode:
 # it does not contain any other HTML elements
 class LeafNode(HTMLNode):
 
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         """
         Initializes a new instance of the LeafNode class.
@@ -90,6 +112,16 @@ class LeafNode(HTMLNode):
         if self.tag is None:
             return self.value
         return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+
+    def iter_html(self):
+        """
+        Generates the HTML representation of the current object as a single chunk.
+
+        :return: An iterator over the only chunk of the HTML representation.
+        :rtype: Iterator[str]
+        :raises ValueError: If the HTML value is None and the tag is not None.
+        """
+        yield self.to_html()
     
 
     def __repr__(self):
@@ -106,6 +138,8 @@ class LeafNode(HTMLNode):
 # it contains other HTML elements, does not have own value
 class ParentNode(HTMLNode):
 
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         """
         Initializes a new instance of the ParentNode class.
@@ -124,6 +158,18 @@ class ParentNode(HTMLNode):
         Returns:
             str: The HTML representation of the current HTMLNode object and its children.
 
+        Raises:
+            ValueError: If the tag or children of the HTMLNode object are None.
+        """
+        return "".join(self.iter_html())
+
+    def opening_tag(self):
+        """
+        Generates the opening tag of the current object, with its attributes.
+
+        Returns:
+            str: The opening tag.
+
         Raises:
             ValueError: If the tag or children of the HTMLNode object are None.
         """
@@ -133,14 +179,39 @@ class ParentNode(HTMLNode):
         # should have children
         if self.children is None:
             raise ValueError("Invalid HTML: no HTMLContent")
+        return f"<{self.tag}{self.props_to_html()}>"
+
+    def iter_html(self):
+        """
+        Generates the HTML representation of the current HTMLNode object and its children as a sequence of chunks.
+
+        Returns:
+            Iterator[str]: The chunks of the HTML representation, in order.
+
+        Raises:
+            ValueError: If the tag or children of the HTMLNode object (or of a descendant) are None.
+
+        The tree is walked with an explicit stack instead of recursion, so every chunk is produced exactly once
+        (nothing is copied into the string of its parent) and deep trees don't hit the recursion limit.
+        """
+        yield self.opening_tag()
+
+        # (node, iterator over its remaining children) for every open element
+        stack = [(self, iter(self.children))]
 
-        inner_html = ""
+        while stack:
+            node, children = stack[-1]
 
-        # recursively call it for all of it's children
-        for child in self.children:
-            inner_html += child.to_html()
-        # opening tag with attributes, innerHTML (children), closing tag
-        return f"<{self.tag}{self.props_to_html()}>{inner_html}</{self.tag}>"
+            for child in children:
+                if isinstance(child, ParentNode):
+                    yield child.opening_tag()
+                    stack.append((child, iter(child.children)))
+                    break
+                yield from child.iter_html()
+            else:
+                # every child written, closing tag
+                stack.pop()
+                yield f"</{node.tag}>"
 
     def __repr__(self):
         """
@@ -6,8 +6,18 @@ from textnode import (
     text_type_bold,
     text_type_italic,
     text_type_code,
+    text_type_link,
+    text_type_image,
     )
 
+# inline delimiters in order of precedence, "**" is tried before "*" at the same position
+delimiter_pattern = re.compile(r"\*\*|\*|`")
+image_pattern = re.compile(r"!\[(.*?)\]\((.*?)\)")
+link_pattern = re.compile(r"\[(.*?)\]\((.*?)\)")
+
+# text type of the section opened by each delimiter
+delimiter_text_types = {"**": text_type_bold, "*": text_type_italic, "`": text_type_code}
+
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     """
@@ -79,7 +89,7 @@ def extract_markdown_images(text):
     Returns:
         List[Tuple[str, str]]: A list of tuples, each containing the image name (alt) and the image URL.
     """
-    return re.findall(r"!\[(.*?)\]\((.*?)\)", text)
+    return image_pattern.findall(text)
 
 
 def extract_markdown_links(text):
@@ -88,7 +98,7 @@ def extract_markdown_links(text):
     :param text: The input text containing markdown links.
     :return: A list of tuples containing the link text and link URLs.
     """
-    return re.findall(r"\[(.*?)\]\((.*?)\)", text)
+    return link_pattern.findall(text)
 
 
 def split_nodes_image(old_nodes):
@@ -105,18 +115,13 @@ def split_nodes_image(old_nodes):
         This function takes a list of TextNodes and splits them based on markdown image references.
         It iterates over each TextNode in the list and checks if its text type is not equal to text_type_text.
         If it is not, the TextNode is appended to the new_nodes list as is.
-        Otherwise, the text of the TextNode is checked for markdown image references using the
-        extract_markdown_images function.
-        If there are matches, the first match is obtained.
-        The TextNode is split into sections using the markdown image reference as the delimiter.
-        If the first section is not empty, a new TextNode is created with the first section text and text_type_text,
-        and appended to the split_nodes list.
-        A new TextNode is created with the image name (alt) and image URL extracted from the markdown image
-        reference, and appended to the split_nodes list.
-        If the second section is not empty, the split_nodes_image function is called recursively with a new TextNode
-        containing the second section text and text_type_text, and the resulting split TextNodes are appended to the
-        split_nodes list.
-        Finally, the split_nodes list is extended to the new_nodes list.
+        Otherwise, the markdown image references of the text are visited in order with `re.finditer`.
+        For each of them, the text between the previous reference and this one (if not empty) becomes a TextNode
+        with text_type_text, and the image name (alt) and image URL become a TextNode with text_type_image.
+        The text after the last reference (if not empty) becomes a final TextNode with text_type_text.
+        A TextNode without image references is appended as is.
+        The text is scanned once and sliced at the match spans, so the function runs in linear time and does not
+        recurse, however many images the text contains.
         The function returns the new_nodes list, which contains the split TextNodes.
 
     Example:
@@ -128,33 +133,7 @@ def split_nodes_image(old_nodes):
         #     TextNode("image", text_type_image, "https://i.imgur.com/zjjcJKZ.png"),
         # ]
     """
-
-    new_nodes = []
-
-    for old_node in old_nodes:
-        if old_node.text_type != text_type_text:
-            new_nodes.append(old_node)
-            continue
-
-        matches = extract_markdown_images(old_node.text)
-        if matches:
-            match = matches[0]
-
-            split_nodes = []
-
-            sections = old_node.text.split(f"![{match[0]}]({match[1]})", 1)
-
-            if sections[0] != "":
-                split_nodes.append(TextNode(sections[0], text_type_text))
-            split_nodes.append(TextNode(f"{match[0]}", "image", match[1]))
-            if sections[1] != "":
-                split_nodes.extend(split_nodes_image([TextNode(sections[1], text_type_text)]))
-
-            new_nodes.extend(split_nodes)
-        else:
-            new_nodes.append(old_node)
-
-    return new_nodes
+    return split_nodes_pattern(old_nodes, image_pattern, text_type_image)
 
 
 def split_nodes_link(old_nodes):
@@ -172,18 +151,13 @@ def split_nodes_link(old_nodes):
         This function takes a list of TextNodes and splits them based on markdown link references.
         It iterates over each TextNode in the list and checks if its text type is not equal to text_type_text.
         If it is not, the TextNode is appended to the new_nodes list as is.
-        Otherwise, the text of the TextNode is checked for markdown link references using the extract_markdown_links
-        function.
-        If there are matches, the first match is obtained.
-        The TextNode is split into sections using the markdown link reference as the delimiter.
-        If the first section is not empty, a new TextNode is created with the first section text and text_type_text,
-        and appended to the split_nodes list.
-        A new TextNode is created with the link name (text) and link URL extracted from the markdown link reference,
-        and appended to the split_nodes list.
-        If the second section is not empty, the split_nodes_link function is called recursively with a new TextNode
-        containing the second section text and text_type_text, and the resulting split TextNodes are appended to the
-        split_nodes list.
-        Finally, the split_nodes list is extended to the new_nodes list.
+        Otherwise, the markdown link references of the text are visited in order with `re.finditer`.
+        For each of them, the text between the previous reference and this one (if not empty) becomes a TextNode
+        with text_type_text, and the link name (text) and link URL become a TextNode with text_type_link.
+        The text after the last reference (if not empty) becomes a final TextNode with text_type_text.
+        A TextNode without link references is appended as is.
+        The text is scanned once and sliced at the match spans, so the function runs in linear time and does not
+        recurse, however many links the text contains.
         The function returns the new_nodes list, which contains the split TextNodes.
 
     Example:
@@ -195,6 +169,21 @@ def split_nodes_link(old_nodes):
         #     TextNode("link", text_type_link, "https://example.com"),
         # ]
     """
+    return split_nodes_pattern(old_nodes, link_pattern, text_type_link)
+
+
+def split_nodes_pattern(old_nodes, pattern, text_type):
+    """
+    Splits the text TextNodes of the given list on the matches of a reference pattern.
+
+    Args:
+        old_nodes (List[TextNode]): The list of TextNodes to be split.
+        pattern (re.Pattern): The pattern of the references, capturing their text and their URL.
+        text_type (str): The text type of the TextNodes created from the references.
+
+    Returns:
+        List[TextNode]: The list of split TextNodes.
+    """
     new_nodes = []
 
     for old_node in old_nodes:
@@ -202,27 +191,80 @@ def split_nodes_link(old_nodes):
             new_nodes.append(old_node)
             continue
 
-        matches = extract_markdown_links(old_node.text)
-        if matches:
-            match = matches[0]
-
-            split_nodes = []
+        text = old_node.text
+        start = 0
+        matched = False
 
-            sections = old_node.text.split(f"[{match[0]}]({match[1]})", 1)
+        for match in pattern.finditer(text):
+            matched = True
 
-            if sections[0] != "":
-                split_nodes.append(TextNode(sections[0], text_type_text))
-            split_nodes.append(TextNode(f"{match[0]}", "link", match[1]))
-            if sections[1] != "":
-                split_nodes.extend(split_nodes_link([TextNode(sections[1], text_type_text)]))
+            if match.start() > start:
+                new_nodes.append(TextNode(text[start:match.start()], text_type_text))
+            new_nodes.append(TextNode(match.group(1), text_type, match.group(2)))
+            start = match.end()
 
-            new_nodes.extend(split_nodes)
-        else:
+        if not matched:
             new_nodes.append(old_node)
+        elif start < len(text):
+            new_nodes.append(TextNode(text[start:], text_type_text))
 
     return new_nodes
 
 
+def split_text_references(text, nodes):
+    """
+    Splits a plain text section on its markdown image and link references, appending the resulting TextNodes.
+
+    Args:
+        text (str): The plain text section, free of inline delimiters.
+        nodes (List[TextNode]): The list the TextNodes are appended to.
+
+    Returns:
+        None
+
+    Images are matched first and links only in the text between them, like `split_nodes_image` followed by
+    `split_nodes_link`. Every match is visited once with `re.finditer`, so the section is processed in linear time.
+    """
+    # most sections have no reference at all
+    if "[" not in text:
+        if text != "":
+            nodes.append(TextNode(text, text_type_text))
+        return
+
+    image_start = 0
+
+    for image in image_pattern.finditer(text):
+        split_text_links(text[image_start:image.start()], nodes)
+        nodes.append(TextNode(image.group(1), text_type_image, image.group(2)))
+        image_start = image.end()
+
+    split_text_links(text[image_start:], nodes)
+
+
+def split_text_links(text, nodes):
+    """
+    Splits a plain text section without images on its markdown link references, appending the resulting
+    TextNodes.
+
+    Args:
+        text (str): The plain text section.
+        nodes (List[TextNode]): The list the TextNodes are appended to.
+
+    Returns:
+        None
+    """
+    start = 0
+
+    for link in link_pattern.finditer(text):
+        if link.start() > start:
+            nodes.append(TextNode(text[start:link.start()], text_type_text))
+        nodes.append(TextNode(link.group(1), text_type_link, link.group(2)))
+        start = link.end()
+
+    if start < len(text):
+        nodes.append(TextNode(text[start:], text_type_text))
+
+
 def text_to_textnodes(text):
     """
     Convert a given text into a list of inline TextNode objects.
@@ -232,12 +274,51 @@ def text_to_textnodes(text):
 
     Returns:
         list: A list of TextNode objects representing the converted text.
+
+    Raises:
+        ValueError: If a formatted section is not closed.
+
+    Description:
+        The text is scanned once from left to right, producing the same nodes as splitting it on "**", then "*",
+        then "`" with `split_nodes_delimiter` and finally on images and links, without building the intermediate
+        lists. A "**" delimiter takes precedence over everything: it closes a bold section, and it may not appear
+        inside an open italic or code section. Inside a bold section every other delimiter is plain text, inside an
+        italic section "`" is plain text, and a "*" may not appear inside an open code section. Empty sections are
+        dropped, and images and links are only looked for in plain text between delimiters.
     """
+    nodes = []
+
+    # most text has no delimiter at all, and checking for both characters in C beats the scan
+    if "*" not in text and "`" not in text:
+        split_text_references(text, nodes)
+        return nodes
+
+    # delimiter of the open section, None for plain text
+    open_delimiter = None
+    start = 0
+
+    for match in delimiter_pattern.finditer(text):
+        delimiter = match.group()
+
+        if open_delimiter is None:
+            split_text_references(text[start:match.start()], nodes)
+            open_delimiter = delimiter
+            start = match.end()
+            continue
+
+        if delimiter == open_delimiter:
+            if match.start() > start:
+                nodes.append(TextNode(text[start:match.start()], delimiter_text_types[delimiter]))
+            open_delimiter = None
+            start = match.end()
+            continue
+
+        # a delimiter with higher precedence can't be nested in an open section
+        if delimiter == "**" or (delimiter == "*" and open_delimiter == "`"):
+            raise ValueError("Invalid markdown, formatted section not closed")
+
+    if open_delimiter is not None:
+        raise ValueError("Invalid markdown, formatted section not closed")
 
-    node = TextNode(text, text_type_text)
-    nodes = split_nodes_delimiter([node], "**", text_type_bold)
-    nodes = split_nodes_delimiter(nodes, "*", text_type_italic)
-    nodes = split_nodes_delimiter(nodes, "`", text_type_code)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    split_text_references(text[start:], nodes)
     return nodes
@@ -1,22 +1,342 @@
+import argparse
+import traceback
 import os.path as path
-from copystatic import copy_static_to_public, delete_directory
-from generate_static import generate_pages_recursive
+from time import perf_counter
+from contextlib import nullcontext
+from copystatic import sync_static_to_public
+from generate_static import find_pages, generate_pages_incremental
+from profiling import BuildProfile, Trace, build_stage
+from build_log import BuildLog, conversion_log_path, copy_log_path
+from precompress import precompress_directory
+from watch import create_watcher, wait_for_changes
+from generations import Generations
 
 dir_path_static = "./static"
 dir_path_public = "./public"
 dir_path_content = "./content"
 template_path = "./template.html"
+manifest_path = "./.cache/manifest.json"
+static_manifest_path = "./.cache/static_manifest.json"
+precompress_manifest_path = "./.cache/precompress_manifest.json"
+block_cache_path = "./.cache/blocks.sqlite"
+profile_dir = "./.cache/profile"
+generations_dir = "./.generations"
+
+
+def build(args, variables, public_path=dir_path_public, pages=True, static=True, force=False, profile=None, trace=None):
+    """
+    Builds the site in place into the public directory.
+
+    Args:
+        args (argparse.Namespace): The command line arguments of the build.
+        variables (dict): Values of additional template placeholders.
+        public_path (str, optional): The directory the site is built in. Defaults to `dir_path_public`.
+        pages (bool, optional): Generate the pages changed since the last build. Defaults to True.
+        static (bool, optional): Copy the static files changed since the last build. Defaults to True.
+        force (bool, optional): Render every page. The static files are synced either way, their manifest tells what
+        changed. Defaults to False.
+        profile (BuildProfile, optional): The profile of the build. Defaults to None.
+        trace (Trace, optional): The trace of the build. Defaults to None.
+
+    Returns:
+        dict: The counts of `generate_pages_incremental`, None if the pages were not generated.
+    """
+    counts = None
+
+    # one buffered handle per log for the whole build
+    with BuildLog(copy_log_path) as copy_log, BuildLog(conversion_log_path) as conversion_log:
+        # generated pages take precedence over static files with the same output path
+        with nullcontext() if trace is None else trace.span("page discovery"):
+            found_pages = find_pages(dir_path_content, public_path)
+
+        if static:
+            with build_stage("static", profile, trace):
+                sync_static_to_public(
+                    dir_path_static,
+                    public_path,
+                    static_manifest_path,
+                    exclude=[dst for _, dst in found_pages],
+                    jobs=args.copy_jobs,
+                    use_hash=args.hash_static,
+                    link=args.link_static,
+                    trace=trace,
+                    log=copy_log,
+                )
+            print()
+
+        if pages:
+            counts = generate_pages_incremental(
+                dir_path_content,
+                template_path,
+                public_path,
+                manifest_path,
+                force=force,
+                jobs=args.jobs,
+                variables=variables,
+                block_cache_path=block_cache_path if args.persistent_cache else None,
+                profile=profile,
+                trace=trace,
+                log=conversion_log,
+                pages=found_pages,
+            )
+
+        if args.precompress:
+            print()
+
+            with build_stage("compress", profile, trace):
+                precompress_directory(
+                    public_path,
+                    precompress_manifest_path,
+                    jobs=args.copy_jobs,
+                    trace=trace,
+                    log=copy_log,
+                )
+    return counts
+
+
+def build_staged(args, variables, pages=True, static=True, force=False, profile=None, trace=None):
+    """
+    Builds the site into a staging directory and publishes it as a new generation, see `generations.Generations`.
+
+    Args:
+        args (argparse.Namespace): The command line arguments of the build.
+        variables (dict): Values of additional template placeholders.
+        pages (bool, optional): Generate the pages changed since the last build. Defaults to True.
+        static (bool, optional): Copy the static files changed since the last build. Defaults to True.
+        force (bool, optional): Render every page. The staging directory starts from the published outputs,
+        hardlinked, either way. Defaults to False.
+        profile (BuildProfile, optional): The profile of the build. Defaults to None.
+        trace (Trace, optional): The trace of the build. Defaults to None.
+
+    Returns:
+        dict: The counts of `generate_pages_incremental`, None if the pages were not generated.
+
+    The public directory keeps serving the published generation for the whole build. A failed build publishes
+    nothing.
+    """
+    generations = Generations(
+        dir_path_public,
+        generations_dir,
+        [manifest_path, static_manifest_path, precompress_manifest_path],
+    )
+
+    with build_stage("stage", profile, trace):
+        staging_path = generations.stage()
+
+    try:
+        counts = build(args, variables, staging_path, pages, static, force, profile, trace)
+    except BaseException:
+        generations.discard()
+        raise
+
+    with build_stage("publish", profile, trace):
+        generation_path = generations.publish()
+
+    print(f"Published {generation_path} as {dir_path_public}")
+    return counts
+
+
+def is_under(file_path, dir_path):
+    """
+    Tells whether a path is a directory or inside of it.
+
+    Args:
+        file_path (str): The path to be checked.
+        dir_path (str): The path to the directory.
+
+    Returns:
+        bool: True if the path is the directory or one of its descendants.
+    """
+    file_path = path.normpath(file_path)
+    dir_path = path.normpath(dir_path)
+    return file_path == dir_path or file_path.startswith(path.join(dir_path, ""))
+
+
+def watch(args, variables, debounce):
+    """
+    Rebuilds the site whenever the content, the static files or the template change, until interrupted.
+
+    Args:
+        args (argparse.Namespace): The command line arguments of the build.
+        variables (dict): Values of additional template placeholders.
+        debounce (float): Seconds without further change that end a burst of changes, which is rebuilt at once.
+
+    Returns:
+        None
+
+    The pages are only generated when the content or the template changed, and both steps only touch the pages and
+    assets that changed, see `generate_pages_incremental` and `sync_static_to_public`. The static step always runs,
+    it only costs a stat per static file and a removed page uncovers the static file with its output path. A failed
+    rebuild is reported and the next change is waited for.
+    """
+    watcher = create_watcher([dir_path_content, dir_path_static, template_path])
+    print(f"Watching {dir_path_content}, {dir_path_static} and {template_path} for changes, Ctrl+C stops...")
+
+    try:
+        while True:
+            changed = wait_for_changes(watcher, debounce)
+            pages = any(is_under(file_path, dir_path_content) or is_under(file_path, template_path)
+                        for file_path in changed)
+            started = perf_counter()
+            print()
+            print(f"{len(changed)} files changed, rebuilding...")
+
+            try:
+                (build_staged if args.staged else build)(args, variables, pages=pages)
+            except Exception:
+                traceback.print_exc()
+                continue
+
+            print(f"Rebuilt in {(perf_counter() - started) * 1000:.0f} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
 
 
 def main():
-    delete_directory(dir_path_public)
-    copy_static_to_public(dir_path_static, dir_path_public)
-    print()
-    generate_pages_recursive(
-        dir_path_content, 
-        template_path,
-        dir_path_public
+    parser = argparse.ArgumentParser(description="Static site builder")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only re-render the pages changed since the last build, the static files are always synced",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes generating pages, 0 uses every CPU",
+    )
+    parser.add_argument(
+        "--copy-jobs",
+        type=int,
+        default=8,
+        help="Number of threads copying static files",
+    )
+    parser.add_argument(
+        "--hash-static",
+        action="store_true",
+        help="Compare static file contents when their size or modification time changed",
+    )
+    parser.add_argument(
+        "--link-static",
+        action="store_true",
+        help="Hardlink static files into the public directory instead of copying them",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help="Write gzip (and brotli, if installed) siblings of the compressible outputs for the server to send",
+    )
+    parser.add_argument(
+        "--var",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Value of a {{ NAME }} placeholder of the templates, can be repeated",
+    )
+    parser.add_argument(
+        "--persistent-cache",
+        action="store_true",
+        help="Keep the rendered blocks in a database reused by the next builds",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=f"Time the build stages and every page, and dump cProfile statistics to {profile_dir}",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        help="Number of slowest pages listed by --profile",
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="Write the timeline of the build as Chrome trace events to PATH, viewable in ui.perfetto.dev",
+    )
+    parser.add_argument(
+        "--staged",
+        action="store_true",
+        help=(
+            f"Build into a staging directory and publish it by flipping {dir_path_public}, a symlink to the newest "
+            f"generation in {generations_dir}, keeping the previous one (unchanged outputs are hardlinked from it)"
+        ),
+    )
+    parser.add_argument(
+        "--rollback",
+        action="store_true",
+        help=f"Point {dir_path_public} back to the generation published before the current one, without building",
     )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="After the build, rebuild what changed whenever the content, the static files or the template change",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=0.05,
+        help="Seconds without further change that end a burst of changes rebuilt at once by --watch",
+    )
+    args = parser.parse_args()
+
+    variables = {}
+    for var in args.var:
+        name, separator, value = var.partition("=")
+        if separator == "" or name.strip() == "":
+            parser.error(f"invalid --var {var!r}, expected NAME=VALUE")
+        variables[name.strip()] = value
+
+    if args.rollback:
+        try:
+            generation_path = Generations(dir_path_public, generations_dir).rollback()
+        except ValueError as error:
+            parser.error(str(error))
+
+        print(f"Published {generation_path} as {dir_path_public}")
+        return
+
+    # once public is a symlink to a published generation, building in place would empty and rewrite that very
+    # generation while it is served, and leave the state saved with it out of date
+    if not args.staged and path.islink(dir_path_public):
+        print(f"{dir_path_public} is a published generation, building staged")
+        args.staged = True
+
+    profile = BuildProfile(profile_dir, args.profile_top) if args.profile else None
+    trace = Trace() if args.trace is not None else None
+
+    if profile is not None:
+        profile.start()
+
+    counts = (build_staged if args.staged else build)(
+        args,
+        variables,
+        force=not args.incremental,
+        profile=profile,
+        trace=trace,
+    )
+
+    print(f"Block cache: {counts['cache_hits']} hits, {counts['cache_misses']} misses")
+
+    if profile is not None:
+        profile.stop()
+        pstats_path, report_path = profile.save()
+        print()
+        print("\n".join(profile.summary()))
+        print(f"cProfile statistics written to {pstats_path}, timings to {report_path}")
+
+    if trace is not None:
+        trace.save(args.trace)
+        print(f"Trace written to {args.trace}")
+
+    if args.watch:
+        print()
+        watch(args, variables, args.debounce)
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import json
+import hashlib
+import os.path as path
+
+from os import makedirs, replace
+
+# bump when the layout of the manifest changes, older manifests are then ignored
+manifest_version = 1
+
+
+def hash_file(file_path):
+    """
+    Calculates the SHA-256 hash of a file's content.
+
+    Args:
+        file_path (str): The path to the file to be hashed.
+
+    Returns:
+        str: The hexadecimal digest of the file's content.
+    """
+    digest = hashlib.sha256()
+
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def new_manifest(section="pages"):
+    """
+    Creates an empty build manifest.
+
+    Args:
+        section (str, optional): The name of the section holding the recorded entries. Defaults to "pages".
+
+    Returns:
+        dict: A manifest without any recorded entries.
+    """
+    return {"version": manifest_version, section: {}}
+
+
+def load_manifest(manifest_path, section="pages"):
+    """
+    Loads the build manifest recorded by a previous build.
+
+    Args:
+        manifest_path (str): The path to the manifest JSON file.
+        section (str, optional): The name of the section holding the recorded entries. Defaults to "pages".
+
+    Returns:
+        dict: The loaded manifest, or an empty manifest if the file does not exist, can't be parsed, was written
+        by an incompatible version or does not have the requested section.
+    """
+    if not path.isfile(manifest_path):
+        return new_manifest(section)
+
+    try:
+        with open(manifest_path, "r") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return new_manifest(section)
+
+    if (
+            not isinstance(manifest, dict)
+            or manifest.get("version") != manifest_version
+            or not isinstance(manifest.get(section), dict)
+    ):
+        return new_manifest(section)
+    return manifest
+
+
+def save_manifest(manifest_path, manifest):
+    """
+    Writes the build manifest to disk.
+
+    The manifest is written to a temporary file first and then moved in place, so an interrupted build never leaves
+    a truncated manifest behind.
+
+    Args:
+        manifest_path (str): The path to the manifest JSON file.
+        manifest (dict): The manifest to be saved.
+
+    Returns:
+        None
+    """
+    manifest_dir_path = path.dirname(manifest_path)
+
+    if manifest_dir_path != "":
+        makedirs(manifest_dir_path, exist_ok=True)
+
+    tmp_path = f"{manifest_path}.tmp"
+
+    # json.dumps encodes in C, json.dump and indenting in Python, many times slower on the manifest of a large site
+    with open(tmp_path, "w") as file:
+        file.write(json.dumps(manifest, sort_keys=True))
+    replace(tmp_path, manifest_path)
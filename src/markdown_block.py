@@ -29,12 +29,75 @@ def markdown_to_blocks(markdown):
     return blocks
 
 
-def block_to_block_type(block):
+def iter_blocks(file):
+    """
+    Reads markdown from a file object line by line and yields its blocks lazily, together with their types.
+
+    Args:
+        file (file): A text file object, or any iterable of lines ending with "\n".
+
+    Yields:
+        tuple: The block (str) and its type (str), exactly like `markdown_to_blocks` followed by
+        `block_to_block_type`.
+
+    Only the lines of the current block are kept in memory, so memory use does not depend on the size of the
+    document. The lines are collected as a state machine emulating `markdown.split("\n\n")`: an empty line ends
+    the current block when the block so far ends with a newline (its last line was complete), otherwise it belongs
+    to the next block. Each block is stripped like in `markdown_to_blocks`, and its lines are handed to
+    `block_to_block_type`, so the block is never split into lines again.
+    """
+    lines = []
+
+    for line in file:
+        if line == "\n" and lines != [] and lines[-1].endswith("\n"):
+            lines[-1] = lines[-1][:-1]
+            yield from finish_block(lines)
+            lines = []
+        else:
+            lines.append(line)
+
+    yield from finish_block(lines)
+
+
+def finish_block(raw_lines):
+    """
+    Strips the raw lines of a block collected by `iter_blocks` and determines its type.
+
+    Args:
+        raw_lines (list): The lines of the block, each but the last one ending with "\n".
+
+    Yields:
+        tuple: The stripped block (str) and its type (str), if the raw block was not empty.
+    """
+    if raw_lines == [] or raw_lines == [""]:
+        return
+
+    lines = [line.rstrip("\n") for line in raw_lines]
+
+    # same as block.strip().split("\n"), without building the unstripped block first
+    while lines != [] and lines[0].strip() == "":
+        lines.pop(0)
+    while lines != [] and lines[-1].strip() == "":
+        lines.pop()
+
+    if lines == []:
+        yield "", block_to_block_type("", [""])
+        return
+
+    lines[0] = lines[0].lstrip()
+    lines[-1] = lines[-1].rstrip()
+    block = "\n".join(lines)
+    yield block, block_to_block_type(block, lines)
+
+
+def block_to_block_type(block, lines=None):
     """
     Determines the type of a given block of markdown text.
 
     Args:
         block (str): The block of markdown text to be analyzed.
+        lines (list, optional): The lines of the block, if the caller already has them. Split from the block when
+        None. Defaults to None.
 
     Returns:
         str: The type of the block. Possible values are "heading", "unordered list", "ordered list", "code block",
@@ -44,7 +107,8 @@ def block_to_block_type(block):
         ValueError: If the block is a code block but does not have the required closing symbols.
 
     """
-    lines = block.split("\n")
+    if lines is None:
+        lines = block.split("\n")
 
     # headings
     if (
@@ -310,12 +374,14 @@ def quote_to_html_node(block):
     return ParentNode("blockquote", children)
 
 
-def block_to_html_node(block):
+def block_to_html_node(block, block_type=None):
     """
     Convert a block of text to an HTML node based on its type.
 
     Args:
         block (str): The block of text to be converted.
+        block_type (str, optional): The type of the block, if the caller already knows it. Determined with
+        `block_to_block_type` when None. Defaults to None.
 
     Returns:
         ParentNode: The converted HTML node based on the block type.
@@ -339,7 +405,8 @@ def block_to_html_node(block):
         >> block_to_html_node("# Heading\nThis is a paragraph.")
         ParentNode("h1", [LeafNode(None, "Heading")])
     """
-    block_type = block_to_block_type(block)
+    if block_type is None:
+        block_type = block_to_block_type(block)
 
     if block_type == block_type_paragraph:
         return paragraph_to_html_node(block)
@@ -0,0 +1,226 @@
+import gzip
+import os.path as path
+
+from os import fstat, remove, replace, stat, utime
+from time import perf_counter
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from copystatic import find_static_files, prune_empty_dirs
+from build_log import BuildLog, copy_log_path
+from manifest import load_manifest, new_manifest, save_manifest
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# outputs worth compressing, images and fonts are compressed already
+compressible_suffixes = (".html", ".htm", ".css", ".js", ".mjs", ".json", ".svg", ".xml", ".txt", ".md", ".map")
+
+
+def gzip_compress(data):
+    """
+    Compresses data with gzip at the highest level, without a timestamp so the output only depends on the input.
+
+    Args:
+        data (bytes): The data to be compressed.
+
+    Returns:
+        bytes: The gzip stream.
+    """
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_compress(data):
+    """
+    Compresses data with brotli at the highest quality.
+
+    Args:
+        data (bytes): The data to be compressed.
+
+    Returns:
+        bytes: The brotli stream.
+    """
+    return brotli.compress(data, quality=11)
+
+
+# suffix of the compressed sibling -> compression function, brotli only if its module is installed
+encoders = {".gz": gzip_compress}
+
+if brotli is not None:
+    encoders[".br"] = brotli_compress
+
+
+def is_compressible(file_path, min_size):
+    """
+    Tells whether a file should get compressed siblings.
+
+    Args:
+        file_path (str): The path to the file.
+        min_size (int): The size below which compressing does not pay off.
+
+    Returns:
+        bool: True if the file has a compressible suffix and is big enough.
+    """
+    return file_path.endswith(compressible_suffixes) and path.getsize(file_path) >= min_size
+
+
+def compress_file(file_path, suffixes):
+    """
+    Writes the compressed siblings of a file, e.g. "index.html.gz", each through a temporary file.
+
+    Args:
+        file_path (str): The path to the file.
+        suffixes (list): The suffixes of the siblings to be written, see `encoders`.
+
+    Returns:
+        list: The (sibling path, size, seconds) of every sibling written. A sibling that would not be smaller than
+        the file is not written, and an older version of it is deleted.
+
+    Every sibling gets the modification time of the file it was compressed from, which is how both the build and
+    the server tell whether it is up to date.
+    """
+    with open(file_path, "rb") as file:
+        file_stat = fstat(file.fileno())
+        data = file.read()
+
+    written = []
+
+    for suffix in suffixes:
+        started = perf_counter()
+        compressed = encoders[suffix](data)
+        sibling_path = file_path + suffix
+
+        if len(compressed) >= len(data):
+            if path.exists(sibling_path):
+                remove(sibling_path)
+            continue
+
+        tmp_path = path.join(path.dirname(sibling_path), f".{path.basename(sibling_path)}.tmp")
+
+        try:
+            with open(tmp_path, "wb") as file:
+                file.write(compressed)
+            utime(tmp_path, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns))
+            replace(tmp_path, sibling_path)
+        except BaseException:
+            if path.exists(tmp_path):
+                remove(tmp_path)
+            raise
+
+        written.append((sibling_path, len(compressed), perf_counter() - started))
+    return written
+
+
+def is_sibling_up_to_date(file_path, file_stat, suffix):
+    """
+    Tells whether the compressed sibling of a file was compressed from its current version.
+
+    Args:
+        file_path (str): The path to the file.
+        file_stat (os.stat_result): The status of the file.
+        suffix (str): The suffix of the sibling.
+
+    Returns:
+        bool: True if the sibling exists and has the modification time of the file.
+    """
+    try:
+        return stat(file_path + suffix).st_mtime_ns == file_stat.st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def precompress_directory(dir_path, state_path, jobs=8, min_size=256, trace=None, log=None):
+    """
+    Writes compressed siblings of the compressible files of a directory, so a server can send them as they are.
+
+    Args:
+        dir_path (str): The directory, e.g. the public directory after the build.
+        state_path (str): The path to the JSON file recording the siblings written by the previous run.
+        jobs (int, optional): The number of threads compressing files. Defaults to 8.
+        min_size (int, optional): Files smaller than this many bytes are not compressed. Defaults to 256.
+        trace (Trace, optional): The trace recording every compressed file. Defaults to None.
+        log (BuildLog, optional): The log of the build. Defaults to None, which opens the copy log for the call.
+
+    Returns:
+        dict: The number of "compressed" siblings written, of "unchanged" ones and of "deleted" orphans.
+
+    A sibling is only written again when the file changed since it was compressed. A sibling that would not be
+    smaller than its file is not written, the modification time of the file is recorded instead, so the file is
+    only compressed again once it changed. Siblings written by the previous run whose file is gone or no longer
+    compressible are deleted, other ".gz" and ".br" files (e.g. static downloads) are left alone.
+    """
+    if log is None:
+        with BuildLog(copy_log_path) as log:
+            return precompress_directory(dir_path, state_path, jobs, min_size, trace, log)
+
+    print(f"Compressing files of {dir_path} directory...")
+
+    started = perf_counter()
+    old_state = load_manifest(state_path, "siblings")
+    old_siblings = old_state["siblings"]
+    # sibling path -> modification time of the file it was not worth compressing
+    old_incompressible = old_state.get("incompressible", {})
+    state = new_manifest("siblings")
+    state["incompressible"] = {}
+    counts = {"compressed": 0, "unchanged": 0, "deleted": 0}
+    compressible = []
+    outdated = []
+
+    for file_path, _ in find_static_files(dir_path, dir_path)[0]:
+        if file_path.endswith(tuple(encoders)) or not is_compressible(file_path, min_size):
+            continue
+
+        compressible.append(file_path)
+        file_stat = stat(file_path)
+        suffixes = []
+
+        for suffix in encoders:
+            if old_incompressible.get(file_path + suffix) == file_stat.st_mtime_ns:
+                state["incompressible"][file_path + suffix] = file_stat.st_mtime_ns
+            elif not is_sibling_up_to_date(file_path, file_stat, suffix):
+                suffixes.append(suffix)
+
+        counts["unchanged"] += len(encoders) - len(suffixes)
+
+        if suffixes:
+            outdated.append((file_path, file_stat, suffixes))
+
+    def compress_task(task):
+        with nullcontext() if trace is None else trace.span("compress", "static", src=task[0]):
+            return compress_file(task[0], task[2])
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        results = list(executor.map(compress_task, outdated))
+
+    for (file_path, file_stat, suffixes), written in zip(outdated, results):
+        for sibling_path, size, duration in written:
+            log.log("compress", sibling_path, size, duration, source=file_path)
+        counts["compressed"] += len(written)
+
+        written_paths = {sibling_path for sibling_path, _, _ in written}
+
+        for suffix in suffixes:
+            if file_path + suffix not in written_paths:
+                state["incompressible"][file_path + suffix] = file_stat.st_mtime_ns
+
+    for file_path in compressible:
+        for suffix in encoders:
+            if path.isfile(file_path + suffix):
+                state["siblings"][file_path + suffix] = file_path
+
+    for sibling_path in sorted(old_siblings):
+        if sibling_path not in state["siblings"] and path.isfile(sibling_path):
+            remove(sibling_path)
+            counts["deleted"] += 1
+            log.log("delete", sibling_path, reason="orphaned compressed file")
+            # the directory of a removed page is only empty once its siblings are gone too
+            prune_empty_dirs(path.dirname(sibling_path), dir_path)
+
+    save_manifest(state_path, state)
+
+    log.log("compress finished", dir_path, duration=perf_counter() - started, **counts)
+    log.flush()
+
+    print(f"{counts['compressed']} files compressed, {counts['unchanged']} unchanged, {counts['deleted']} deleted")
+    return counts
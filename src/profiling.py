@@ -0,0 +1,503 @@
+import sys
+import json
+import glob
+import pstats
+import cProfile
+import os.path as path
+
+from os import getpid, makedirs, remove
+from time import monotonic_ns, perf_counter
+from threading import get_native_id
+from contextlib import contextmanager, nullcontext
+
+# stages of generating a single page, in pipeline order
+page_stages = ("read", "parse", "render", "title", "template", "write")
+# file names of the outputs of a profiled build in the profile directory
+pstats_file_name = "build.pstats"
+report_file_name = "build_profile.json"
+worker_file_pattern = "worker-*.prof"
+
+# cProfile profiler of a worker process, see `run_profiled`
+worker_profiler = None
+
+
+def trace_event(name, start_ns, end_ns, category, args=None):
+    """
+    Creates a complete ("X") event of the Chrome trace event format for a span of the current thread.
+
+    Args:
+        name (str): The name of the span.
+        start_ns (int): The start of the span, from `time.monotonic_ns`, which is shared by every process of the
+        machine, so the spans of workers line up with the ones of the build.
+        end_ns (int): The end of the span, from `time.monotonic_ns`.
+        category (str): The category of the span, e.g. "build", "page" or "static".
+        args (dict, optional): Details shown with the span by the trace viewer. Defaults to None.
+
+    Returns:
+        dict: The trace event, with timestamps in microseconds.
+    """
+    event = {
+        "name": name,
+        "cat": category,
+        "ph": "X",
+        "ts": start_ns / 1000,
+        "dur": (end_ns - start_ns) / 1000,
+        "pid": getpid(),
+        "tid": get_native_id(),
+    }
+
+    if args:
+        event["args"] = args
+    return event
+
+
+# wall time spent in named stages, a stage nested in another one is not counted in the outer one
+class StageTimer:
+
+    def __init__(self, trace=False):
+        """
+        Initializes a new, empty instance of the StageTimer class.
+
+        Parameters:
+            trace (bool): Also record the stages as trace events, see `trace_event`. Defaults to False.
+        """
+        # stage name -> seconds spent in the stage itself
+        self.timings = {}
+        # running stages as [name, start, seconds spent in nested stages]
+        self.running = []
+        # trace events of the stages, None when not tracing
+        self.spans = [] if trace else None
+
+    def start(self, name):
+        """
+        Starts timing a stage, nested in the currently running stage if there is one.
+
+        Args:
+            name (str): The name of the stage.
+
+        Returns:
+            None
+        """
+        self.running.append([name, perf_counter(), 0.0])
+
+    def stop(self):
+        """
+        Stops timing the most recently started stage.
+
+        Returns:
+            float: The wall time of the stage, the nested stages included.
+        """
+        name, start, nested = self.running.pop()
+        elapsed = perf_counter() - start
+        self.timings[name] = self.timings.get(name, 0.0) + elapsed - nested
+
+        if self.running:
+            self.running[-1][2] += elapsed
+        return elapsed
+
+    @contextmanager
+    def stage(self, name, span=True):
+        """
+        Times the body of a with statement as a stage.
+
+        Args:
+            name (str): The name of the stage.
+            span (bool, optional): Record the stage as a trace event when tracing. Defaults to True, stages run
+            once per block or line should not, they would flood the trace.
+        """
+        started = monotonic_ns() if span and self.spans is not None else None
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop()
+
+            if started is not None:
+                self.spans.append(trace_event(name, started, monotonic_ns(), "page"))
+
+    @contextmanager
+    def span(self, name, **args):
+        """
+        Records the body of a with statement as a trace event without timing it as a stage, e.g. to group stages.
+
+        Args:
+            name (str): The name of the span.
+            **args: Details of the span.
+        """
+        if self.spans is None:
+            yield
+            return
+
+        started = monotonic_ns()
+        try:
+            yield
+        finally:
+            self.spans.append(trace_event(name, started, monotonic_ns(), "page", args))
+
+    def timed_iter(self, iterable, name):
+        """
+        Times the production of every item of an iterable as a stage, e.g. reading the lines of a file.
+
+        Args:
+            iterable (iterable): The iterable to be timed.
+            name (str): The name of the stage.
+
+        Yields:
+            The items of the iterable. The time the consumer spends between two items is not counted.
+        """
+        iterator = iter(iterable)
+
+        while True:
+            self.start(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.stop()
+            yield item
+
+    def __repr__(self):
+        """
+        Return a string representation of the StageTimer object.
+
+        :return: A string representation of the StageTimer object.
+        :rtype: str
+        """
+        return f"StageTimer({self.timings})"
+
+
+def build_stage(name, profile=None, trace=None):
+    """
+    Times a stage of the build for the profile and records it in the trace, whichever of them is enabled.
+
+    Args:
+        name (str): The name of the stage.
+        profile (BuildProfile, optional): The profile of the build. Defaults to None.
+        trace (Trace, optional): The trace of the build. Defaults to None.
+
+    Returns:
+        contextmanager: The context timing the body of a with statement.
+    """
+    if profile is None and trace is None:
+        return nullcontext()
+    if trace is None:
+        return profile.stage(name)
+    if profile is None:
+        return trace.span(name)
+    return nested_stages(profile.stage(name), trace.span(name))
+
+
+@contextmanager
+def nested_stages(outer, inner):
+    """
+    Enters two contexts, one in the other.
+
+    Args:
+        outer (contextmanager): The outer context.
+        inner (contextmanager): The inner context.
+    """
+    with outer, inner:
+        yield
+
+
+def run_profiled(profile_dir, function, *args):
+    """
+    Calls a function under the cProfile profiler of the current worker process.
+
+    Args:
+        profile_dir (str): The directory the statistics of the worker are dumped to.
+        function (callable): The function to be profiled.
+        *args: The arguments of the function.
+
+    Returns:
+        The result of the function.
+
+    The statistics of every call accumulate in one profiler per worker, which is dumped after every call because
+    pool workers are terminated without a chance to do it once at their end.
+    """
+    global worker_profiler
+
+    if worker_profiler is None:
+        # a forked worker inherits the profiling hook of the parent build
+        sys.setprofile(None)
+        worker_profiler = cProfile.Profile()
+
+    worker_profiler.enable()
+    try:
+        return function(*args)
+    finally:
+        worker_profiler.disable()
+        worker_profiler.dump_stats(path.join(profile_dir, f"worker-{getpid()}.prof"))
+
+
+# timings and cProfile statistics of a whole build
+class BuildProfile:
+
+    def __init__(self, profile_dir, top=10):
+        """
+        Initializes a new instance of the BuildProfile class.
+
+        Parameters:
+            profile_dir (str): The directory the pstats dump and the timings report are written to.
+            top (int): The number of slowest pages listed by the summary. Defaults to 10.
+        """
+        self.profile_dir = profile_dir
+        self.top = top
+        # stages of the build: static files, page discovery, page generation, cleanup
+        self.timer = StageTimer()
+        # source path -> {"seconds": wall time, "timings": seconds per page stage}
+        self.pages = {}
+        self.profiler = cProfile.Profile()
+        self.started = None
+        self.seconds = None
+
+    def start(self):
+        """
+        Starts profiling the build, removing the worker statistics of a previous build.
+
+        Returns:
+            None
+        """
+        makedirs(self.profile_dir, exist_ok=True)
+
+        for worker_file in glob.glob(path.join(self.profile_dir, worker_file_pattern)):
+            remove(worker_file)
+
+        self.started = perf_counter()
+        self.profiler.enable()
+
+    def stop(self):
+        """
+        Stops profiling the build.
+
+        Returns:
+            None
+        """
+        self.profiler.disable()
+        self.seconds = perf_counter() - self.started
+
+    def stage(self, name):
+        """
+        Times a stage of the build, see `StageTimer.stage`.
+
+        Args:
+            name (str): The name of the stage.
+        """
+        return self.timer.stage(name)
+
+    def add_page(self, src, result):
+        """
+        Records the timings of a generated page.
+
+        Args:
+            src (str): The path to the markdown file of the page.
+            result (dict): The result of `generate_page` called with profile=True.
+
+        Returns:
+            None
+        """
+        self.pages[src] = {"seconds": result["seconds"], "timings": result["timings"]}
+
+    def page_stage_totals(self):
+        """
+        Sums the timings of every page stage over all pages.
+
+        Returns:
+            dict: The seconds spent in every page stage.
+        """
+        totals = dict.fromkeys(page_stages, 0.0)
+
+        for page in self.pages.values():
+            for name, seconds in page["timings"].items():
+                totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+    def slowest_pages(self):
+        """
+        Returns the slowest pages of the build.
+
+        Returns:
+            list: Up to `top` (source path, page timings) tuples, slowest first.
+        """
+        return sorted(self.pages.items(), key=lambda item: item[1]["seconds"], reverse=True)[:self.top]
+
+    def save(self):
+        """
+        Writes the pstats dump of the build, merged with the ones of the worker processes, and the timings report.
+
+        Returns:
+            tuple: The paths to the pstats dump and to the JSON timings report.
+        """
+        stats = pstats.Stats(self.profiler)
+
+        for worker_file in sorted(glob.glob(path.join(self.profile_dir, worker_file_pattern))):
+            stats.add(worker_file)
+
+        pstats_path = path.join(self.profile_dir, pstats_file_name)
+        stats.dump_stats(pstats_path)
+
+        report_path = path.join(self.profile_dir, report_file_name)
+        report = {
+            "seconds": self.seconds,
+            "stages": self.timer.timings,
+            "page_stages": self.page_stage_totals(),
+            "pages": self.pages,
+        }
+
+        with open(report_path, "w") as file:
+            json.dump(report, file, indent=2)
+
+        return pstats_path, report_path
+
+    def summary(self):
+        """
+        Summarizes the build stages, the page stages and the slowest pages.
+
+        Returns:
+            list: The lines of the summary.
+        """
+        lines = [f"Build profile: {self.seconds:.3f} s"]
+
+        for name, seconds in self.timer.timings.items():
+            lines.append(f"  {name:12}{seconds:9.3f} s")
+
+        lines.append(f"Page stages, summed over {len(self.pages)} pages:")
+
+        for name, seconds in self.page_stage_totals().items():
+            lines.append(f"  {name:12}{seconds:9.3f} s")
+
+        lines.append(f"Slowest {min(self.top, len(self.pages))} pages:")
+
+        for src, page in self.slowest_pages():
+            stages = ", ".join(
+                f"{name} {page['timings'][name] * 1000:.1f}" for name in page_stages if name in page["timings"]
+            )
+            lines.append(f"  {page['seconds'] * 1000:9.1f} ms  {src}  ({stages} ms)")
+        return lines
+
+    def __repr__(self):
+        """
+        Return a string representation of the BuildProfile object.
+
+        :return: A string representation of the BuildProfile object.
+        :rtype: str
+        """
+        return f"BuildProfile({self.profile_dir}, {len(self.pages)} pages)"
+
+
+# timeline of a build in the Chrome trace event format, viewable in chrome://tracing or ui.perfetto.dev
+class Trace:
+
+    def __init__(self):
+        """
+        Initializes a new, empty instance of the Trace class.
+        """
+        # trace events of the build process, of its threads and of its worker processes
+        self.events = []
+        self.pid = getpid()
+
+    @contextmanager
+    def span(self, name, category="build", **args):
+        """
+        Records the body of a with statement as a span of the current thread, safe to use from several threads.
+
+        Args:
+            name (str): The name of the span.
+            category (str, optional): The category of the span. Defaults to "build".
+            **args: Details of the span.
+        """
+        started = monotonic_ns()
+        try:
+            yield
+        finally:
+            self.events.append(trace_event(name, started, monotonic_ns(), category, args))
+
+    def add_events(self, events):
+        """
+        Adds trace events recorded elsewhere, e.g. by a worker process.
+
+        Args:
+            events (list): The trace events.
+
+        Returns:
+            None
+        """
+        self.events.extend(events)
+
+    def add_idle(self, start_ns, end_ns, events):
+        """
+        Adds "idle" spans for the time the workers of a pool did not work on a span.
+
+        Args:
+            start_ns (int): The time the pool started, from `time.monotonic_ns`.
+            end_ns (int): The time the pool finished, from `time.monotonic_ns`.
+            events (list): The outermost trace events of the work done by the pool, one per task.
+
+        Returns:
+            None
+        """
+        workers = {}
+
+        for event in events:
+            workers.setdefault((event["pid"], event["tid"]), []).append(event)
+
+        for (pid, tid), worker_events in sorted(workers.items()):
+            idle_start = start_ns / 1000
+
+            for event in sorted(worker_events, key=lambda worker_event: worker_event["ts"]):
+                self.add_idle_span(pid, tid, idle_start, event["ts"])
+                idle_start = event["ts"] + event["dur"]
+
+            self.add_idle_span(pid, tid, idle_start, end_ns / 1000)
+
+    def add_idle_span(self, pid, tid, start, end):
+        """
+        Adds an "idle" span of a worker, unless it is empty.
+
+        Args:
+            pid (int): The process of the worker.
+            tid (int): The thread of the worker.
+            start (float): The start of the span in microseconds.
+            end (float): The end of the span in microseconds.
+
+        Returns:
+            None
+        """
+        if end > start:
+            self.events.append(
+                {"name": "idle", "cat": "idle", "ph": "X", "ts": start, "dur": end - start, "pid": pid, "tid": tid}
+            )
+
+    def save(self, trace_path):
+        """
+        Writes the trace to a JSON file, naming the build process and its workers.
+
+        Args:
+            trace_path (str): The path to the trace file.
+
+        Returns:
+            None
+        """
+        metadata = []
+
+        for pid in sorted({event["pid"] for event in self.events} | {self.pid}):
+            name = "build" if pid == self.pid else f"worker {pid}"
+            metadata.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": name}})
+
+        trace_dir_path = path.dirname(trace_path)
+
+        if trace_dir_path != "":
+            makedirs(trace_dir_path, exist_ok=True)
+
+        with open(trace_path, "w") as file:
+            json.dump({"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}, file)
+
+    def __repr__(self):
+        """
+        Return a string representation of the Trace object.
+
+        :return: A string representation of the Trace object.
+        :rtype: str
+        """
+        return f"Trace({len(self.events)} events)"
@@ -0,0 +1,197 @@
+import re
+import os.path as path
+
+from os import stat
+from shutil import copyfileobj
+
+# {{ Name }} placeholders, the whitespace around the name is optional
+placeholder_pattern = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# name of the file overriding the default template for a content directory and its subdirectories
+directory_template_name = "template.html"
+# suffix of the file overriding the template of a single page, e.g. "about.template.html" for "about.md"
+page_template_suffix = ".template.html"
+
+
+# a template compiled into literal segments and placeholder slots
+class Template:
+
+    def __init__(self, text):
+        """
+        Initializes a new instance of the Template class by compiling the template text.
+
+        Parameters:
+            text (str): The text of the template with {{ Name }} placeholders.
+        """
+        # literal text around the slots, always one more than the slots
+        self.segments = []
+        # names of the placeholders, in order of appearance
+        self.slots = []
+
+        start = 0
+        for match in placeholder_pattern.finditer(text):
+            self.segments.append(text[start:match.start()])
+            self.slots.append(match.group(1))
+            start = match.end()
+        self.segments.append(text[start:])
+
+    def render(self, values):
+        """
+        Renders the template with the given values in a single join.
+
+        Args:
+            values (dict): The values of the placeholders keyed by name, either strings or HTML nodes.
+
+        Returns:
+            str: The rendered template.
+
+        Raises:
+            ValueError: If there is no value for one of the placeholders.
+        """
+        parts = [self.segments[0]]
+
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            value = self.value_of(slot, values)
+            parts.append(value if isinstance(value, str) else value.to_html())
+            parts.append(segment)
+        return "".join(parts)
+
+    def write(self, file, values):
+        """
+        Renders the template directly to a file-like object.
+
+        Args:
+            file (file): A text file or any object with `write` and `writelines` methods.
+            values (dict): The values of the placeholders keyed by name, either strings, HTML nodes or readable
+            text files. Nodes are streamed with their `write_html` method and files are copied from their
+            beginning in chunks, so neither has to exist as one big string.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If there is no value for one of the placeholders.
+        """
+        # fail before anything is written
+        for slot in self.slots:
+            self.value_of(slot, values)
+
+        file.write(self.segments[0])
+
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            value = values[slot]
+
+            if isinstance(value, str):
+                file.write(value)
+            elif hasattr(value, "write_html"):
+                value.write_html(file)
+            else:
+                value.seek(0)
+                copyfileobj(value, file)
+            file.write(segment)
+
+    def value_of(self, slot, values):
+        """
+        Returns the value of a placeholder.
+
+        Args:
+            slot (str): The name of the placeholder.
+            values (dict): The values of the placeholders keyed by name.
+
+        Returns:
+            str or HTMLNode: The value of the placeholder.
+
+        Raises:
+            ValueError: If there is no value for the placeholder.
+        """
+        if slot not in values:
+            raise ValueError(f"Invalid template: no value for {{{{ {slot} }}}}")
+        return values[slot]
+
+    def __repr__(self):
+        """
+        Return a string representation of the Template object.
+
+        :return: A string representation of the Template object.
+        :rtype: str
+        """
+        return f"Template({self.slots})"
+
+
+# compiled templates keyed by path, reloaded when the template file changes
+class TemplateCache:
+
+    def __init__(self):
+        """
+        Initializes a new, empty instance of the TemplateCache class.
+        """
+        # template path -> ((modification time, size), compiled template)
+        self.templates = {}
+
+    def get(self, template_path):
+        """
+        Returns the compiled template of the given file, compiling it only if it changed since the last call.
+
+        Args:
+            template_path (str): The path to the template HTML file.
+
+        Returns:
+            Template: The compiled template.
+        """
+        template_stat = stat(template_path)
+        key = (template_stat.st_mtime_ns, template_stat.st_size)
+        cached = self.templates.get(template_path)
+
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        with open(template_path, "r") as file:
+            template = Template(file.read())
+
+        self.templates[template_path] = (key, template)
+        return template
+
+
+def find_template(src_path, dir_path_content, default_template_path, dir_templates=None):
+    """
+    Chooses the template of a markdown page.
+
+    Args:
+        src_path (str): The path to the markdown file.
+        dir_path_content (str): The path to the content directory.
+        default_template_path (str): The template used when the content does not override it.
+        dir_templates (dict, optional): The templates already chosen for the pages of a directory, by directory,
+        filled by the call. Share it between the calls of one build only. Defaults to None.
+
+    Returns:
+        str: The path to the template of the page.
+
+    The first existing one wins: a "<page>.template.html" file next to the page, a "template.html" file in the
+    directory of the page or one of its parents up to the content directory, and finally the default template.
+    """
+    page_template_path = path.splitext(src_path)[0] + page_template_suffix
+
+    if path.isfile(page_template_path):
+        return page_template_path
+
+    page_dir = path.dirname(src_path)
+
+    if dir_templates is not None and page_dir in dir_templates:
+        return dir_templates[page_dir]
+
+    root = path.normpath(dir_path_content)
+    cur_dir = page_dir
+
+    while True:
+        dir_template_path = path.join(cur_dir, directory_template_name)
+
+        if path.isfile(dir_template_path):
+            break
+        if path.normpath(cur_dir) == root or not path.normpath(cur_dir).startswith(path.join(root, "")):
+            dir_template_path = default_template_path
+            break
+        cur_dir = path.dirname(cur_dir)
+
+    if dir_templates is not None:
+        dir_templates[page_dir] = dir_template_path
+    return dir_template_path
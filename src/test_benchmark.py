@@ -0,0 +1,120 @@
+import os
+import os.path as path
+import unittest
+
+from benchmark import compare_results, generate_corpus, run_benchmark
+from test_support import SiteTestCase
+
+
+# unit test class for testing the benchmark corpus generator and stage timings
+class TestBenchmark(SiteTestCase):
+
+    def read_tree(self, root):
+        files = {}
+
+        for dir_path, _, file_names in os.walk(root):
+            for file_name in file_names:
+                with open(path.join(dir_path, file_name), "rb") as file:
+                    files[path.relpath(path.join(dir_path, file_name), root)] = file.read()
+        return files
+
+    def test_corpus_is_deterministic(self):
+        """
+        Test that the same seed generates the same site and another seed a different one.
+        """
+        generate_corpus("a", pages=5, static_files=2, static_size=16, seed=1)
+        generate_corpus("b", pages=5, static_files=2, static_size=16, seed=1)
+        generate_corpus("c", pages=5, static_files=2, static_size=16, seed=2)
+
+        self.assertEqual(self.read_tree("a"), self.read_tree("b"))
+        self.assertNotEqual(self.read_tree("a"), self.read_tree("c"))
+        self.assertEqual(len([name for name in self.read_tree("a") if name.endswith(".md")]), 5)
+
+    def test_run_benchmark(self):
+        """
+        Test that every stage is timed, with a page throughput only for the stages processing pages.
+        """
+        generate_corpus("site", pages=3, blocks=5, static_files=2, static_size=16)
+        os.makedirs("work")
+        results = run_benchmark(path.abspath("site"), path.abspath("work"), repeat=3, min_time=0)
+
+        self.assertEqual(
+                list(results),
+                [
+                    "markdown_to_blocks",
+                    "block_to_block_type",
+                    "text_to_textnodes",
+                    "to_html",
+                    "generate_page",
+                    "sync_static_to_public",
+                    "main",
+                    ],
+                )
+        self.assertEqual(len(results["to_html"]["samples"]), 3)
+        self.assertLessEqual(results["to_html"]["q1"], results["to_html"]["median"])
+        self.assertLessEqual(results["to_html"]["median"], results["to_html"]["q3"])
+        self.assertGreater(results["to_html"]["peak_memory"], 0)
+        self.assertGreater(results["main"]["peak_memory"], 0)
+        self.assertIsNone(results["sync_static_to_public"]["pages_per_sec"])
+        self.assertGreater(results["generate_page"]["pages_per_sec"], 0)
+        self.assertNotEqual(os.listdir(path.join("site", "public")), [])
+
+    def stage(self, median, iqr=0.0, peak_memory=1000):
+        return {
+            "median": median,
+            "q1": median - iqr / 2,
+            "q3": median + iqr / 2,
+            "min": median - iqr / 2,
+            "peak_memory": peak_memory,
+            }
+
+    def test_compare_results(self):
+        """
+        Test that only a stage slower than the threshold beyond the noise, or using more memory, regresses.
+        """
+        baseline = {
+            "to_html": self.stage(1.0, 0.1),
+            "text_to_textnodes": self.stage(1.0, 0.1),
+            "markdown_to_blocks": self.stage(1.0, 1.0),
+            "generate_page": self.stage(1.0),
+            }
+        current = {
+            "to_html": self.stage(1.5, 0.1),
+            "text_to_textnodes": self.stage(1.1, 0.1),
+            "markdown_to_blocks": self.stage(1.5, 1.0),
+            "generate_page": self.stage(1.0, peak_memory=2000),
+            }
+        lines, regressions = compare_results(baseline, current, threshold=25.0)
+
+        self.assertEqual(regressions, ["to_html", "generate_page"])
+        self.assertIn("SLOWER", lines[1])
+        self.assertIn("MORE MEMORY", lines[4])
+
+    def test_compare_results_stage_thresholds(self):
+        """
+        Test that a stage can be allowed a wider slowdown than the others, which still gates it.
+        """
+        baseline = {"generate_page": self.stage(1.0), "main": self.stage(1.0), "to_html": self.stage(1.0)}
+        current = {"generate_page": self.stage(1.9), "main": self.stage(2.5), "to_html": self.stage(1.3)}
+        lines, regressions = compare_results(
+                baseline,
+                current,
+                threshold=25.0,
+                stage_thresholds={"generate_page": 100.0, "main": 100.0},
+                )
+
+        self.assertEqual(regressions, ["main", "to_html"])
+        self.assertIn("ok", lines[1])
+        self.assertIn("SLOWER", lines[2])
+
+    def test_compare_results_missing_stage(self):
+        """
+        Test that a stage missing from the baseline is reported but does not regress.
+        """
+        lines, regressions = compare_results({}, {"to_html": self.stage(1.0)})
+        self.assertEqual(regressions, [])
+        self.assertIn("missing from the baseline", lines[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
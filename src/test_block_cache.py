@@ -0,0 +1,104 @@
+import os.path as path
+import tempfile
+import unittest
+
+import block_cache
+from block_cache import BlockCache
+from markdown_block import block_to_html_node
+
+
+# unit test class for testing the block render cache
+class TestBlockCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = path.join(self.tmp_dir.name, "cache", "blocks.db")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_render_matches_block_to_html_node(self):
+        """
+        Test that a cached block renders to the same HTML as converting it directly, with its metadata.
+        """
+        cache = BlockCache()
+        html, metadata = cache.render("# A [linked](/a) *title*")
+        self.assertEqual(html, block_to_html_node("# A [linked](/a) *title*").to_html())
+        self.assertEqual(metadata, {"headings": [[1, "A linked title"]], "links": [["linked", "/a"]], "words": 3})
+
+    def test_hits_and_misses(self):
+        """
+        Test that rendering the same block again is a hit, a different block a miss, and a cleared block a miss.
+        """
+        cache = BlockCache()
+        first = cache.render("some paragraph")
+        self.assertIs(cache.render("some paragraph"), first)
+        cache.render("other paragraph")
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+        cache.clear()
+        cache.render("some paragraph")
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_lru_eviction(self):
+        """
+        Test that the least recently used blocks are evicted when the HTML kept in memory exceeds the size limit.
+        """
+        size = len(BlockCache().render("a")[0]) + block_cache.entry_overhead
+        cache = BlockCache(max_bytes=2 * size)
+        cache.render("a")
+        cache.render("b")
+        cache.render("a")
+        cache.render("c")
+        self.assertEqual(len(cache.entries), 2)
+        self.assertEqual(cache.size, 2 * size)
+        self.assertIn(cache.key("a"), cache.entries)
+        self.assertNotIn(cache.key("b"), cache.entries)
+
+    def test_large_block_is_not_kept_in_memory(self):
+        """
+        Test that a block rendering to long HTML is rendered again instead of being kept in memory, but is still
+        stored in the database.
+        """
+        cache = BlockCache(db_path=self.db_path, max_memory_block_size=100)
+        block = "a long paragraph " * 20
+        cache.render(block)
+        cache.render(block)
+        self.assertEqual((cache.hits, cache.misses, len(cache.entries), cache.size), (1, 1, 0, 0))
+        cache.close()
+
+    def test_persistent_cache(self):
+        """
+        Test that blocks stored in the database are hits for a new cache using the same database.
+        """
+        cache = BlockCache(db_path=self.db_path)
+        cache.render("> a quote")
+        cache.close()
+
+        cache = BlockCache(db_path=self.db_path)
+        html, _ = cache.render("> a quote")
+        self.assertEqual(html, "<blockquote>a quote</blockquote>")
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+        cache.close()
+
+    def test_parser_change_invalidates(self):
+        """
+        Test that a block cached by another parser version is not reused.
+        """
+        cache = BlockCache(db_path=self.db_path)
+        cache.render("> a quote")
+        cache.close()
+
+        old_format = block_cache.cache_format
+        block_cache.cache_format = old_format + 1
+        try:
+            cache = BlockCache(db_path=self.db_path)
+            cache.render("> a quote")
+            self.assertEqual((cache.hits, cache.misses), (0, 1))
+            cache.close()
+        finally:
+            block_cache.cache_format = old_format
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import json
+import os.path as path
+import tempfile
+import unittest
+
+from build_log import BuildLog
+
+
+# unit test class for testing the structured build log
+class TestBuildLog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_path = path.join(self.tmp_dir.name, "logs", "build.jsonl")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def read(self, log_path):
+        with open(log_path) as file:
+            return [json.loads(line) for line in file]
+
+    def test_records(self):
+        """
+        Test that records are written as JSON lines with the given fields only, and appended by the next log.
+        """
+        with BuildLog(self.log_path) as log:
+            log.log("copy", "public/index.css", 7, 0.5, source="static/index.css")
+
+        with BuildLog(self.log_path) as log:
+            log.log("clean started", "public")
+
+        records = self.read(self.log_path)
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]["event"], "copy")
+        self.assertEqual(records[0]["path"], "public/index.css")
+        self.assertEqual(records[0]["bytes"], 7)
+        self.assertEqual(records[0]["duration"], 0.5)
+        self.assertEqual(records[0]["source"], "static/index.css")
+        self.assertIn("time", records[0])
+        self.assertNotIn("bytes", records[1])
+
+    def test_buffered(self):
+        """
+        Test that records are buffered until the log is flushed.
+        """
+        with BuildLog(self.log_path) as log:
+            log.log("page", "public/index.html")
+            self.assertEqual(os.path.getsize(self.log_path), 0)
+
+            log.flush()
+            self.assertGreater(os.path.getsize(self.log_path), 0)
+
+    def test_rotation(self):
+        """
+        Test that a log growing over max_bytes is rotated and only the configured number of backups is kept.
+        """
+        with BuildLog(self.log_path, max_bytes=200, backups=2) as log:
+            for i in range(20):
+                log.log("page", f"public/page{i}.html")
+
+        self.assertTrue(path.isfile(f"{self.log_path}.1"))
+        self.assertTrue(path.isfile(f"{self.log_path}.2"))
+        self.assertFalse(path.exists(f"{self.log_path}.3"))
+
+        for log_path in (self.log_path, f"{self.log_path}.1", f"{self.log_path}.2"):
+            self.assertLessEqual(path.getsize(log_path), 200)
+
+        # the newest records are in the current log, the older ones in the backups
+        self.assertEqual(self.read(self.log_path)[-1]["path"], "public/page19.html")
+        self.assertLess(
+                int(self.read(f"{self.log_path}.2")[-1]["path"][11:-5]),
+                int(self.read(f"{self.log_path}.1")[0]["path"][11:-5]),
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import os.path as path
+import unittest
+
+from copystatic import sync_static_to_public
+from test_support import SiteTestCase
+
+
+# unit test class for testing the static file synchronization
+class TestSyncStaticToPublic(SiteTestCase):
+
+    def setUp(self):
+        """
+        Creates a temporary site with a static directory, see `SiteTestCase`.
+        """
+        super().setUp()
+        self.write("static/index.css", "body {}")
+        self.write("static/images/logo.svg", "<svg></svg>")
+
+    def sync(self, **kwargs):
+        return sync_static_to_public("static", "public", ".cache/static.json", **kwargs)
+
+    def test_first_sync_copies_everything(self):
+        """
+        Test that the first sync copies every file and keeps the modification times.
+        """
+        self.assertEqual(self.sync(), {"copied": 2, "unchanged": 0, "deleted": 0})
+        self.assertEqual(self.read("public/images/logo.svg"), "<svg></svg>")
+        self.assertEqual(
+                os.stat("public/index.css").st_mtime_ns,
+                os.stat("static/index.css").st_mtime_ns,
+                )
+
+    def test_only_changed_files_are_copied(self):
+        """
+        Test that a second sync copies nothing, and that a changed file is copied again.
+        """
+        self.sync()
+        self.assertEqual(self.sync(), {"copied": 0, "unchanged": 2, "deleted": 0})
+
+        self.write("static/index.css", "body { color: red; }")
+        self.assertEqual(self.sync(), {"copied": 1, "unchanged": 1, "deleted": 0})
+        self.assertEqual(self.read("public/index.css"), "body { color: red; }")
+
+    def test_stale_files_are_deleted(self):
+        """
+        Test that files whose source disappeared are deleted with their empty directories, while files the sync
+        did not place are kept.
+        """
+        self.sync()
+        self.write("public/index.html", "generated page")
+        os.remove("static/images/logo.svg")
+
+        self.assertEqual(self.sync(), {"copied": 0, "unchanged": 1, "deleted": 1})
+        self.assertFalse(path.exists("public/images"))
+        self.assertEqual(self.read("public/index.html"), "generated page")
+
+    def test_excluded_files_are_not_overwritten(self):
+        """
+        Test that an excluded destination, like a generated page, is never overwritten by a static file.
+        """
+        self.write("static/index.html", "static page")
+        os.makedirs("public")
+        self.write("public/index.html", "generated page")
+        self.sync(exclude=[path.join("public", "index.html")])
+        self.assertEqual(self.read("public/index.html"), "generated page")
+
+    def test_hash_comparison_skips_touched_files(self):
+        """
+        Test that with use_hash a file whose modification time changed but whose content did not is not copied,
+        and that the timestamps are aligned by replacing the file, not by changing a file it may be linked to.
+        """
+        self.sync()
+        os.link("public/index.css", "published.css")
+        published_stat = os.stat("published.css")
+        stat = os.stat("static/index.css")
+        os.utime("static/index.css", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(self.sync(use_hash=True), {"copied": 0, "unchanged": 2, "deleted": 0})
+
+        self.assertEqual(os.stat("published.css").st_mtime_ns, published_stat.st_mtime_ns)
+        self.assertEqual(os.stat("public/index.css").st_mtime_ns, stat.st_mtime_ns + 10 ** 9)
+        self.assertFalse(path.samefile("public/index.css", "published.css"))
+
+    def test_link(self):
+        """
+        Test that with link the public file is a hardlink to the static file.
+        """
+        self.sync(link=True)
+        self.assertTrue(path.samefile("public/index.css", "static/index.css"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import io
+import unittest
+
+from document import Document, block_metadata, markdown_to_document, write_markdown_file_html
+from htmlnode import LeafNode, ParentNode
+from markdown_block import markdown_to_html_node
+
+
+# unit test class for testing the single pass document conversion
+class TestDocument(unittest.TestCase):
+
+    markdown = (
+        "# The *Title*\n\n"
+        "Read the [docs](https://example.com/docs) and the [blog](/blog).\n\n"
+        "## Details\n\n"
+        "- one item\n- ![logo](/logo.png) two"
+    )
+
+    def test_html_matches_markdown_to_html_node(self):
+        """
+        Test that the document renders the same HTML as markdown_to_html_node.
+        """
+        document = markdown_to_document(self.markdown)
+        self.assertEqual(
+                document.to_html_node().to_html(),
+                markdown_to_html_node(self.markdown).to_html(),
+                )
+
+    def test_metadata(self):
+        """
+        Test that the title, heading outline, links and word count are collected while converting.
+        """
+        document = markdown_to_document(self.markdown)
+        self.assertEqual(document.title, "The Title")
+        self.assertEqual(document.headings, [[1, "The Title"], [2, "Details"]])
+        self.assertEqual(
+                document.links,
+                [["docs", "https://example.com/docs"], ["blog", "/blog"]],
+                )
+        self.assertEqual(document.word_count, 13)
+
+    def test_missing_title(self):
+        """
+        Test that asking for the title of a document without heading 1 raises a ValueError.
+        """
+        document = markdown_to_document("## Only a subtitle")
+        with self.assertRaises(ValueError):
+            document.title
+
+    def test_add_block_with_metadata(self):
+        """
+        Test that metadata passed to add_block is used instead of being collected from the node.
+        """
+        document = Document()
+        node = ParentNode("h1", [LeafNode(None, "Cached")])
+        document.add_block(node, block_metadata(node))
+        self.assertEqual(document.title, "Cached")
+        self.assertEqual(document.word_count, 1)
+
+
+    def test_write_markdown_file_html(self):
+        """
+        Test that converting a file block by block writes the same HTML and collects the same metadata as
+        markdown_to_document, without keeping the HTML nodes.
+        """
+        out = io.StringIO()
+        document = write_markdown_file_html(io.StringIO(self.markdown), out)
+        expected = markdown_to_document(self.markdown)
+        self.assertEqual(out.getvalue(), expected.to_html_node().to_html())
+        self.assertEqual(document.headings, expected.headings)
+        self.assertEqual(document.links, expected.links)
+        self.assertEqual(document.word_count, expected.word_count)
+        self.assertEqual(document.children, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,12 @@
+import os
+import json
+import os.path as path
 import unittest
 
-from generate_static import extract_title
+import generate_static
+from generate_static import extract_title, find_pages, generate_pages, generate_pages_incremental, render_page
+from profiling import BuildProfile, Trace, page_stages
+from test_support import SiteTestCase
 
 
 # unit test class for testing the functionality of the block markdown
@@ -84,5 +90,261 @@ class TestGenerateStatic(unittest.TestCase):
     #             )
 
 
+# unit test class for testing the incremental page generation
+class TestGeneratePagesIncremental(SiteTestCase):
+
+    def setUp(self):
+        """
+        Creates a temporary site with a content directory, a template and a public directory, see `SiteTestCase`.
+        """
+        super().setUp()
+        os.makedirs("public")
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write("content/index.md", "# Home\n\nwelcome")
+        self.write("content/blog/post.md", "# Post\n\nfirst post")
+
+    def build(self, force=False, **kwargs):
+        counts = generate_pages_incremental(
+                "content", "template.html", "public", ".cache/manifest.json", force, **kwargs
+                )
+        return {key: counts[key] for key in ("rendered", "unchanged", "removed")}
+
+    def test_find_pages(self):
+        """
+        Test that find_pages maps every markdown file to its HTML output path, in sorted order.
+        """
+        self.assertEqual(
+                find_pages("content", "public"),
+                [
+                    (path.join("content", "blog", "post.md"), path.join("public", "blog", "post.html")),
+                    (path.join("content", "index.md"), path.join("public", "index.html")),
+                    ],
+                )
+
+    def test_second_build_skips_unchanged_pages(self):
+        """
+        Test that a second build without changes renders nothing, and that editing one page re-renders only that
+        page.
+        """
+        self.assertEqual(self.build(), {"rendered": 2, "unchanged": 0, "removed": 0})
+        self.assertEqual(self.build(), {"rendered": 0, "unchanged": 2, "removed": 0})
+
+        self.write("content/blog/post.md", "# Post\n\nedited post")
+        self.assertEqual(self.build(), {"rendered": 1, "unchanged": 1, "removed": 0})
+
+        with open("public/blog/post.html") as file:
+            self.assertEqual(file.read(), "<title>Post</title><div><h1>Post</h1><p>edited post</p></div>")
+
+    def test_unchanged_stat_skips_hashing(self):
+        """
+        Test that a page is only hashed again when its size or modification time changed, and that a touched page
+        with the same content is unchanged.
+        """
+        self.build()
+
+        with open(".cache/manifest.json") as file:
+            manifest = json.load(file)
+        manifest["pages"][path.join("content", "index.md")]["hash"] = "recorded"
+        with open(".cache/manifest.json", "w") as file:
+            json.dump(manifest, file)
+
+        # the recorded hash is trusted as long as the size and the modification time match
+        self.assertEqual(self.build(), {"rendered": 0, "unchanged": 2, "removed": 0})
+
+        os.utime("content/index.md", ns=(0, 0))
+        self.assertEqual(self.build(), {"rendered": 1, "unchanged": 1, "removed": 0})
+        os.utime("content/blog/post.md", ns=(0, 0))
+        self.assertEqual(self.build(), {"rendered": 0, "unchanged": 2, "removed": 0})
+
+    def test_template_change_rebuilds_every_page(self):
+        """
+        Test that changing the template invalidates every page rendered with it.
+        """
+        self.build()
+        self.write("template.html", "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(self.build(), {"rendered": 2, "unchanged": 0, "removed": 0})
+
+    def test_missing_output_is_rebuilt(self):
+        """
+        Test that a page is rendered again when its output file was deleted, even if its source did not change.
+        """
+        self.build()
+        os.remove("public/index.html")
+        self.assertEqual(self.build(), {"rendered": 1, "unchanged": 1, "removed": 0})
+        self.assertTrue(path.isfile("public/index.html"))
+
+    def test_removed_source_deletes_output(self):
+        """
+        Test that the output of a deleted markdown file is removed, together with its emptied directory.
+        """
+        self.build()
+        os.remove("content/blog/post.md")
+        self.assertEqual(self.build(), {"rendered": 0, "unchanged": 1, "removed": 1})
+        self.assertFalse(path.exists("public/blog"))
+
+    def test_force_renders_every_page(self):
+        """
+        Test that a forced build ignores the manifest.
+        """
+        self.build()
+        self.assertEqual(self.build(force=True), {"rendered": 2, "unchanged": 0, "removed": 0})
+
+    def test_identical_outputs_are_not_rewritten(self):
+        """
+        Test that re-rendering a page into the same HTML leaves its output untouched, and that a page whose HTML
+        changed is written.
+        """
+        self.build()
+        os.utime("public/index.html", ns=(0, 0))
+
+        counts = generate_pages_incremental("content", "template.html", "public", ".cache/manifest.json", True)
+        self.assertEqual((counts["written"], counts["skipped"]), (0, 2))
+        self.assertEqual(os.stat("public/index.html").st_mtime_ns, 0)
+        self.assertFalse(path.exists("public/index.html.tmp"))
+
+        # same size, other bytes
+        self.write("content/index.md", "# Home\n\nwelcomE")
+        counts = generate_pages_incremental("content", "template.html", "public", ".cache/manifest.json", True)
+        self.assertEqual((counts["written"], counts["skipped"]), (1, 1))
+
+        with open("public/index.html") as file:
+            self.assertEqual(file.read(), "<title>Home</title><div><h1>Home</h1><p>welcomE</p></div>")
+
+    def test_parallel_output_matches_serial(self):
+        """
+        Test that generating the pages with a process pool writes the same files as generating them one by one.
+        """
+        pages = [(src, "template.html", dst) for src, dst in find_pages("content", "public")]
+        generate_pages(pages, jobs=1)
+        serial = {}
+        for _, _, dst in pages:
+            with open(dst) as file:
+                serial[dst] = file.read()
+
+        parallel_pages = [(src, template, dst.replace("public", "parallel", 1)) for src, template, dst in pages]
+        generate_pages(parallel_pages, jobs=2)
+        for (_, _, dst), (_, _, parallel_dst) in zip(pages, parallel_pages):
+            with open(parallel_dst) as file:
+                self.assertEqual(file.read(), serial[dst])
+
+    def test_parallel_error_propagates(self):
+        """
+        Test that an error raised while generating a page in a worker process is re-raised by generate_pages.
+        """
+        self.write("content/blog/broken.md", "# Broken\n\nthis **bold is never closed")
+        pages = [(src, "template.html", dst) for src, dst in find_pages("content", "public")]
+        with self.assertRaises(ValueError):
+            generate_pages(pages, jobs=2)
+
+    def test_directory_and_page_templates(self):
+        """
+        Test that a template.html in a content directory applies to its pages, that a <page>.template.html applies
+        to its page only, and that changing one of them re-renders only the pages using it.
+        """
+        self.write("content/blog/template.html", "<h1>Blog: {{ Title }}</h1>{{ Content }}")
+        self.write("content/index.template.html", "<h1>{{ Site }}: {{ Title }}</h1>")
+        self.build(variables={"Site": "Fans"})
+
+        with open("public/blog/post.html") as file:
+            self.assertTrue(file.read().startswith("<h1>Blog: Post</h1>"))
+        with open("public/index.html") as file:
+            self.assertEqual(file.read(), "<h1>Fans: Home</h1>")
+
+        self.write("content/blog/template.html", "<h2>{{ Title }}</h2>{{ Content }}")
+        self.assertEqual(self.build(variables={"Site": "Fans"}), {"rendered": 1, "unchanged": 1, "removed": 0})
+
+    def test_block_cache_counts(self):
+        """
+        Test that the block cache hits and misses of the rendered pages are reported, and that a persistent cache
+        is reused by the next build.
+        """
+        self.write("content/blog/post.md", "# Post\n\nA *shared* footer")
+        self.write("content/index.md", "# Home\n\nA *shared* footer")
+        counts = generate_pages_incremental(
+                "content", "template.html", "public", ".cache/manifest.json", block_cache_path=".cache/blocks.db"
+                )
+        self.assertEqual(counts["cache_misses"] + counts["cache_hits"], 4)
+        self.assertGreaterEqual(counts["cache_hits"], 1)
+
+        generate_static.block_cache.close()
+        generate_static.block_cache = None
+        counts = generate_pages_incremental(
+                "content", "template.html", "public", ".cache/manifest.json", True, block_cache_path=".cache/blocks.db"
+                )
+        self.assertEqual(counts["cache_hits"], 4)
+        self.assertEqual(counts["cache_misses"], 0)
+
+    def test_profile(self):
+        """
+        Test that a profiled build records the build stages and the stages of every page, in serial and parallel,
+        and writes the pstats dump and the timings report.
+        """
+        for jobs in (1, 2):
+            profile = BuildProfile(".cache/profile", top=1)
+            profile.start()
+            generate_pages_incremental(
+                    "content", "template.html", "public", ".cache/manifest.json", True, jobs=jobs, profile=profile
+                    )
+            profile.stop()
+
+            self.assertEqual(list(profile.timer.timings), ["discovery", "pages", "cleanup"])
+            self.assertEqual(sorted(profile.pages), sorted(src for src, _ in find_pages("content", "public")))
+
+            for page in profile.pages.values():
+                self.assertEqual(sorted(page["timings"]), sorted(page_stages))
+
+            pstats_path, report_path = profile.save()
+            self.assertTrue(path.isfile(pstats_path))
+            self.assertTrue(path.isfile(report_path))
+            self.assertIn("Slowest 1 pages:", profile.summary())
+
+    def test_trace(self):
+        """
+        Test that a traced parallel build records the build stages, every page with its stages, and worker idle time.
+        """
+        trace = Trace()
+        generate_pages_incremental("content", "template.html", "public", ".cache/manifest.json", jobs=2, trace=trace)
+        names = [event["name"] for event in trace.events]
+
+        self.assertEqual(names.count("generate_page"), 2)
+        self.assertEqual(names.count("convert"), 2)
+        self.assertEqual(names.count("write"), 2)
+        self.assertIn("idle", names)
+        self.assertIn("discovery", names)
+        self.assertTrue(all(event["pid"] != os.getpid() for event in trace.events if event["cat"] == "page"))
+
+    def test_log(self):
+        """
+        Test that the pages generated by workers are logged by the build, in order, with their size.
+        """
+        self.build(jobs=2)
+
+        with open("logs/conversion_log.jsonl") as file:
+            records = [json.loads(line) for line in file]
+
+        self.assertEqual(records[0]["event"], "conversion session started")
+        self.assertEqual(
+                [record["source"] for record in records if record["event"] == "page"],
+                [src for src, _ in find_pages("content", "public")],
+                )
+        self.assertEqual(records[1]["bytes"], path.getsize(records[1]["path"]))
+        self.assertEqual(records[-1]["rendered"], 2)
+
+    def test_render_page_matches_generated_page(self):
+        """
+        Test that a page rendered in memory is the page the build writes.
+        """
+        self.write("content/blog/post.md", "# Post\n\n- one\n- **two**\n\n```\ncode\n```")
+        self.build()
+
+        with open("public/blog/post.html") as file:
+            self.assertEqual(render_page("content/blog/post.md", "template.html"), file.read())
+
+        self.write("content/site.template.html", "{{ Site }}")
+        self.assertEqual(render_page("content/index.md", "content/site.template.html", {"Site": "Fans"}), "Fans")
+        with self.assertRaises(ValueError):
+            render_page("content/index.md", "content/site.template.html")
+
+
 if __name__ == "__main__":
     unittest.main()
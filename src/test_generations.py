@@ -0,0 +1,108 @@
+import os
+import os.path as path
+import unittest
+
+from generations import Generations, link_tree
+from test_support import SiteTestCase
+
+
+# unit test class for testing the staged builds published as generations
+class TestGenerations(SiteTestCase):
+
+    def setUp(self):
+        """
+        Creates a temporary site with a public directory built in place, see `SiteTestCase`.
+        """
+        super().setUp()
+        self.write("public/index.html", "home")
+        self.write("public/blog/post.html", "post")
+        self.write(".cache/manifest.json", "in place")
+        self.generations = Generations("public", ".generations", [".cache/manifest.json"])
+
+    def build(self, text, link=True):
+        """
+        Stages a generation, replaces its index page and its manifest like a build does, and publishes it.
+        """
+        staging_path = self.generations.stage(link)
+        self.write(path.join(staging_path, "index.html.tmp"), text)
+        os.replace(path.join(staging_path, "index.html.tmp"), path.join(staging_path, "index.html"))
+        self.write(".cache/manifest.json", text)
+        return self.generations.publish()
+
+    def test_link_tree(self):
+        """
+        Test that the linked tree shares the files of the source tree.
+        """
+        self.assertEqual(link_tree("public", "copy"), 2)
+        self.assertTrue(path.samefile("public/blog/post.html", "copy/blog/post.html"))
+
+    def test_publish_flips_symlink(self):
+        """
+        Test that publishing replaces the public directory by a symlink to the new generation, keeping the directory
+        as the previous generation and sharing the unchanged files with it.
+        """
+        staging_path = self.generations.stage()
+        # outputs built in place are not trusted, since there is no state they were built with
+        self.assertFalse(path.exists(".cache/manifest.json"))
+        self.assertEqual(self.read(path.join(staging_path, "index.html")), "home")
+
+        generation_path = self.build("new home")
+
+        self.assertTrue(path.islink("public"))
+        self.assertEqual(self.generations.current(), generation_path)
+        self.assertEqual(self.read("public/index.html"), "new home")
+        previous_path = self.generations.generations()[0]
+        self.assertEqual(self.read(path.join(previous_path, "index.html")), "home")
+        self.assertTrue(path.samefile("public/blog/post.html", path.join(previous_path, "blog", "post.html")))
+        self.assertFalse(path.exists(self.generations.staging_path))
+
+    def test_state_restored_and_old_generations_deleted(self):
+        """
+        Test that staging restores the state of the published generation, and that only the published and the
+        previous generation are kept.
+        """
+        self.build("first")
+        self.build("second")
+        self.write(".cache/manifest.json", "left by a failed build")
+        self.generations.stage()
+        self.assertEqual(self.read(".cache/manifest.json"), "second")
+        self.generations.discard()
+
+        third_path = self.build("third")
+        self.assertEqual(len(self.generations.generations()), 2)
+        self.assertEqual(self.generations.current(), third_path)
+
+    def test_spare_generation_is_recycled(self):
+        """
+        Test that the newest retired generation is kept as the spare, and that the next generation is staged in it
+        with its state, instead of linking the published one.
+        """
+        first_path = self.build("first")
+        self.build("second")
+        self.build("third")
+
+        self.assertNotIn(first_path, self.generations.generations())
+        self.assertEqual(self.read(path.join(self.generations.spare_path, "index.html")), "first")
+
+        staging_path = self.generations.stage()
+        self.assertFalse(path.exists(self.generations.spare_path))
+        self.assertEqual(self.read(path.join(staging_path, "index.html")), "first")
+        self.assertEqual(self.read(".cache/manifest.json"), "first")
+        self.assertTrue(path.samefile("public/blog/post.html", path.join(staging_path, "blog", "post.html")))
+        self.generations.discard()
+
+    def test_rollback(self):
+        """
+        Test that a rollback publishes the previous generation again, and fails without one.
+        """
+        first_path = self.build("first")
+        self.build("second")
+
+        self.assertEqual(self.generations.rollback(), first_path)
+        self.assertEqual(self.read("public/index.html"), "first")
+        with self.assertRaises(ValueError):
+            self.generations.rollback()
+
+
+if __name__ == "__main__":
+    unittest.main()
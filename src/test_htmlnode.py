@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
@@ -192,6 +193,60 @@ class TestHTMLNode(unittest.TestCase):
                 "<h2><b>Bold text</b>Normal text<i>italic text</i>Normal text</h2>",
                 )
 
+    def test_write_html(self):
+        """
+        Test that write_html writes the same HTML as to_html to a file-like object, and that iter_html produces it
+        as several chunks instead of one string.
+        """
+        node = ParentNode(
+                "div",
+                [
+                        ParentNode("p", [LeafNode("b", "Bold text"), LeafNode(None, " normal")]),
+                        LeafNode("a", "link", {"href": "/"}),
+                        ],
+                {"class": "page"},
+                )
+        file = io.StringIO()
+        node.write_html(file)
+        self.assertEqual(file.getvalue(), node.to_html())
+        self.assertEqual(
+                list(node.iter_html()),
+                ['<div class="page">', "<p>", "<b>Bold text</b>", " normal", "</p>", '<a href="/">link</a>', "</div>"],
+                )
+
+    def test_to_html_deep_tree(self):
+        """
+        Test that a tree deeper than the recursion limit can be rendered.
+        """
+        node = LeafNode(None, "deep")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertEqual(len(html), 5000 * len("<span></span>") + len("deep"))
+
+    def test_to_html_invalid_descendant(self):
+        """
+        Test that rendering a tree with an invalid descendant raises a ValueError.
+        """
+        node = ParentNode("div", [ParentNode("p", None)])
+        with self.assertRaises(ValueError):
+            node.to_html()
+
+
+    def test_compact_layout(self):
+        """
+        Test that HTML nodes have no per-instance __dict__ and share interned tag strings.
+
+        Returns:
+            None
+        """
+        leaf = LeafNode("".join(["sp", "an"]), "child")
+        parent = ParentNode("div", [leaf])
+        self.assertFalse(hasattr(leaf, "__dict__"))
+        self.assertFalse(hasattr(parent, "__dict__"))
+        self.assertIs(leaf.tag, "span")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -674,5 +674,84 @@ class TestInlineMarkdown(unittest.TestCase):
                 )
 
 
+    def test_text_to_textnodes_matches_split_passes(self):
+        """
+        Test that the single pass `text_to_textnodes` produces the same nodes as applying the delimiter, image and
+        link splitting functions one after the other, including nested and adjacent markup.
+
+        Parameters:
+            self: The test case instance.
+
+        Returns:
+            None
+        """
+        texts = [
+            "",
+            "plain text",
+            "plain [link](a) and ![img](b) without delimiters",
+            "**bold *not italic* `not code`** and *italic `not code`*",
+            "****empty bold and ** ** blank",
+            "*italic* **bold** *italic*",
+            "[link **with** bold](url) and ![img](a)[link](b)",
+            "![*not*](a) then [`not`](b)",
+            ]
+
+        for text in texts:
+            nodes = split_nodes_delimiter([TextNode(text, text_type_text)], "**", text_type_bold)
+            nodes = split_nodes_delimiter(nodes, "*", text_type_italic)
+            nodes = split_nodes_delimiter(nodes, "`", text_type_code)
+            nodes = split_nodes_link(split_nodes_image(nodes))
+            self.assertListEqual(text_to_textnodes(text), nodes)
+
+    def test_text_to_textnodes_not_closed(self):
+        """
+        Test that `text_to_textnodes` raises a ValueError for unclosed sections, and for sections closed inside a
+        section of lower precedence.
+
+        Parameters:
+            self: The test case instance.
+
+        Returns:
+            None
+        """
+        for text in ["**bold", "*italic", "`code", "*italic **bold** italic*", "`code *x* code`"]:
+            with self.assertRaises(ValueError):
+                text_to_textnodes(text)
+
+    def test_text_to_textnodes_many_links(self):
+        """
+        Test that `text_to_textnodes` handles a paragraph with thousands of links.
+
+        Parameters:
+            self: The test case instance.
+
+        Returns:
+            None
+        """
+        nodes = text_to_textnodes(" ".join(f"[link {i}](/{i})" for i in range(5000)))
+        self.assertEqual(len(nodes), 9999)
+        self.assertEqual(nodes[-1], TextNode("link 4999", text_type_link, "/4999"))
+
+
+    def test_split_nodes_many_references(self):
+        """
+        Test that `split_nodes_image` and `split_nodes_link` handle a text with more references than the recursion
+        limit allows.
+
+        Parameters:
+            self: The test case instance.
+
+        Returns:
+            None
+        """
+        images = split_nodes_image([TextNode(" ".join(f"![image {i}](/{i}.png)" for i in range(5000)), text_type_text)])
+        self.assertEqual(len(images), 9999)
+        self.assertEqual(images[-1], TextNode("image 4999", text_type_image, "/4999.png"))
+
+        links = split_nodes_link([TextNode("".join(f"[link {i}](/{i})" for i in range(5000)) + ".", text_type_text)])
+        self.assertEqual(len(links), 5001)
+        self.assertEqual(links[-1], TextNode(".", text_type_text))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,63 @@
+import os.path as path
+import tempfile
+import unittest
+
+from manifest import hash_file, load_manifest, new_manifest, save_manifest
+
+
+# unit test class for testing the build manifest
+class TestManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.manifest_path = path.join(self.tmp_dir.name, "cache", "manifest.json")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_hash_file(self):
+        """
+        Test that hash_file returns the SHA-256 digest of the file content.
+        """
+        file_path = path.join(self.tmp_dir.name, "page.md")
+        with open(file_path, "w") as file:
+            file.write("# Heading")
+        self.assertEqual(
+                hash_file(file_path),
+                "fab9d5d23bffb992592cd2cae9ed8b258e676c6d6bbb28c9b12b5cb99f7a5901",
+                )
+
+    def test_missing_manifest_is_empty(self):
+        """
+        Test that loading a manifest that does not exist yet returns an empty manifest.
+        """
+        self.assertEqual(load_manifest(self.manifest_path), new_manifest())
+
+    def test_save_and_load(self):
+        """
+        Test that a saved manifest is loaded back unchanged, creating its directory if needed.
+        """
+        manifest = new_manifest()
+        manifest["pages"]["content/index.md"] = {
+            "hash": "abc",
+            "template": "template.html",
+            "template_hash": "def",
+            "dest": "public/index.html",
+            }
+        save_manifest(self.manifest_path, manifest)
+        self.assertEqual(load_manifest(self.manifest_path), manifest)
+
+    def test_incompatible_manifest_is_ignored(self):
+        """
+        Test that a manifest written by another version or a corrupted file is treated as empty.
+        """
+        save_manifest(self.manifest_path, {"version": -1, "pages": {"a.md": {}}})
+        self.assertEqual(load_manifest(self.manifest_path), new_manifest())
+
+        with open(self.manifest_path, "w") as file:
+            file.write("{ not json")
+        self.assertEqual(load_manifest(self.manifest_path), new_manifest())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from markdown_block import (
@@ -10,6 +11,7 @@ from markdown_block import (
     markdown_to_blocks,
     block_to_block_type,
     markdown_to_html_node,
+    iter_blocks,
     )
 
 
@@ -621,5 +623,48 @@ this is paragraph text
                 )
 
 
+    def test_iter_blocks_matches_markdown_to_blocks(self):
+        """
+        Test that `iter_blocks` reading a file line by line yields the same blocks and types as
+        `markdown_to_blocks` followed by `block_to_block_type`, including runs of empty lines, whitespace-only
+        blocks and documents without a trailing newline.
+
+        Parameters:
+            self (TestBlockMarkdown): The current test case instance.
+
+        Returns:
+            None
+        """
+        documents = [
+            "",
+            "\n",
+            "# Heading\n\nparagraph\nstill paragraph\n",
+            "  * one\n* two\n\n\n\n1. first\n2. second\n\n\n```\ncode\n```",
+            "> quote\n\n \n\n\n\n\nlast block",
+            "text\n\n\n",
+            ]
+
+        for markdown in documents:
+            expected = [(block, block_to_block_type(block)) for block in markdown_to_blocks(markdown)]
+            self.assertEqual(list(iter_blocks(io.StringIO(markdown))), expected)
+
+    def test_iter_blocks_is_lazy(self):
+        """
+        Test that `iter_blocks` yields a block before the rest of the document is read.
+
+        Parameters:
+            self (TestBlockMarkdown): The current test case instance.
+
+        Returns:
+            None
+        """
+        def lines():
+            yield "# Heading\n"
+            yield "\n"
+            raise AssertionError("read past the first block")
+
+        self.assertEqual(next(iter_blocks(lines())), ("# Heading", block_type_heading))
+
+
 if __name__ == "__main__":
     unittest.main()
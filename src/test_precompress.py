@@ -0,0 +1,86 @@
+import os
+import gzip
+import os.path as path
+import unittest
+
+from precompress import encoders, precompress_directory
+from test_support import SiteTestCase
+
+
+# unit test class for testing the precompression of the build outputs
+class TestPrecompressDirectory(SiteTestCase):
+
+    def setUp(self):
+        """
+        Creates a temporary site whose public directory has compressible and incompressible files, see
+        `SiteTestCase`.
+        """
+        super().setUp()
+        self.write("public/index.html", "<p>hello</p>" * 100)
+        self.write("public/blog/post.html", "<p>post</p>" * 100)
+        self.write("public/small.css", "p {}")
+        self.write("public/logo.png", "png" * 200)
+
+    def precompress(self):
+        counts = precompress_directory("public", ".cache/precompress.json", jobs=2)
+        # brotli is optional, only the gzip siblings are counted
+        return {key: value // len(encoders) for key, value in counts.items()}
+
+    def test_compresses_compressible_files(self):
+        """
+        Test that only big enough compressible files get a gzip sibling with their content and modification time.
+        """
+        self.assertEqual(self.precompress(), {"compressed": 2, "unchanged": 0, "deleted": 0})
+
+        with gzip.open("public/index.html.gz", "rt") as file:
+            self.assertEqual(file.read(), "<p>hello</p>" * 100)
+
+        self.assertEqual(os.stat("public/index.html.gz").st_mtime_ns, os.stat("public/index.html").st_mtime_ns)
+        self.assertFalse(path.exists("public/small.css.gz"))
+        self.assertFalse(path.exists("public/logo.png.gz"))
+
+    def test_skips_up_to_date_siblings(self):
+        """
+        Test that a second run compresses nothing, and that a changed file is compressed again.
+        """
+        self.precompress()
+        self.assertEqual(self.precompress(), {"compressed": 0, "unchanged": 2, "deleted": 0})
+
+        self.write("public/index.html", "<p>changed</p>" * 100)
+        self.assertEqual(self.precompress(), {"compressed": 1, "unchanged": 1, "deleted": 0})
+
+        with gzip.open("public/index.html.gz", "rt") as file:
+            self.assertEqual(file.read(), "<p>changed</p>" * 100)
+
+    def test_skips_incompressible_files(self):
+        """
+        Test that a file whose siblings would not be smaller is only compressed again once it changed.
+        """
+        with open("public/data.json", "wb") as file:
+            file.write(os.urandom(4096))
+
+        self.assertEqual(self.precompress(), {"compressed": 2, "unchanged": 0, "deleted": 0})
+        self.assertFalse(path.exists("public/data.json.gz"))
+        self.assertEqual(self.precompress(), {"compressed": 0, "unchanged": 3, "deleted": 0})
+
+        os.utime("public/data.json", ns=(0, 0))
+        self.assertEqual(self.precompress(), {"compressed": 0, "unchanged": 2, "deleted": 0})
+
+    def test_deletes_orphaned_siblings(self):
+        """
+        Test that the siblings of a removed file are deleted with their empty directory, while compressed files
+        the stage did not write are kept.
+        """
+        with gzip.open("public/download.txt.gz", "wt") as file:
+            file.write("static download")
+
+        self.precompress()
+        os.remove("public/blog/post.html")
+
+        self.assertEqual(self.precompress(), {"compressed": 0, "unchanged": 1, "deleted": 1})
+        self.assertFalse(path.exists("public/blog"))
+        self.assertTrue(path.exists("public/download.txt.gz"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import tempfile
+import unittest
+
+from profiling import StageTimer, Trace
+
+
+# unit test class for testing the stage timer
+class TestStageTimer(unittest.TestCase):
+
+    def test_nested_stages(self):
+        """
+        Test that the time of a nested stage is not counted in the stage around it.
+        """
+        timer = StageTimer()
+
+        with timer.stage("outer"):
+            with timer.stage("inner"):
+                time.sleep(0.02)
+
+        self.assertGreaterEqual(timer.timings["inner"], 0.02)
+        self.assertLess(timer.timings["outer"], 0.01)
+
+    def test_repeated_stage_accumulates(self):
+        """
+        Test that the times of a stage run several times are summed.
+        """
+        timer = StageTimer()
+
+        for _ in range(2):
+            with timer.stage("sleep"):
+                time.sleep(0.01)
+
+        self.assertGreaterEqual(timer.timings["sleep"], 0.02)
+
+    def test_timed_iter(self):
+        """
+        Test that timed_iter yields every item and only times producing them.
+        """
+        timer = StageTimer()
+
+        def produce():
+            for i in range(3):
+                time.sleep(0.01)
+                yield i
+
+        items = []
+        for item in timer.timed_iter(produce(), "produce"):
+            time.sleep(0.05)
+            items.append(item)
+
+        self.assertEqual(items, [0, 1, 2])
+        self.assertGreaterEqual(timer.timings["produce"], 0.03)
+        self.assertLess(timer.timings["produce"], 0.1)
+
+    def test_timed_iter_empty(self):
+        """
+        Test that an empty iterable is timed without leaving a stage running.
+        """
+        timer = StageTimer()
+        self.assertEqual(list(timer.timed_iter([], "empty")), [])
+        self.assertEqual(timer.running, [])
+        self.assertIn("empty", timer.timings)
+
+    def test_spans(self):
+        """
+        Test that a tracing timer records stages and spans as trace events, except stages without span.
+        """
+        timer = StageTimer(trace=True)
+
+        with timer.span("group", page="index.md"):
+            with timer.stage("template"):
+                pass
+            with timer.stage("render", span=False):
+                pass
+
+        self.assertEqual([span["name"] for span in timer.spans], ["template", "group"])
+        self.assertEqual(timer.spans[1]["args"], {"page": "index.md"})
+        self.assertLessEqual(timer.spans[1]["ts"], timer.spans[0]["ts"])
+        self.assertNotIn("group", timer.timings)
+        self.assertIsNone(StageTimer().spans)
+
+
+# unit test class for testing the trace of a build
+class TestTrace(unittest.TestCase):
+
+    def test_idle(self):
+        """
+        Test that the gaps of every worker between the start and the end of a pool are added as idle spans.
+        """
+        trace = Trace()
+        work = [
+            {"name": "generate_page", "ts": 2.0, "dur": 3.0, "pid": 1, "tid": 1},
+            {"name": "generate_page", "ts": 7.0, "dur": 3.0, "pid": 1, "tid": 1},
+            {"name": "generate_page", "ts": 0.0, "dur": 10.0, "pid": 2, "tid": 2},
+            ]
+        trace.add_idle(0, 10000, work)
+        self.assertEqual(
+                [(event["pid"], event["ts"], event["dur"]) for event in trace.events],
+                [(1, 0.0, 2.0), (1, 5.0, 2.0)],
+                )
+
+    def test_save(self):
+        """
+        Test that the saved trace is a trace event JSON file naming the build process.
+        """
+        trace = Trace()
+
+        with trace.span("discovery"):
+            pass
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            trace_path = os.path.join(tmp_dir, "traces", "build.json")
+            trace.save(trace_path)
+
+            with open(trace_path) as file:
+                events = json.load(file)["traceEvents"]
+
+        self.assertEqual(events[0]["args"], {"name": "build"})
+        self.assertEqual(events[1]["name"], "discovery")
+        self.assertEqual(events[1]["ph"], "X")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,275 @@
+import os
+import sys
+import gzip
+import os.path as path
+import tempfile
+import functools
+import threading
+import unittest
+import http.client
+
+# server.py is at the root of the repository, next to src
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from server import (
+    CORSHTTPRequestHandler,
+    PooledHTTPServer,
+    ResponseCache,
+    parse_accept_encoding,
+    parse_range,
+)
+
+
+# unit test class for testing the parsing of the Range and Accept-Encoding headers
+class TestParseHeaders(unittest.TestCase):
+
+    def test_parse_range(self):
+        """
+        Test that a single byte range is clamped to the file, and that a suffix range counts from its end.
+        """
+        self.assertEqual(parse_range("bytes=0-99", 1000), (0, 99))
+        self.assertEqual(parse_range("bytes=900-2000", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=500-", 1000), (500, 999))
+        self.assertEqual(parse_range("bytes=-100", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=-5000", 1000), (0, 999))
+        self.assertEqual(parse_range("Bytes= 0-0 ", 1000), (0, 0))
+
+    def test_parse_range_unsatisfiable(self):
+        """
+        Test that a range starting after the end of the file, an empty suffix and any range of an empty file
+        cannot be satisfied, i.e. their first byte is after their last one.
+        """
+        for header, size in (("bytes=1000-", 1000), ("bytes=2000-3000", 1000), ("bytes=-0", 1000),
+                             ("bytes=0-", 0), ("bytes=-10", 0)):
+            first, last = parse_range(header, size)
+            self.assertGreater(first, last, header)
+
+    def test_parse_range_ignored(self):
+        """
+        Test that several ranges, other units and malformed ranges are ignored, which sends the whole file.
+        """
+        for header in ("bytes=0-1,5-6", "items=0-1", "bytes=5-2", "bytes=-", "bytes=a-b", "bytes=0", "bytes=²-"):
+            self.assertIsNone(parse_range(header, 1000), header)
+
+    def test_parse_accept_encoding(self):
+        """
+        Test that every encoding gets its quality value, 1 by default and 0 if it is malformed.
+        """
+        self.assertEqual(
+                parse_accept_encoding("gzip, BR;q=0.5, *;q=0, deflate;q=x"),
+                {"gzip": 1.0, "br": 0.5, "*": 0.0, "deflate": 0.0},
+                )
+        self.assertEqual(parse_accept_encoding(""), {})
+
+
+# unit test class for testing the in-memory cache of the served files
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, name, data):
+        file_path = path.join(self.tmp_dir.name, name)
+
+        with open(file_path, "wb") as file:
+            file.write(data)
+        return file_path
+
+    def test_changed_file_is_read_again(self):
+        """
+        Test that a cached file is served from memory until it changes, and that its size is accounted once.
+        """
+        cache = ResponseCache()
+        file_path = self.write("index.html", b"first")
+        entry = cache.get(file_path, "text/html")
+
+        self.assertEqual(entry.body, b"first")
+        self.assertIs(cache.get(file_path, "text/html"), entry)
+
+        self.write("index.html", b"second")
+        os.utime(file_path, ns=(0, 0))
+        entry = cache.get(file_path, "text/html")
+
+        self.assertEqual(entry.body, b"second")
+        self.assertEqual(cache.size, 6)
+
+    def test_large_file_is_not_kept(self):
+        """
+        Test that only the validators of a file larger than the file limit are cached, without counting its size.
+        """
+        cache = ResponseCache(max_bytes=100, max_file_size=10)
+        entry = cache.get(self.write("video.mp4", b"x" * 20), "video/mp4")
+
+        self.assertIsNone(entry.body)
+        self.assertEqual(entry.etag, f'"{entry.mtime_ns:x}-{20:x}"')
+        self.assertEqual(cache.size, 0)
+
+    def test_lru_eviction(self):
+        """
+        Test that the least recently used files are evicted when the contents exceed the size limit.
+        """
+        cache = ResponseCache(max_bytes=10)
+        a, b, c, d = (self.write(name, b"1234") for name in "abcd")
+        cache.get(a, "text/plain")
+        cache.get(b, "text/plain")
+        cache.get(c, "text/plain")
+
+        self.assertEqual(list(cache.entries), [b, c])
+        self.assertEqual(cache.size, 8)
+
+        cache.get(b, "text/plain")
+        cache.get(d, "text/plain")
+
+        self.assertEqual(list(cache.entries), [b, d])
+        self.assertEqual(cache.size, 8)
+
+
+# unit test class for testing the responses of a server listening on a free port
+class TestPooledHTTPServer(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Creates a temporary directory with a page, its gzip sibling and a file too large for the response cache,
+        and starts a server on it in a thread.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.page = b"<p>hello</p>" * 100
+        self.large = bytes(range(256)) * 64
+        self.write("index.html", self.page)
+        self.write("index.html.gz", gzip.compress(self.page))
+        self.write("large.bin", self.large)
+        page_stat = os.stat(path.join(self.tmp_dir.name, "index.html"))
+        os.utime(path.join(self.tmp_dir.name, "index.html.gz"), ns=(page_stat.st_atime_ns, page_stat.st_mtime_ns))
+
+        handler_class = functools.partial(CORSHTTPRequestHandler, directory=self.tmp_dir.name)
+        self.httpd = PooledHTTPServer(
+                ("127.0.0.1", 0),
+                handler_class,
+                workers=2,
+                quiet=True,
+                response_cache=ResponseCache(max_file_size=4096),
+                )
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        self.connection = http.client.HTTPConnection("127.0.0.1", self.httpd.server_address[1], timeout=5)
+
+    def tearDown(self):
+        self.connection.close()
+        self.httpd.shutdown()
+        self.httpd.server_close(wait=True)
+        self.thread.join()
+        self.tmp_dir.cleanup()
+
+    def write(self, name, data):
+        with open(path.join(self.tmp_dir.name, name), "wb") as file:
+            file.write(data)
+
+    def request(self, url_path, **headers):
+        """
+        Sends a GET request on the keep-alive connection of the test.
+
+        Returns:
+            tuple: The response and its body.
+        """
+        headers = {key.replace("_", "-"): value for key, value in headers.items()}
+        self.connection.request("GET", url_path, headers=headers)
+        response = self.connection.getresponse()
+        return response, response.read()
+
+    def test_ok_and_not_modified(self):
+        """
+        Test that a file is sent with its validators, and that a request naming its ETag, weak or not, or a date
+        after its modification gets a 304 without body.
+        """
+        response, body = self.request("/")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, self.page)
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        etag = response.getheader("ETag")
+        last_modified = response.getheader("Last-Modified")
+
+        for headers in ({"If_None_Match": etag}, {"If_None_Match": f'"other", W/{etag}'}, {"If_None_Match": "*"},
+                        {"If_Modified_Since": last_modified}):
+            response, body = self.request("/index.html", **headers)
+            self.assertEqual(response.status, 304, headers)
+            self.assertEqual(body, b"")
+            self.assertEqual(response.getheader("ETag"), etag)
+
+        response, _ = self.request("/index.html", If_None_Match='"other"', If_Modified_Since=last_modified)
+        self.assertEqual(response.status, 200)
+
+    def test_ranges(self):
+        """
+        Test that a byte range is sent as 206 from memory and from disk, that an unsatisfiable range gets a 416,
+        and that an If-Range naming another version sends the whole file.
+        """
+        response, body = self.request("/index.html", Range="bytes=3-9")
+        self.assertEqual(response.status, 206)
+        self.assertEqual(body, self.page[3:10])
+        self.assertEqual(response.getheader("Content-Range"), f"bytes 3-9/{len(self.page)}")
+
+        response, body = self.request("/large.bin", Range="bytes=-100")
+        self.assertEqual(response.status, 206)
+        self.assertEqual(body, self.large[-100:])
+
+        response, body = self.request("/large.bin", Range=f"bytes={len(self.large)}-")
+        self.assertEqual(response.status, 416)
+        self.assertEqual(response.getheader("Content-Range"), f"bytes */{len(self.large)}")
+        self.assertEqual(body, b"")
+
+        etag = self.request("/large.bin")[0].getheader("ETag")
+        response, body = self.request("/large.bin", Range="bytes=0-9", If_Range=etag)
+        self.assertEqual(response.status, 206)
+        response, body = self.request("/large.bin", Range="bytes=0-9", If_Range=f"W/{etag}")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, self.large)
+        response, body = self.request("/large.bin", Range="bytes=0-9", If_Range="Thu, 01 Jan 1970 00:00:00 GMT")
+        self.assertEqual(response.status, 200)
+
+    def test_file_replaced_after_lookup(self):
+        """
+        Test that a file served from disk which is replaced right after it was looked up is sent whole, with the
+        length and validators of the version that is sent.
+        """
+        replaced = bytes(range(256)) * 32
+        get = self.httpd.response_cache.get
+
+        def get_then_replace(file_path, content_type):
+            entry = get(file_path, content_type)
+            self.write("large.bin.tmp", replaced)
+            os.replace(path.join(self.tmp_dir.name, "large.bin.tmp"), file_path)
+            return entry
+
+        self.httpd.response_cache.get = get_then_replace
+        response, body = self.request("/large.bin")
+        file_stat = os.stat(path.join(self.tmp_dir.name, "large.bin"))
+
+        self.assertEqual(body, replaced)
+        self.assertEqual(response.getheader("Content-Length"), str(len(replaced)))
+        self.assertEqual(response.getheader("ETag"), f'"{file_stat.st_mtime_ns:x}-{len(replaced):x}"')
+
+    def test_gzip_negotiation(self):
+        """
+        Test that a client accepting gzip gets the sibling written by the build, and that a stale sibling is never
+        sent.
+        """
+        response, body = self.request("/index.html", Accept_Encoding="br;q=1, gzip;q=0.5")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+        self.assertEqual(gzip.decompress(body), self.page)
+
+        response, body = self.request("/index.html", Accept_Encoding="gzip;q=0")
+        self.assertIsNone(response.getheader("Content-Encoding"))
+
+        os.utime(path.join(self.tmp_dir.name, "index.html.gz"), ns=(0, 0))
+        response, body = self.request("/index.html", Accept_Encoding="gzip")
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(body, self.page)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import os
+import os.path as path
+import tempfile
+import unittest
+
+
+# base class of the tests working on files of a temporary site, which is the working directory during every test:
+# the build stages write their logs to "./logs" and default their other paths to the working directory as well
+class SiteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Creates a temporary site with a logs directory, and makes it the current working directory.
+        """
+        self.old_cwd = os.getcwd()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        os.chdir(self.root)
+        os.makedirs("logs")
+
+    def tearDown(self):
+        os.chdir(self.old_cwd)
+        self.tmp_dir.cleanup()
+
+    def write(self, file_path, text):
+        """
+        Writes a text file, creating its directory if needed.
+        """
+        if path.dirname(file_path) != "":
+            os.makedirs(path.dirname(file_path), exist_ok=True)
+
+        with open(file_path, "w") as file:
+            file.write(text)
+
+    def read(self, file_path):
+        with open(file_path) as file:
+            return file.read()
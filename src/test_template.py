@@ -0,0 +1,137 @@
+import io
+import os
+import os.path as path
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from template import Template, TemplateCache, find_template
+from test_support import SiteTestCase
+
+
+# unit test class for testing the compiled templates
+class TestTemplate(unittest.TestCase):
+
+    def test_compile(self):
+        """
+        Test that a template is compiled into literal segments around its placeholder slots.
+        """
+        template = Template("<title>{{ Title }}</title><p>{{Content}}</p>")
+        self.assertEqual(template.segments, ["<title>", "</title><p>", "</p>"])
+        self.assertEqual(template.slots, ["Title", "Content"])
+
+    def test_render(self):
+        """
+        Test that rendering fills every placeholder, including repeated and custom ones.
+        """
+        template = Template("<title>{{ Title }}</title><h1>{{ Title }}</h1>{{ Content }}<p>{{ Footer }}</p>")
+        self.assertEqual(
+                template.render({"Title": "Home", "Content": "<p>hi</p>", "Footer": "bye"}),
+                "<title>Home</title><h1>Home</h1><p>hi</p><p>bye</p>",
+                )
+
+    def test_render_missing_value(self):
+        """
+        Test that rendering a template without a value for one of its placeholders raises a ValueError.
+        """
+        with self.assertRaises(ValueError):
+            Template("{{ Title }}").render({})
+
+    def test_write_streams_nodes(self):
+        """
+        Test that write renders the same page as render, streaming HTML node values into the file.
+        """
+        template = Template("<title>{{ Title }}</title><article>{{ Content }}</article>")
+        values = {"Title": "Home", "Content": ParentNode("div", [LeafNode("p", "hi")])}
+        file = io.StringIO()
+        template.write(file, values)
+        self.assertEqual(file.getvalue(), "<title>Home</title><article><div><p>hi</p></div></article>")
+        self.assertEqual(template.render(values), file.getvalue())
+
+    def test_write_missing_value_writes_nothing(self):
+        """
+        Test that write raises a ValueError before writing anything when a placeholder has no value.
+        """
+        file = io.StringIO()
+        with self.assertRaises(ValueError):
+            Template("<title>{{ Title }}</title>{{ Content }}").write(file, {"Title": "Home"})
+        self.assertEqual(file.getvalue(), "")
+
+    def test_values_are_not_rendered_again(self):
+        """
+        Test that a value containing a placeholder is inserted literally.
+        """
+        template = Template("{{ Title }}|{{ Content }}")
+        self.assertEqual(
+                template.render({"Title": "{{ Content }}", "Content": "x"}),
+                "{{ Content }}|x",
+                )
+
+
+# unit test class for testing the template cache and the template lookup
+class TestTemplateCache(SiteTestCase):
+
+    def test_cache_reloads_changed_template(self):
+        """
+        Test that the cache returns the same compiled template until the file changes.
+        """
+        template_path = path.join(self.root, "template.html")
+        self.write(template_path, "{{ Title }}")
+        cache = TemplateCache()
+        template = cache.get(template_path)
+        self.assertIs(cache.get(template_path), template)
+
+        self.write(template_path, "<b>{{ Title }}</b>")
+        stat = os.stat(template_path)
+        os.utime(template_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(cache.get(template_path).render({"Title": "x"}), "<b>x</b>")
+
+    def test_find_template(self):
+        """
+        Test that a page template wins over a directory template, which wins over the default template.
+        """
+        content = path.join(self.root, "content")
+        self.write(path.join(content, "index.md"), "# Home")
+        self.write(path.join(content, "blog", "post.md"), "# Post")
+        self.write(path.join(content, "blog", "deep", "post.md"), "# Deep")
+        self.write(path.join(content, "blog", "about.md"), "# About")
+        self.write(path.join(content, "blog", "template.html"), "{{ Content }}")
+        self.write(path.join(content, "blog", "about.template.html"), "{{ Content }}")
+
+        self.assertEqual(find_template(path.join(content, "index.md"), content, "default.html"), "default.html")
+        self.assertEqual(
+                find_template(path.join(content, "blog", "deep", "post.md"), content, "default.html"),
+                path.join(content, "blog", "template.html"),
+                )
+        self.assertEqual(
+                find_template(path.join(content, "blog", "about.md"), content, "default.html"),
+                path.join(content, "blog", "about.template.html"),
+                )
+
+    def test_find_template_dir_templates(self):
+        """
+        Test that the template of a directory is looked up once per build, and that a page template still wins.
+        """
+        content = path.join(self.root, "content")
+        self.write(path.join(content, "blog", "template.html"), "{{ Content }}")
+        self.write(path.join(content, "blog", "about.template.html"), "{{ Content }}")
+        dir_templates = {}
+
+        self.assertEqual(
+                find_template(path.join(content, "blog", "post.md"), content, "default.html", dir_templates),
+                path.join(content, "blog", "template.html"),
+                )
+        self.assertEqual(dir_templates, {path.join(content, "blog"): path.join(content, "blog", "template.html")})
+
+        os.remove(path.join(content, "blog", "template.html"))
+        self.assertEqual(
+                find_template(path.join(content, "blog", "other.md"), content, "default.html", dir_templates),
+                path.join(content, "blog", "template.html"),
+                )
+        self.assertEqual(
+                find_template(path.join(content, "blog", "about.md"), content, "default.html", dir_templates),
+                path.join(content, "blog", "about.template.html"),
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -117,5 +117,20 @@ class TestTextNode(unittest.TestCase):
                 )
 
 
+    def test_compact_layout(self):
+        """
+        Test that TextNode instances have no per-instance __dict__ and share interned text type strings.
+
+        Parameters:
+            self (TestCase): The test case instance.
+
+        Returns:
+            None
+        """
+        node = TextNode("This is a text node", "".join(["bo", "ld"]))
+        self.assertFalse(hasattr(node, "__dict__"))
+        self.assertIs(node.text_type, text_type_bold)
+
+
 if __name__ == "__main__":
     unittest.main()
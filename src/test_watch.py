@@ -0,0 +1,109 @@
+import os
+import os.path as path
+import threading
+import unittest
+
+import watch
+from watch import InotifyWatcher, PollingWatcher, changed_paths, snapshot, wait_for_changes
+from test_support import SiteTestCase
+
+
+# unit test class for testing the watchers of the watch mode
+class TestWatch(SiteTestCase):
+
+    def setUp(self):
+        """
+        Creates a temporary site with a content directory and a template, see `SiteTestCase`.
+        """
+        super().setUp()
+        self.content = path.join(self.root, "content")
+        self.template = path.join(self.root, "template.html")
+        self.write(path.join(self.content, "index.md"), "# Home")
+        self.write(path.join(self.content, "blog", "post.md"), "# Post")
+        self.write(self.template, "{{ Content }}")
+        self.write(path.join(self.root, "other.txt"), "not watched")
+
+    def check_watcher(self, watcher):
+        """
+        Checks that a watcher reports edits, new files in new directories, deletions and replaced files, and
+        ignores the files it does not watch.
+        """
+        try:
+            self.assertEqual(watcher.wait(0.05), set())
+
+            post_path = path.join(self.content, "blog", "post.md")
+            self.write(post_path, "# Post\n\nedited")
+            self.assertEqual(wait_for_changes(watcher, timeout=2), {post_path})
+
+            new_path = path.join(self.content, "new", "page.md")
+            os.makedirs(path.dirname(new_path))
+            self.write(new_path, "# New")
+            self.assertIn(new_path, wait_for_changes(watcher, timeout=2))
+
+            os.remove(path.join(self.content, "index.md"))
+            self.assertEqual(wait_for_changes(watcher, timeout=2), {path.join(self.content, "index.md")})
+
+            self.write(path.join(self.root, "other.txt"), "still not watched")
+            self.write(self.template + ".tmp", "<div>{{ Content }}</div>")
+            os.replace(self.template + ".tmp", self.template)
+            self.assertEqual(wait_for_changes(watcher, timeout=2), {self.template})
+        finally:
+            watcher.close()
+
+    def test_snapshot_changes(self):
+        """
+        Test that comparing snapshots finds created, deleted and modified files.
+        """
+        old_snapshot = snapshot([self.content, self.template])
+        self.assertEqual(len(old_snapshot), 3)
+
+        self.write(path.join(self.content, "index.md"), "# Home\n\nedited")
+        self.write(path.join(self.content, "about.md"), "# About")
+        os.remove(path.join(self.content, "blog", "post.md"))
+
+        self.assertEqual(
+            changed_paths(old_snapshot, snapshot([self.content, self.template])),
+            {
+                path.join(self.content, "index.md"),
+                path.join(self.content, "about.md"),
+                path.join(self.content, "blog", "post.md"),
+            },
+        )
+
+    def test_polling_watcher(self):
+        """
+        Test the polling watcher.
+        """
+        self.check_watcher(PollingWatcher([self.content, self.template], interval=0.01))
+
+    @unittest.skipIf(watch.inotify_init1 is None, "inotify is not available")
+    def test_inotify_watcher(self):
+        """
+        Test the inotify watcher.
+        """
+        self.check_watcher(InotifyWatcher([self.content, self.template]))
+
+    def test_burst_is_coalesced(self):
+        """
+        Test that changes following each other within the debounce window are reported together.
+        """
+        watcher = watch.create_watcher([self.content], interval=0.01)
+        paths = [path.join(self.content, f"page{i}.md") for i in range(5)]
+
+        def write_burst():
+            for file_path in paths:
+                self.write(file_path, "# Page")
+
+        try:
+            thread = threading.Thread(target=write_burst)
+            thread.start()
+            changed = wait_for_changes(watcher, debounce=0.2, timeout=2)
+            thread.join()
+        finally:
+            watcher.close()
+
+        self.assertEqual(changed, set(paths))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+from sys import intern
 from htmlnode import LeafNode
 
 # inline text types
@@ -13,6 +14,9 @@ text_type_image = "image"
 # intermediate representation between Markdown and HTML
 class TextNode:
 
+    # no per-instance __dict__, a long paragraph creates many text nodes
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         """
         Initializes a new instance of the TextNode class.
@@ -24,8 +28,8 @@ class TextNode:
         """
         # text content of the node
         self.text = text
-        # type of text this node contain
-        self.text_type = text_type
+        # type of text this node contain, interned so every node shares the same few type strings
+        self.text_type = intern(text_type) if isinstance(text_type, str) else text_type
         # URL of the link or image
         self.url = url
 
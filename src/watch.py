@@ -0,0 +1,399 @@
+import os
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import os.path as path
+
+from os import scandir, stat
+from time import monotonic, sleep
+
+# inotify(7) event masks
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# every event that can change what a build reads
+watch_mask = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+# header of an inotify event: watch descriptor, mask, cookie and length of the name following it
+event_header = struct.Struct("iIII")
+
+try:
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    inotify_init1 = libc.inotify_init1
+    inotify_add_watch = libc.inotify_add_watch
+    inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+except (OSError, AttributeError, TypeError):
+    inotify_init1 = None
+
+
+def snapshot(watched_paths):
+    """
+    Records the modification time and size of every file under the given paths.
+
+    Args:
+        watched_paths (list): Directories, which are scanned recursively, and single files.
+
+    Returns:
+        dict: (modification time in nanoseconds, size) keyed by file path. Missing paths are left out.
+    """
+    files = {}
+    pending = []
+
+    for watched_path in watched_paths:
+        try:
+            file_stat = stat(watched_path)
+        except FileNotFoundError:
+            continue
+
+        if path.isdir(watched_path):
+            pending.append(watched_path)
+        else:
+            files[watched_path] = (file_stat.st_mtime_ns, file_stat.st_size)
+
+    while pending:
+        try:
+            entries = list(scandir(pending.pop()))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.is_file():
+                    entry_stat = entry.stat()
+                    files[entry.path] = (entry_stat.st_mtime_ns, entry_stat.st_size)
+            except FileNotFoundError:
+                continue
+    return files
+
+
+def changed_paths(old_snapshot, new_snapshot):
+    """
+    Compares two snapshots.
+
+    Args:
+        old_snapshot (dict): The earlier snapshot, see `snapshot`.
+        new_snapshot (dict): The later snapshot.
+
+    Returns:
+        set: The paths of the files created, deleted or modified between the snapshots.
+    """
+    changed = {file_path for file_path in new_snapshot if old_snapshot.get(file_path) != new_snapshot[file_path]}
+    changed.update(file_path for file_path in old_snapshot if file_path not in new_snapshot)
+    return changed
+
+
+# watcher comparing snapshots of the watched paths at a fixed interval, works on every platform
+class PollingWatcher:
+
+    def __init__(self, watched_paths, interval=0.2):
+        """
+        Initializes a new instance of the PollingWatcher class, taking the first snapshot.
+
+        Parameters:
+            watched_paths (list): Directories, which are watched recursively, and single files.
+            interval (float): Seconds between two snapshots. Defaults to 0.2.
+        """
+        self.watched_paths = list(watched_paths)
+        self.interval = interval
+        self.files = snapshot(self.watched_paths)
+
+    def wait(self, timeout=None):
+        """
+        Waits for files to change.
+
+        Args:
+            timeout (float, optional): Seconds to wait at most. Defaults to None, which waits until a file changes.
+
+        Returns:
+            set: The paths of the changed files, empty if nothing changed before the timeout.
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+
+        while True:
+            remaining = self.interval if deadline is None else min(self.interval, deadline - monotonic())
+            sleep(max(remaining, 0))
+
+            files = snapshot(self.watched_paths)
+            changed = changed_paths(self.files, files)
+            self.files = files
+
+            if changed or (deadline is not None and monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        """
+        Releases the resources of the watcher, the polling watcher has none.
+
+        Returns:
+            None
+        """
+
+    def __repr__(self):
+        """
+        Return a string representation of the PollingWatcher object.
+
+        :return: A string representation of the PollingWatcher object.
+        :rtype: str
+        """
+        return f"PollingWatcher({self.watched_paths}, {len(self.files)} files, every {self.interval} s)"
+
+
+# watcher receiving the changes from the Linux kernel through inotify, without scanning anything
+class InotifyWatcher:
+
+    def __init__(self, watched_paths):
+        """
+        Initializes a new instance of the InotifyWatcher class, watching every directory under the given paths.
+
+        Parameters:
+            watched_paths (list): Directories, which are watched recursively, and single files, which are watched
+            through their directory so replacing them (as editors do) is seen too. A symlink to a directory is
+            watched both ways, so pointing it to another directory is seen as a change of the link.
+
+        Raises:
+            OSError: If inotify is not available or the watch limit of the user is reached.
+        """
+        if inotify_init1 is None:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+
+        self.watched_paths = list(watched_paths)
+        self.fd = inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+
+        # watch descriptor -> directory path
+        self.dirs = {}
+        # directory path -> names of the watched files in it, None for every file and subdirectory
+        self.names = {}
+
+        try:
+            for watched_path in self.watched_paths:
+                if path.isdir(watched_path):
+                    self.add_tree(watched_path)
+                if not path.isdir(watched_path) or path.islink(watched_path):
+                    self.add_file(watched_path)
+        except BaseException:
+            self.close()
+            raise
+
+    def add_watch(self, dir_path):
+        """
+        Watches a single directory.
+
+        Args:
+            dir_path (str): The path to the directory.
+
+        Returns:
+            None
+
+        Raises:
+            OSError: If the directory cannot be watched, e.g. because the watch limit is reached.
+        """
+        wd = inotify_add_watch(self.fd, os.fsencode(dir_path), watch_mask)
+
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()), dir_path)
+        self.dirs[wd] = dir_path
+
+    def add_tree(self, dir_path):
+        """
+        Watches a directory and its subdirectories.
+
+        Args:
+            dir_path (str): The path to the directory.
+
+        Returns:
+            set: The paths of the files found in the directory, which may have been written before the watch
+            existed.
+        """
+        files = set()
+        pending = [dir_path]
+
+        while pending:
+            cur_dir = pending.pop()
+
+            try:
+                self.add_watch(cur_dir)
+                entries = list(scandir(cur_dir))
+            except FileNotFoundError:
+                continue
+
+            self.names[cur_dir] = None
+
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                else:
+                    files.add(entry.path)
+        return files
+
+    def add_file(self, file_path):
+        """
+        Watches a single file through its directory.
+
+        Args:
+            file_path (str): The path to the file.
+
+        Returns:
+            None
+        """
+        dir_path = path.dirname(file_path) or "."
+
+        if dir_path not in self.names:
+            self.add_watch(dir_path)
+            self.names[dir_path] = set()
+        if self.names[dir_path] is not None:
+            self.names[dir_path].add(path.basename(file_path))
+
+    def wait(self, timeout=None):
+        """
+        Waits for files to change.
+
+        Args:
+            timeout (float, optional): Seconds to wait at most. Defaults to None, which waits until a file changes.
+
+        Returns:
+            set: The paths of the changed files, empty if nothing changed before the timeout. If the kernel dropped
+            events, the watched paths themselves are returned, since anything under them may have changed.
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+
+        while True:
+            remaining = None if deadline is None else max(deadline - monotonic(), 0)
+
+            if not select.select([self.fd], [], [], remaining)[0]:
+                return set()
+
+            changed = self.read_events()
+
+            if changed or (deadline is not None and monotonic() >= deadline):
+                return changed
+
+    def read_events(self):
+        """
+        Reads the pending events of the watched directories.
+
+        Returns:
+            set: The paths of the changed files, see `wait`.
+        """
+        changed = set()
+
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+
+            offset = 0
+
+            while offset < len(data):
+                wd, mask, _, length = event_header.unpack_from(data, offset)
+                name = os.fsdecode(data[offset + event_header.size:offset + event_header.size + length].rstrip(b"\0"))
+                offset += event_header.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    changed.update(self.watched_paths)
+                    continue
+
+                dir_path = self.dirs.get(wd)
+
+                if mask & IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                    continue
+                if dir_path is None or name == "":
+                    continue
+
+                names = self.names.get(dir_path)
+
+                if names is not None and name not in names:
+                    continue
+
+                changed.add(path.join(dir_path, name))
+
+                # a new subdirectory of a watched tree, its files may be written before it is watched
+                if names is None and mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    changed.update(self.add_tree(path.join(dir_path, name)))
+
+    def close(self):
+        """
+        Stops watching and closes the inotify descriptor.
+
+        Returns:
+            None
+        """
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __repr__(self):
+        """
+        Return a string representation of the InotifyWatcher object.
+
+        :return: A string representation of the InotifyWatcher object.
+        :rtype: str
+        """
+        return f"InotifyWatcher({self.watched_paths}, {len(self.dirs)} directories)"
+
+
+def create_watcher(watched_paths, interval=0.2):
+    """
+    Creates the most efficient watcher available on this platform.
+
+    Args:
+        watched_paths (list): Directories, which are watched recursively, and single files.
+        interval (float, optional): Seconds between two snapshots of the polling watcher. Defaults to 0.2.
+
+    Returns:
+        InotifyWatcher or PollingWatcher: An inotify watcher, or a polling watcher if inotify is not available
+        (e.g. not on Linux) or its watch limit is reached.
+    """
+    try:
+        return InotifyWatcher(watched_paths)
+    except OSError:
+        return PollingWatcher(watched_paths, interval)
+
+
+def wait_for_changes(watcher, debounce=0.05, max_delay=1.0, timeout=None):
+    """
+    Waits for files to change and coalesces a burst of changes, e.g. an editor saving or a build writing files.
+
+    Args:
+        watcher (InotifyWatcher or PollingWatcher): The watcher.
+        debounce (float, optional): Seconds without further change that end a burst. Defaults to 0.05.
+        max_delay (float, optional): Seconds after the first change a burst ends at the latest, so a file that is
+        written continuously does not postpone the result forever. Defaults to 1.0.
+        timeout (float, optional): Seconds to wait for the first change. Defaults to None, which waits until a file
+        changes.
+
+    Returns:
+        set: The paths of the files changed during the burst, empty if nothing changed before the timeout.
+    """
+    changed = watcher.wait(timeout)
+
+    if not changed:
+        return changed
+
+    deadline = monotonic() + max_delay
+
+    while monotonic() < deadline:
+        more = watcher.wait(min(debounce, max(deadline - monotonic(), 0)))
+
+        if not more:
+            break
+        changed |= more
+    return changed